@@ -4,509 +4,553 @@ Crea tutti i grafici comparativi 2022 vs 2025
 - Sistema ELY/FC
 - Bilancio energetico
 """
+import gc
+import os
 import sys
 sys.path.insert(0, 'src')
 sys.path.insert(0, 'test_2025')
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg', force=True)  # Solo output PNG: nessun backend GUI da inizializzare
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from datetime import datetime, timedelta
-import yaml
+from matplotlib.collections import LineCollection
 from pathlib import Path
 
-from loader import load_timeseries, add_net_load
-from run_test_2025 import load_timeseries_2025
+# Stile di default impostato una sola volta per tutte le figure
+plt.rcdefaults()
+plt.rcParams['figure.max_open_warning'] = 0
+# Semplificazione dei path: meno vertici da processare per le serie annuali
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
+plt.rcParams['agg.path.chunksize'] = 10000
+
+SAVE_DPI = 150  # Risoluzione dei PNG di riepilogo (bilanci e tabella)
+# Grafici di profilo (serie annuali e settimana media): risoluzione da schermo
+# e compressione zlib minima, file un po' piu' grandi ma scrittura molto piu' rapida
+PROFILE_DPI = 100
+PROFILE_PNG = {'compress_level': 1}
+
+
+def _pixel_downsample(x, y, n_px):
+    """
+    Riduce una serie al numero di pixel orizzontali disponibili.
+
+    Le ore sono raggruppate in blocchi consecutivi e di ogni blocco si tiene il
+    valore con modulo massimo: per un'area riempita da zero il profilo esterno
+    (picchi positivi o negativi) resta invariato, con 3-4x vertici in meno.
+    """
+    y = np.asarray(y)
+    k = max(1, len(y) // n_px)
+    if k == 1:
+        return x, y
+    starts = np.arange(0, len(y), k)
+    y_max = np.maximum.reduceat(y, starts)
+    y_min = np.minimum.reduceat(y, starts)
+    return x[starts], np.where(y_max >= -y_min, y_max, y_min)
+
+
+def _fill_panel(ax, x, series, kwargs):
+    """Disegna un'area fill_between per ogni serie, con gli stili corrispondenti in kwargs."""
+    n_px = int(ax.figure.get_figwidth() * PROFILE_DPI)  # Larghezza della figura salvata [px]
+    for y, kw in zip(series, kwargs):
+        poly = ax.fill_between(*_pixel_downsample(x, y, n_px), **kw)
+        poly.set_rasterized(True)
+
+
+def _line_panel(ax, x, series, kwargs):
+    """
+    Disegna tutte le serie come un'unica LineCollection (un solo artist per pannello).
+
+    Gli stili (color, linewidth, label) sono presi da kwargs; per la legenda si
+    aggiunge una linea vuota per serie, che non ha vertici da disegnare.
+    x sono date gia' convertite con mdates.date2num.
+    """
+    segs = [np.column_stack([x, np.asarray(y, dtype=float)]) for y in series]
+    lines = ax.add_collection(LineCollection(segs,
+                                             colors=[kw['color'] for kw in kwargs],
+                                             linewidths=[kw['linewidth'] for kw in kwargs]))
+    lines.set_rasterized(True)
+    ax.autoscale_view()
+    for kw in kwargs:
+        ax.plot([], [], **kw)
+
+
+def _finish_panel(ax, ylabel, title):
+    """Etichette, legenda e griglia comuni a tutti i pannelli temporali."""
+    ax.set_ylabel(ylabel)
+    ax.set_title(title, fontweight='bold')
+    ax.legend(loc='upper right')
+    ax.grid(True, alpha=0.3)
+
+
+def _close_figure(fig):
+    """Svuota e chiude la figura, poi forza la raccolta: un solo bitmap Agg in memoria alla volta."""
+    fig.clear()
+    plt.close(fig)
+    gc.collect()
+
+
+# Colonne usate dai grafici temporali
+PLOT_COLS = ['load_forecast_mw', 'pv_forecast_mw', 'wind_forecast_mw', 'p_import_mw', 'p_export_mw',
+             'p_ely_mw', 'p_fc_mw', 'p_dg_mw', 'p_curt_mw', 'soc_mwh']
+
+
+def _plot_arrays(df):
+    """
+    Colonne di PLOT_COLS come array float32 contigui, da passare ai grafici temporali.
+
+    La precisione float32 e' ampiamente sufficiente a 150 dpi; i bilanci energetici
+    restano calcolati sul DataFrame originale.
+    """
+    return {c: np.ascontiguousarray(df[c].to_numpy(dtype=np.float32)) for c in PLOT_COLS}
+
+
+def _save_time_figure(fig, axes, path):
+    """
+    Asse x mensile, salvataggio su file e chiusura esplicita della figura.
+
+    Le serie sono gia' rasterizzate (vedi _fill_panel/_line_panel) e i margini
+    sono gestiti da constrained layout: senza bbox_inches='tight' savefig non deve
+    fare un rendering aggiuntivo per misurare il riquadro.
+    """
+    for ax in axes:
+        ax.xaxis.set_major_locator(mdates.MonthLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%b'))
+
+    fig.savefig(path, dpi=PROFILE_DPI, pil_kwargs=PROFILE_PNG)
+    _close_figure(fig)
 
-# Carica configurazioni
-cfg_2022 = yaml.safe_load(Path('configs/system.yaml').read_text(encoding='utf-8'))
-cfg_2025 = yaml.safe_load(Path('test_2025/system_2025.yaml').read_text(encoding='utf-8'))
 
-# Carica dati
-bundle_2022 = load_timeseries(Path('data'), cfg_2022)
-df_2022 = add_net_load(bundle_2022.data)
+# ============================================================================
+# GRAFICI 1-2: Profilo di Potenza 2022 e 2025
+# ============================================================================
+def _plot_power_profile(x, df, year, path):
+    """Profilo di potenza annuale: load e RES, scambi con la rete, sistema H2 e DG."""
+    fig, axes = plt.subplots(3, 1, figsize=(16, 12), sharex=True, layout='constrained')
+
+    ax = axes[0]
+    _fill_panel(ax, x,
+                [df['load_forecast_mw'], df['pv_forecast_mw'], df['wind_forecast_mw']],
+                [dict(alpha=0.7, label='Load', color='gray'),
+                 dict(alpha=0.7, label='PV', color='orange'),
+                 dict(alpha=0.7, label='Wind', color='blue')])
+    _finish_panel(ax, 'Potenza (MW)', f'Profilo di Potenza {year} - Load e Rinnovabili')
+    ax.set_ylim(0, 25)
+
+    ax = axes[1]
+    _fill_panel(ax, x,
+                [df['p_import_mw'], -df['p_export_mw']],
+                [dict(alpha=0.7, label='Import', color='red'),
+                 dict(alpha=0.7, label='Export', color='green')])
+    ax.axhline(y=0, color='black', linewidth=0.5)
+    _finish_panel(ax, 'Potenza (MW)', f'Scambi con la Rete {year}')
+
+    ax = axes[2]
+    _fill_panel(ax, x,
+                [df['p_ely_mw'], -df['p_fc_mw'], df['p_dg_mw']],
+                [dict(alpha=0.7, label='ELY (carica H2)', color='purple'),
+                 dict(alpha=0.7, label='FC (scarica H2)', color='cyan'),
+                 dict(alpha=0.7, label='DG', color='brown')])
+    ax.axhline(y=0, color='black', linewidth=0.5)
+    ax.set_xlabel('Data')
+    _finish_panel(ax, 'Potenza (MW)', f'Sistema H2 e DG {year}')
+
+    _save_time_figure(fig, axes, path)
 
-bundle_2025 = load_timeseries_2025(Path('data'), Path('test_2025'), cfg_2025)
-df_2025 = add_net_load(bundle_2025.data)
 
-# Carica schedule
-sched_2022 = pd.read_csv('outputs/mpc_2022_cf045.csv').set_index('hour')
-sched_2025 = pd.read_csv('test_2025/outputs_2025/mpc_2025_cf014.csv').set_index('hour')
+# ============================================================================
+# GRAFICI 3-4: Sistema ELY/FC dettaglio 2022 e 2025
+# ============================================================================
+def _plot_h2_detail(x, df, year, path):
+    """Dettaglio del sistema idrogeno: potenze ELY/FC, SOC e surplus RES vs ELY."""
+    fig, axes = plt.subplots(3, 1, figsize=(16, 10), sharex=True, layout='constrained')
+
+    ax = axes[0]
+    _line_panel(ax, x,
+                [df['p_ely_mw'], df['p_fc_mw']],
+                [dict(color='purple', linewidth=0.8, label='ELY (MW)'),
+                 dict(color='cyan', linewidth=0.8, label='FC (MW)')])
+    _finish_panel(ax, 'Potenza (MW)', f'Sistema Idrogeno {year} - Potenza ELY e FC')
+
+    ax = axes[1]
+    _line_panel(ax, x, [df['soc_mwh']],
+                [dict(color='green', linewidth=1, label='SOC H2 (MWh)')])
+    ax.axhline(y=12, color='red', linestyle='--', alpha=0.5, label='Capacita max (12 MWh)')
+    _finish_panel(ax, 'SOC (MWh)', 'Stato di Carica Storage H2')
+    ax.set_ylim(0, 14)
+
+    # Surplus RES = max(PV + Wind - Load, 0), calcolato sugli array senza Series intermedie
+    surplus = np.maximum(df['pv_forecast_mw'] + df['wind_forecast_mw'] - df['load_forecast_mw'], 0.0)
+    ax = axes[2]
+    _fill_panel(ax, x, [surplus],
+                [dict(alpha=0.5, label='Surplus RES (PV+Wind-Load)', color='yellow')])
+    _line_panel(ax, x, [df['p_ely_mw']],
+                [dict(color='purple', linewidth=1, label='ELY')])
+    ax.set_xlabel('Data')
+    _finish_panel(ax, 'Potenza (MW)', 'Surplus Rinnovabili vs Utilizzo ELY')
+
+    _save_time_figure(fig, axes, path)
 
-# Merge dati
-merged_2022 = df_2022.join(sched_2022, how='inner')
-merged_2025 = df_2025.join(sched_2025, how='inner')
 
-# Crea date
-start_2022 = datetime(2022, 1, 1)
-start_2025 = datetime(2025, 1, 1)
-dates_2022 = [start_2022 + timedelta(hours=int(h)) for h in merged_2022.index]
-dates_2025 = [start_2025 + timedelta(hours=int(h)) for h in merged_2025.index]
+dt = 1.0
 
-print('Dati caricati. Creazione grafici...')
+# Colonne da integrare per ogni voce del bilancio
+ENERGY_COLS = {
+    'PV': 'pv_forecast_mw',
+    'Wind': 'wind_forecast_mw',
+    'Import': 'p_import_mw',
+    'FC': 'p_fc_mw',
+    'DG': 'p_dg_mw',
+    'Load': 'load_forecast_mw',
+    'Export': 'p_export_mw',
+    'ELY': 'p_ely_mw',
+    'Curt': 'p_curt_mw',
+}
 
-# ============================================================================
-# GRAFICO 1: Profilo di Potenza 2022
-# ============================================================================
-fig, axes = plt.subplots(3, 1, figsize=(16, 12), sharex=True)
-
-ax = axes[0]
-ax.fill_between(dates_2022, merged_2022['load_forecast_mw'], alpha=0.7, label='Load', color='gray')
-ax.fill_between(dates_2022, merged_2022['pv_forecast_mw'], alpha=0.7, label='PV', color='orange')
-ax.fill_between(dates_2022, merged_2022['wind_forecast_mw'], alpha=0.7, label='Wind', color='blue')
-ax.set_ylabel('Potenza (MW)')
-ax.set_title('Profilo di Potenza 2022 - Load e Rinnovabili', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-ax.set_ylim(0, 25)
-
-ax = axes[1]
-ax.fill_between(dates_2022, merged_2022['p_import_mw'], alpha=0.7, label='Import', color='red')
-ax.fill_between(dates_2022, -merged_2022['p_export_mw'], alpha=0.7, label='Export', color='green')
-ax.axhline(y=0, color='black', linewidth=0.5)
-ax.set_ylabel('Potenza (MW)')
-ax.set_title('Scambi con la Rete 2022', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-
-ax = axes[2]
-ax.fill_between(dates_2022, merged_2022['p_ely_mw'], alpha=0.7, label='ELY (carica H2)', color='purple')
-ax.fill_between(dates_2022, -merged_2022['p_fc_mw'], alpha=0.7, label='FC (scarica H2)', color='cyan')
-ax.fill_between(dates_2022, merged_2022['p_dg_mw'], alpha=0.7, label='DG', color='brown')
-ax.axhline(y=0, color='black', linewidth=0.5)
-ax.set_ylabel('Potenza (MW)')
-ax.set_xlabel('Data')
-ax.set_title('Sistema H2 e DG 2022', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-
-for ax in axes:
-    ax.xaxis.set_major_locator(mdates.MonthLocator())
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b'))
-
-plt.tight_layout()
-plt.savefig('outputs/plots/profilo_potenza_2022.png', dpi=150, bbox_inches='tight')
-plt.close()
-print('1. Salvato: profilo_potenza_2022.png')
 
-# ============================================================================
-# GRAFICO 2: Profilo di Potenza 2025
-# ============================================================================
-fig, axes = plt.subplots(3, 1, figsize=(16, 12), sharex=True)
-
-ax = axes[0]
-ax.fill_between(dates_2025, merged_2025['load_forecast_mw'], alpha=0.7, label='Load', color='gray')
-ax.fill_between(dates_2025, merged_2025['pv_forecast_mw'], alpha=0.7, label='PV', color='orange')
-ax.fill_between(dates_2025, merged_2025['wind_forecast_mw'], alpha=0.7, label='Wind', color='blue')
-ax.set_ylabel('Potenza (MW)')
-ax.set_title('Profilo di Potenza 2025 - Load e Rinnovabili', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-ax.set_ylim(0, 25)
-
-ax = axes[1]
-ax.fill_between(dates_2025, merged_2025['p_import_mw'], alpha=0.7, label='Import', color='red')
-ax.fill_between(dates_2025, -merged_2025['p_export_mw'], alpha=0.7, label='Export', color='green')
-ax.axhline(y=0, color='black', linewidth=0.5)
-ax.set_ylabel('Potenza (MW)')
-ax.set_title('Scambi con la Rete 2025', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-
-ax = axes[2]
-ax.fill_between(dates_2025, merged_2025['p_ely_mw'], alpha=0.7, label='ELY (carica H2)', color='purple')
-ax.fill_between(dates_2025, -merged_2025['p_fc_mw'], alpha=0.7, label='FC (scarica H2)', color='cyan')
-ax.fill_between(dates_2025, merged_2025['p_dg_mw'], alpha=0.7, label='DG', color='brown')
-ax.axhline(y=0, color='black', linewidth=0.5)
-ax.set_ylabel('Potenza (MW)')
-ax.set_xlabel('Data')
-ax.set_title('Sistema H2 e DG 2025', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-
-for ax in axes:
-    ax.xaxis.set_major_locator(mdates.MonthLocator())
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b'))
-
-plt.tight_layout()
-plt.savefig('outputs/plots/profilo_potenza_2025.png', dpi=150, bbox_inches='tight')
-plt.close()
-print('2. Salvato: profilo_potenza_2025.png')
+def _energy_totals(df):
+    """Energia totale [MWh] per voce del bilancio, in un'unica riduzione sulle 9 colonne."""
+    totals = df[list(ENERGY_COLS.values())].to_numpy().sum(axis=0, dtype=np.float64) * dt
+    return dict(zip(ENERGY_COLS, totals.tolist()))
 
-# ============================================================================
-# GRAFICO 3: Sistema ELY/FC dettaglio - 2022
-# ============================================================================
-fig, axes = plt.subplots(3, 1, figsize=(16, 10), sharex=True)
-
-ax = axes[0]
-ax.plot(dates_2022, merged_2022['p_ely_mw'], 'purple', linewidth=0.8, label='ELY (MW)')
-ax.plot(dates_2022, merged_2022['p_fc_mw'], 'cyan', linewidth=0.8, label='FC (MW)')
-ax.set_ylabel('Potenza (MW)')
-ax.set_title('Sistema Idrogeno 2022 - Potenza ELY e FC', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-
-ax = axes[1]
-ax.plot(dates_2022, merged_2022['soc_mwh'], 'green', linewidth=1, label='SOC H2 (MWh)')
-ax.axhline(y=12, color='red', linestyle='--', alpha=0.5, label='Capacita max (12 MWh)')
-ax.set_ylabel('SOC (MWh)')
-ax.set_title('Stato di Carica Storage H2', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-ax.set_ylim(0, 14)
-
-surplus = (merged_2022['pv_forecast_mw'] + merged_2022['wind_forecast_mw'] - merged_2022['load_forecast_mw']).clip(lower=0)
-ax = axes[2]
-ax.fill_between(dates_2022, surplus, alpha=0.5, label='Surplus RES (PV+Wind-Load)', color='yellow')
-ax.plot(dates_2022, merged_2022['p_ely_mw'], 'purple', linewidth=1, label='ELY')
-ax.set_ylabel('Potenza (MW)')
-ax.set_xlabel('Data')
-ax.set_title('Surplus Rinnovabili vs Utilizzo ELY', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-
-for ax in axes:
-    ax.xaxis.set_major_locator(mdates.MonthLocator())
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b'))
-
-plt.tight_layout()
-plt.savefig('outputs/plots/sistema_h2_2022.png', dpi=150, bbox_inches='tight')
-plt.close()
-print('3. Salvato: sistema_h2_2022.png')
 
-# ============================================================================
-# GRAFICO 4: Sistema ELY/FC dettaglio - 2025
-# ============================================================================
-fig, axes = plt.subplots(3, 1, figsize=(16, 10), sharex=True)
-
-ax = axes[0]
-ax.plot(dates_2025, merged_2025['p_ely_mw'], 'purple', linewidth=0.8, label='ELY (MW)')
-ax.plot(dates_2025, merged_2025['p_fc_mw'], 'cyan', linewidth=0.8, label='FC (MW)')
-ax.set_ylabel('Potenza (MW)')
-ax.set_title('Sistema Idrogeno 2025 - Potenza ELY e FC', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-
-ax = axes[1]
-ax.plot(dates_2025, merged_2025['soc_mwh'], 'green', linewidth=1, label='SOC H2 (MWh)')
-ax.axhline(y=12, color='red', linestyle='--', alpha=0.5, label='Capacita max (12 MWh)')
-ax.set_ylabel('SOC (MWh)')
-ax.set_title('Stato di Carica Storage H2', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-ax.set_ylim(0, 14)
-
-surplus_25 = (merged_2025['pv_forecast_mw'] + merged_2025['wind_forecast_mw'] - merged_2025['load_forecast_mw']).clip(lower=0)
-ax = axes[2]
-ax.fill_between(dates_2025, surplus_25, alpha=0.5, label='Surplus RES (PV+Wind-Load)', color='yellow')
-ax.plot(dates_2025, merged_2025['p_ely_mw'], 'purple', linewidth=1, label='ELY')
-ax.set_ylabel('Potenza (MW)')
-ax.set_xlabel('Data')
-ax.set_title('Surplus Rinnovabili vs Utilizzo ELY', fontweight='bold')
-ax.legend(loc='upper right')
-ax.grid(True, alpha=0.3)
-
-for ax in axes:
-    ax.xaxis.set_major_locator(mdates.MonthLocator())
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b'))
-
-plt.tight_layout()
-plt.savefig('outputs/plots/sistema_h2_2025.png', dpi=150, bbox_inches='tight')
-plt.close()
-print('4. Salvato: sistema_h2_2025.png')
 
 # ============================================================================
 # GRAFICO 5: Bilancio Energetico - Confronto 2022 vs 2025
 # ============================================================================
-dt = 1.0
+def _plot_energy_bars(e_2022, e_2025, path):
+    """Bilancio energetico a barre affiancate: voci IN e OUT, 2022 vs 2025."""
+    fig, axes = plt.subplots(1, 2, figsize=(16, 8), layout='constrained')
 
-# Calcola energie per 2022
-e_2022 = {
-    'PV': (merged_2022['pv_forecast_mw'] * dt).sum(),
-    'Wind': (merged_2022['wind_forecast_mw'] * dt).sum(),
-    'Import': (merged_2022['p_import_mw'] * dt).sum(),
-    'FC': (merged_2022['p_fc_mw'] * dt).sum(),
-    'DG': (merged_2022['p_dg_mw'] * dt).sum(),
-    'Load': (merged_2022['load_forecast_mw'] * dt).sum(),
-    'Export': (merged_2022['p_export_mw'] * dt).sum(),
-    'ELY': (merged_2022['p_ely_mw'] * dt).sum(),
-    'Curt': (merged_2022['p_curt_mw'] * dt).sum(),
-}
+    # Grafico a barre - Energia IN
+    ax = axes[0]
+    labels_in = ['PV', 'Wind', 'Import', 'FC', 'DG']
+    values_2022_in = [e_2022[k] for k in labels_in]
+    values_2025_in = [e_2025[k] for k in labels_in]
 
-# Calcola energie per 2025
-e_2025 = {
-    'PV': (merged_2025['pv_forecast_mw'] * dt).sum(),
-    'Wind': (merged_2025['wind_forecast_mw'] * dt).sum(),
-    'Import': (merged_2025['p_import_mw'] * dt).sum(),
-    'FC': (merged_2025['p_fc_mw'] * dt).sum(),
-    'DG': (merged_2025['p_dg_mw'] * dt).sum(),
-    'Load': (merged_2025['load_forecast_mw'] * dt).sum(),
-    'Export': (merged_2025['p_export_mw'] * dt).sum(),
-    'ELY': (merged_2025['p_ely_mw'] * dt).sum(),
-    'Curt': (merged_2025['p_curt_mw'] * dt).sum(),
-}
+    x = np.arange(len(labels_in))
+    width = 0.35
 
-# Bilancio: IN = OUT
-# IN: PV + Wind + Import + FC + DG
-# OUT: Load + Export + ELY + Curt
-
-in_2022 = e_2022['PV'] + e_2022['Wind'] + e_2022['Import'] + e_2022['FC'] + e_2022['DG']
-out_2022 = e_2022['Load'] + e_2022['Export'] + e_2022['ELY'] + e_2022['Curt']
-
-in_2025 = e_2025['PV'] + e_2025['Wind'] + e_2025['Import'] + e_2025['FC'] + e_2025['DG']
-out_2025 = e_2025['Load'] + e_2025['Export'] + e_2025['ELY'] + e_2025['Curt']
-
-fig, axes = plt.subplots(1, 2, figsize=(16, 8))
-
-# Grafico a barre - Energia IN
-ax = axes[0]
-labels_in = ['PV', 'Wind', 'Import', 'FC', 'DG']
-values_2022_in = [e_2022[k] for k in labels_in]
-values_2025_in = [e_2025[k] for k in labels_in]
-
-x = np.arange(len(labels_in))
-width = 0.35
-
-bars1 = ax.bar(x - width/2, values_2022_in, width, label='2022', color='steelblue', alpha=0.8)
-bars2 = ax.bar(x + width/2, values_2025_in, width, label='2025', color='coral', alpha=0.8)
-
-ax.set_ylabel('Energia (MWh)')
-ax.set_title('Energia IN - Fonti di Generazione', fontweight='bold')
-ax.set_xticks(x)
-ax.set_xticklabels(labels_in)
-ax.legend()
-ax.grid(True, alpha=0.3, axis='y')
-
-# Aggiungi valori sopra le barre
-for bar in bars1:
-    height = bar.get_height()
-    if height > 100:
-        ax.annotate(f'{height:,.0f}', xy=(bar.get_x() + bar.get_width() / 2, height),
-                    xytext=(0, 3), textcoords="offset points", ha='center', va='bottom', fontsize=8)
-
-for bar in bars2:
-    height = bar.get_height()
-    if height > 100:
-        ax.annotate(f'{height:,.0f}', xy=(bar.get_x() + bar.get_width() / 2, height),
-                    xytext=(0, 3), textcoords="offset points", ha='center', va='bottom', fontsize=8)
-
-# Grafico a barre - Energia OUT
-ax = axes[1]
-labels_out = ['Load', 'Export', 'ELY', 'Curt']
-values_2022_out = [e_2022[k] for k in labels_out]
-values_2025_out = [e_2025[k] for k in labels_out]
-
-x = np.arange(len(labels_out))
-
-bars1 = ax.bar(x - width/2, values_2022_out, width, label='2022', color='steelblue', alpha=0.8)
-bars2 = ax.bar(x + width/2, values_2025_out, width, label='2025', color='coral', alpha=0.8)
-
-ax.set_ylabel('Energia (MWh)')
-ax.set_title('Energia OUT - Consumi e Uscite', fontweight='bold')
-ax.set_xticks(x)
-ax.set_xticklabels(labels_out)
-ax.legend()
-ax.grid(True, alpha=0.3, axis='y')
-
-for bar in bars1:
-    height = bar.get_height()
-    if height > 100:
-        ax.annotate(f'{height:,.0f}', xy=(bar.get_x() + bar.get_width() / 2, height),
-                    xytext=(0, 3), textcoords="offset points", ha='center', va='bottom', fontsize=8)
-
-for bar in bars2:
-    height = bar.get_height()
-    if height > 100:
-        ax.annotate(f'{height:,.0f}', xy=(bar.get_x() + bar.get_width() / 2, height),
-                    xytext=(0, 3), textcoords="offset points", ha='center', va='bottom', fontsize=8)
-
-plt.suptitle('Bilancio Energetico: Confronto 2022 vs 2025', fontsize=14, fontweight='bold', y=1.02)
-plt.tight_layout()
-plt.savefig('outputs/plots/bilancio_energetico_confronto.png', dpi=150, bbox_inches='tight')
-plt.close()
-print('5. Salvato: bilancio_energetico_confronto.png')
+    bars1 = ax.bar(x - width/2, values_2022_in, width, label='2022', color='steelblue', alpha=0.8)
+    bars2 = ax.bar(x + width/2, values_2025_in, width, label='2025', color='coral', alpha=0.8)
 
-# ============================================================================
-# GRAFICO 6: Sankey-style Bilancio Energetico
-# ============================================================================
-fig, axes = plt.subplots(1, 2, figsize=(16, 10))
-
-for idx, (year, e, in_tot, out_tot) in enumerate([(2022, e_2022, in_2022, out_2022),
-                                                   (2025, e_2025, in_2025, out_2025)]):
-    ax = axes[idx]
-
-    # Dati per stacked bar
-    in_data = [e['PV'], e['Wind'], e['Import'], e['FC'], e['DG']]
-    out_data = [e['Load'], e['Export'], e['ELY'], e['Curt']]
-
-    in_labels = ['PV', 'Wind', 'Import', 'FC', 'DG']
-    out_labels = ['Load', 'Export', 'ELY', 'Curt']
-
-    in_colors = ['orange', 'blue', 'red', 'cyan', 'brown']
-    out_colors = ['gray', 'green', 'purple', 'yellow']
-
-    # Stacked bar IN
-    bottom = 0
-    for i, (val, label, color) in enumerate(zip(in_data, in_labels, in_colors)):
-        ax.bar(0, val, bottom=bottom, width=0.6, label=f'{label}: {val:,.0f} MWh', color=color, alpha=0.8)
-        if val > 500:
-            ax.text(0, bottom + val/2, f'{label}\n{val:,.0f}', ha='center', va='center', fontsize=9, fontweight='bold')
-        bottom += val
-
-    # Stacked bar OUT
-    bottom = 0
-    for i, (val, label, color) in enumerate(zip(out_data, out_labels, out_colors)):
-        ax.bar(1, val, bottom=bottom, width=0.6, color=color, alpha=0.8)
-        if val > 500:
-            ax.text(1, bottom + val/2, f'{label}\n{val:,.0f}', ha='center', va='center', fontsize=9, fontweight='bold')
-        bottom += val
-
-    ax.set_xticks([0, 1])
-    ax.set_xticklabels(['ENERGIA IN', 'ENERGIA OUT'])
     ax.set_ylabel('Energia (MWh)')
-    ax.set_title(f'Bilancio Energetico {year}\nIN: {in_tot:,.0f} MWh | OUT: {out_tot:,.0f} MWh', fontweight='bold')
+    ax.set_title('Energia IN - Fonti di Generazione', fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels_in)
+    ax.legend()
     ax.grid(True, alpha=0.3, axis='y')
 
-    # Verifica bilancio
-    diff = abs(in_tot - out_tot)
-    ax.text(0.5, -0.1, f'Differenza IN-OUT: {diff:.1f} MWh ({diff/in_tot*100:.3f}%)',
-            ha='center', transform=ax.transAxes, fontsize=10)
+    # Aggiungi valori sopra le barre
+    for bars, values in [(bars1, values_2022_in), (bars2, values_2025_in)]:
+        ax.bar_label(bars, labels=[f'{v:,.0f}' if v > 100 else '' for v in values], padding=3, fontsize=8)
+
+    # Grafico a barre - Energia OUT
+    ax = axes[1]
+    labels_out = ['Load', 'Export', 'ELY', 'Curt']
+    values_2022_out = [e_2022[k] for k in labels_out]
+    values_2025_out = [e_2025[k] for k in labels_out]
+
+    x = np.arange(len(labels_out))
+
+    bars1 = ax.bar(x - width/2, values_2022_out, width, label='2022', color='steelblue', alpha=0.8)
+    bars2 = ax.bar(x + width/2, values_2025_out, width, label='2025', color='coral', alpha=0.8)
+
+    ax.set_ylabel('Energia (MWh)')
+    ax.set_title('Energia OUT - Consumi e Uscite', fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels_out)
+    ax.legend()
+    ax.grid(True, alpha=0.3, axis='y')
+
+    for bars, values in [(bars1, values_2022_out), (bars2, values_2025_out)]:
+        ax.bar_label(bars, labels=[f'{v:,.0f}' if v > 100 else '' for v in values], padding=3, fontsize=8)
+
+    fig.suptitle('Bilancio Energetico: Confronto 2022 vs 2025', fontsize=14, fontweight='bold')
+    fig.savefig(path, dpi=SAVE_DPI)
+    _close_figure(fig)
+
+
+# ============================================================================
+# GRAFICO 6: Sankey-style Bilancio Energetico
+# ============================================================================
+def _plot_energy_stacked(balances, path):
+    """Bilancio IN/OUT a barre sovrapposte; balances: lista di (anno, energie, IN, OUT)."""
+    fig, axes = plt.subplots(1, 2, figsize=(16, 10), layout='constrained')
+
+    for idx, (year, e, in_tot, out_tot) in enumerate(balances):
+        ax = axes[idx]
+
+        # Dati per stacked bar
+        in_data = [e['PV'], e['Wind'], e['Import'], e['FC'], e['DG']]
+        out_data = [e['Load'], e['Export'], e['ELY'], e['Curt']]
+
+        in_labels = ['PV', 'Wind', 'Import', 'FC', 'DG']
+        out_labels = ['Load', 'Export', 'ELY', 'Curt']
+
+        in_colors = ['orange', 'blue', 'red', 'cyan', 'brown']
+        out_colors = ['gray', 'green', 'purple', 'yellow']
+
+        # Barre sovrapposte: un solo bar() per colonna (basi = somma cumulata delle
+        # voci precedenti) ed etichette centrate con bar_label
+        for x0, data, labels, colors in [(0, in_data, in_labels, in_colors),
+                                         (1, out_data, out_labels, out_colors)]:
+            data = np.asarray(data)
+            bottoms = np.concatenate(([0.0], np.cumsum(data)[:-1]))
+            bars = ax.bar(np.full(len(data), x0), data, bottom=bottoms, width=0.6,
+                          color=colors, alpha=0.8,
+                          label=[f'{l}: {v:,.0f} MWh' for l, v in zip(labels, data)] if x0 == 0 else None)
+            ax.bar_label(bars, labels=[f'{l}\n{v:,.0f}' if v > 500 else '' for l, v in zip(labels, data)],
+                         label_type='center', fontsize=9, fontweight='bold')
+
+        ax.set_xticks([0, 1])
+        ax.set_xticklabels(['ENERGIA IN', 'ENERGIA OUT'])
+        ax.set_ylabel('Energia (MWh)')
+        ax.set_title(f'Bilancio Energetico {year}\nIN: {in_tot:,.0f} MWh | OUT: {out_tot:,.0f} MWh', fontweight='bold')
+        ax.grid(True, alpha=0.3, axis='y')
+
+        # Verifica bilancio
+        diff = abs(in_tot - out_tot)
+        ax.text(0.5, -0.1, f'Differenza IN-OUT: {diff:.1f} MWh ({diff/in_tot*100:.3f}%)',
+                ha='center', transform=ax.transAxes, fontsize=10)
+
+    fig.savefig(path, dpi=SAVE_DPI)
+    _close_figure(fig)
 
-plt.tight_layout()
-plt.savefig('outputs/plots/bilancio_energetico_stacked.png', dpi=150, bbox_inches='tight')
-plt.close()
-print('6. Salvato: bilancio_energetico_stacked.png')
 
 # ============================================================================
 # GRAFICO 7: Confronto Diretto 2022 vs 2025 - Profilo Settimanale Medio
 # ============================================================================
-# Calcola profilo medio settimanale (168 ore)
-merged_2022['hour_of_week'] = merged_2022.index % 168
-merged_2025['hour_of_week'] = merged_2025.index % 168
-
-weekly_2022 = merged_2022.groupby('hour_of_week').mean()
-weekly_2025 = merged_2025.groupby('hour_of_week').mean()
-
-fig, axes = plt.subplots(3, 1, figsize=(16, 12), sharex=True)
-
-# Import
-ax = axes[0]
-ax.plot(weekly_2022.index, weekly_2022['p_import_mw'], 'b-', linewidth=2, label='2022', alpha=0.8)
-ax.plot(weekly_2025.index, weekly_2025['p_import_mw'], 'r-', linewidth=2, label='2025', alpha=0.8)
-ax.set_ylabel('Potenza (MW)')
-ax.set_title('Profilo Settimanale Medio - Import dalla Rete', fontweight='bold')
-ax.legend()
-ax.grid(True, alpha=0.3)
-
-# Export
-ax = axes[1]
-ax.plot(weekly_2022.index, weekly_2022['p_export_mw'], 'b-', linewidth=2, label='2022', alpha=0.8)
-ax.plot(weekly_2025.index, weekly_2025['p_export_mw'], 'r-', linewidth=2, label='2025', alpha=0.8)
-ax.set_ylabel('Potenza (MW)')
-ax.set_title('Profilo Settimanale Medio - Export alla Rete', fontweight='bold')
-ax.legend()
-ax.grid(True, alpha=0.3)
-
-# ELY + FC
-ax = axes[2]
-ax.plot(weekly_2022.index, weekly_2022['p_ely_mw'], 'b-', linewidth=2, label='ELY 2022', alpha=0.8)
-ax.plot(weekly_2025.index, weekly_2025['p_ely_mw'], 'r-', linewidth=2, label='ELY 2025', alpha=0.8)
-ax.plot(weekly_2022.index, weekly_2022['p_fc_mw'], 'b--', linewidth=2, label='FC 2022', alpha=0.8)
-ax.plot(weekly_2025.index, weekly_2025['p_fc_mw'], 'r--', linewidth=2, label='FC 2025', alpha=0.8)
-ax.set_ylabel('Potenza (MW)')
-ax.set_xlabel('Ora della Settimana')
-ax.set_title('Profilo Settimanale Medio - Sistema H2 (ELY e FC)', fontweight='bold')
-ax.legend()
-ax.grid(True, alpha=0.3)
-
-# Aggiungi etichette giorni
-for ax in axes:
-    for i, day in enumerate(['Lun', 'Mar', 'Mer', 'Gio', 'Ven', 'Sab', 'Dom']):
-        ax.axvline(x=i*24, color='gray', linestyle=':', alpha=0.5)
-        if ax == axes[2]:
-            ax.text(i*24 + 12, ax.get_ylim()[1]*0.95, day, ha='center', fontsize=10)
-
-plt.tight_layout()
-plt.savefig('outputs/plots/profilo_settimanale_confronto.png', dpi=150, bbox_inches='tight')
-plt.close()
-print('7. Salvato: profilo_settimanale_confronto.png')
+def _plot_weekly_profile(merged_2022, merged_2025, path):
+    """Profilo settimanale medio (168 ore) di import, export e sistema H2."""
+    # Calcola profilo medio settimanale (168 ore)
+    # Chiave di raggruppamento passata come array (nessuna colonna aggiunta); l'ordinamento
+    # e' fatto sulle 168 righe del risultato invece che sulle ore dell'anno.
+    weekly_2022 = merged_2022.groupby(np.mod(merged_2022.index.to_numpy(), 168), sort=False).mean().sort_index()
+    weekly_2025 = merged_2025.groupby(np.mod(merged_2025.index.to_numpy(), 168), sort=False).mean().sort_index()
+
+    fig, axes = plt.subplots(3, 1, figsize=(16, 12), sharex=True, layout='constrained')
+
+    # Import
+    ax = axes[0]
+    ax.plot(weekly_2022.index, weekly_2022['p_import_mw'], 'b-', linewidth=2, label='2022', alpha=0.8)
+    ax.plot(weekly_2025.index, weekly_2025['p_import_mw'], 'r-', linewidth=2, label='2025', alpha=0.8)
+    ax.set_ylabel('Potenza (MW)')
+    ax.set_title('Profilo Settimanale Medio - Import dalla Rete', fontweight='bold')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+    # Export
+    ax = axes[1]
+    ax.plot(weekly_2022.index, weekly_2022['p_export_mw'], 'b-', linewidth=2, label='2022', alpha=0.8)
+    ax.plot(weekly_2025.index, weekly_2025['p_export_mw'], 'r-', linewidth=2, label='2025', alpha=0.8)
+    ax.set_ylabel('Potenza (MW)')
+    ax.set_title('Profilo Settimanale Medio - Export alla Rete', fontweight='bold')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+    # ELY + FC
+    ax = axes[2]
+    ax.plot(weekly_2022.index, weekly_2022['p_ely_mw'], 'b-', linewidth=2, label='ELY 2022', alpha=0.8)
+    ax.plot(weekly_2025.index, weekly_2025['p_ely_mw'], 'r-', linewidth=2, label='ELY 2025', alpha=0.8)
+    ax.plot(weekly_2022.index, weekly_2022['p_fc_mw'], 'b--', linewidth=2, label='FC 2022', alpha=0.8)
+    ax.plot(weekly_2025.index, weekly_2025['p_fc_mw'], 'r--', linewidth=2, label='FC 2025', alpha=0.8)
+    ax.set_ylabel('Potenza (MW)')
+    ax.set_xlabel('Ora della Settimana')
+    ax.set_title('Profilo Settimanale Medio - Sistema H2 (ELY e FC)', fontweight='bold')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+    # Aggiungi etichette giorni
+    for ax in axes:
+        for i, day in enumerate(['Lun', 'Mar', 'Mer', 'Gio', 'Ven', 'Sab', 'Dom']):
+            ax.axvline(x=i*24, color='gray', linestyle=':', alpha=0.5)
+            if ax == axes[2]:
+                ax.text(i*24 + 12, ax.get_ylim()[1]*0.95, day, ha='center', fontsize=10)
+
+    fig.savefig(path, dpi=PROFILE_DPI, pil_kwargs=PROFILE_PNG)
+    _close_figure(fig)
+
 
 # ============================================================================
 # GRAFICO 8: Riepilogo Finale - Tabella Visiva
 # ============================================================================
-fig, ax = plt.subplots(figsize=(14, 10))
-ax.axis('off')
-
-# Dati tabella
-table_data = [
-    ['Parametro', '2022', '2025', 'Variazione'],
-    ['', '', '', ''],
-    ['PREZZI', '', '', ''],
-    ['PUN medio (EUR/MWh)', f'{324.22:.0f}', f'{116.42:.0f}', '-64%'],
-    ['Import F1 (EUR/MWh)', '533', '164', '-69%'],
-    ['Import F3 (EUR/MWh)', '469', '136', '-71%'],
-    ['Costo DG cf=base (EUR/MWh)', '750', '233', '-69%'],
-    ['', '', '', ''],
-    ['ENERGIA (MWh)', '', '', ''],
-    ['Import dalla rete', f'{e_2022["Import"]:,.0f}', f'{e_2025["Import"]:,.0f}', f'{(e_2025["Import"]-e_2022["Import"])/e_2022["Import"]*100:+.1f}%'],
-    ['Export alla rete', f'{e_2022["Export"]:,.0f}', f'{e_2025["Export"]:,.0f}', f'{(e_2025["Export"]-e_2022["Export"])/e_2022["Export"]*100:+.1f}%'],
-    ['ELY (carica H2)', f'{e_2022["ELY"]:,.0f}', f'{e_2025["ELY"]:,.0f}', f'{(e_2025["ELY"]-e_2022["ELY"])/e_2022["ELY"]*100:+.1f}%'],
-    ['FC (scarica H2)', f'{e_2022["FC"]:,.0f}', f'{e_2025["FC"]:,.0f}', f'{(e_2025["FC"]-e_2022["FC"])/e_2022["FC"]*100:+.1f}%'],
-    ['DG', f'{e_2022["DG"]:,.0f}', f'{e_2025["DG"]:,.0f}', 'N/A'],
-    ['', '', '', ''],
-    ['BILANCIO', '', '', ''],
-    ['Energia IN totale', f'{in_2022:,.0f}', f'{in_2025:,.0f}', ''],
-    ['Energia OUT totale', f'{out_2022:,.0f}', f'{out_2025:,.0f}', ''],
-    ['Errore bilancio', f'{abs(in_2022-out_2022):.1f}', f'{abs(in_2025-out_2025):.1f}', ''],
-]
-
-# Crea tabella
-table = ax.table(cellText=table_data, loc='center', cellLoc='center',
-                 colWidths=[0.35, 0.2, 0.2, 0.15])
-table.auto_set_font_size(False)
-table.set_fontsize(11)
-table.scale(1.2, 1.8)
-
-# Formatta header
-for j in range(4):
-    table[(0, j)].set_facecolor('#4472C4')
-    table[(0, j)].set_text_props(color='white', fontweight='bold')
-
-# Formatta sezioni
-for i in [2, 8, 15]:
+def _plot_summary_table(e_2022, e_2025, in_2022, out_2022, in_2025, out_2025, path):
+    """Tabella riassuntiva di prezzi, energie e bilancio."""
+    fig, ax = plt.subplots(figsize=(14, 10), layout='constrained')
+    ax.axis('off')
+
+    # Sezione energia: valori numerici raccolti in un DataFrame e formattati per colonna
+    energy_rows = {
+        'Import dalla rete': 'Import',
+        'Export alla rete': 'Export',
+        'ELY (carica H2)': 'ELY',
+        'FC (scarica H2)': 'FC',
+    }
+    df_tab = pd.DataFrame({'2022': [e_2022[k] for k in energy_rows.values()],
+                           '2025': [e_2025[k] for k in energy_rows.values()]},
+                          index=list(energy_rows))
+    df_tab['Var %'] = ((df_tab['2025'] - df_tab['2022']) / df_tab['2022'] * 100).map('{:+.1f}%'.format)
+    df_tab[['2022', '2025']] = df_tab[['2022', '2025']].apply(lambda col: col.map('{:,.0f}'.format))
+    energy_table = df_tab.reset_index().to_numpy().tolist()
+
+    # Dati tabella
+    table_data = [
+        ['Parametro', '2022', '2025', 'Variazione'],
+        ['', '', '', ''],
+        ['PREZZI', '', '', ''],
+        ['PUN medio (EUR/MWh)', f'{324.22:.0f}', f'{116.42:.0f}', '-64%'],
+        ['Import F1 (EUR/MWh)', '533', '164', '-69%'],
+        ['Import F3 (EUR/MWh)', '469', '136', '-71%'],
+        ['Costo DG cf=base (EUR/MWh)', '750', '233', '-69%'],
+        ['', '', '', ''],
+        ['ENERGIA (MWh)', '', '', ''],
+        *energy_table,
+        ['DG', f'{e_2022["DG"]:,.0f}', f'{e_2025["DG"]:,.0f}', 'N/A'],
+        ['', '', '', ''],
+        ['BILANCIO', '', '', ''],
+        ['Energia IN totale', f'{in_2022:,.0f}', f'{in_2025:,.0f}', ''],
+        ['Energia OUT totale', f'{out_2022:,.0f}', f'{out_2025:,.0f}', ''],
+        ['Errore bilancio', f'{abs(in_2022-out_2022):.1f}', f'{abs(in_2025-out_2025):.1f}', ''],
+    ]
+
+    # Crea tabella
+    table = ax.table(cellText=table_data, loc='center', cellLoc='center',
+                     colWidths=[0.35, 0.2, 0.2, 0.15])
+    table.auto_set_font_size(False)
+    table.set_fontsize(11)
+    table.scale(1.2, 1.8)
+
+    # Formatta header
     for j in range(4):
-        table[(i, j)].set_facecolor('#D9E2F3')
-        table[(i, j)].set_text_props(fontweight='bold')
-
-ax.set_title('Riepilogo Confronto 2022 vs 2025', fontsize=16, fontweight='bold', pad=20)
-
-plt.tight_layout()
-plt.savefig('outputs/plots/riepilogo_confronto.png', dpi=150, bbox_inches='tight')
-plt.close()
-print('8. Salvato: riepilogo_confronto.png')
-
-print('\n' + '='*60)
-print('TUTTI I GRAFICI CREATI CON SUCCESSO!')
-print('='*60)
-print('\nFile salvati in outputs/plots/:')
-print('  1. profilo_potenza_2022.png')
-print('  2. profilo_potenza_2025.png')
-print('  3. sistema_h2_2022.png')
-print('  4. sistema_h2_2025.png')
-print('  5. bilancio_energetico_confronto.png')
-print('  6. bilancio_energetico_stacked.png')
-print('  7. profilo_settimanale_confronto.png')
-print('  8. riepilogo_confronto.png')
-
-print('\n' + '='*60)
-print('VERIFICA BILANCIO ENERGETICO')
-print('='*60)
-print(f'\n2022:')
-print(f'  IN  = PV + Wind + Import + FC + DG = {in_2022:,.2f} MWh')
-print(f'  OUT = Load + Export + ELY + Curt   = {out_2022:,.2f} MWh')
-print(f'  Differenza: {abs(in_2022-out_2022):.2f} MWh ({abs(in_2022-out_2022)/in_2022*100:.4f}%)')
-
-print(f'\n2025:')
-print(f'  IN  = PV + Wind + Import + FC + DG = {in_2025:,.2f} MWh')
-print(f'  OUT = Load + Export + ELY + Curt   = {out_2025:,.2f} MWh')
-print(f'  Differenza: {abs(in_2025-out_2025):.2f} MWh ({abs(in_2025-out_2025)/in_2025*100:.4f}%)')
+        table[(0, j)].set_facecolor('#4472C4')
+        table[(0, j)].set_text_props(color='white', fontweight='bold')
+
+    # Formatta sezioni
+    for i in [2, 8, 15]:
+        for j in range(4):
+            table[(i, j)].set_facecolor('#D9E2F3')
+            table[(i, j)].set_text_props(fontweight='bold')
+
+    ax.set_title('Riepilogo Confronto 2022 vs 2025', fontsize=16, fontweight='bold', pad=20)
+
+    fig.savefig(path, dpi=SAVE_DPI)
+    _close_figure(fig)
+
+
+def main():
+    # Import dei moduli di caricamento solo nel processo principale: i worker del pool
+    # disegnano soltanto e non li importano
+    import yaml
+    from loader import load_timeseries, cached_net_load, read_schedule
+
+    def build_2025():
+        # run_test_2025 carica model (cvxpy): importato solo se la cache va ricostruita
+        from run_test_2025 import load_timeseries_2025
+        return load_timeseries_2025(Path('data'), Path('test_2025'), cfg_2025)
+
+    # Carica configurazioni
+    cfg_2022 = yaml.safe_load(Path('configs/system.yaml').read_text(encoding='utf-8'))
+    cfg_2025 = yaml.safe_load(Path('test_2025/system_2025.yaml').read_text(encoding='utf-8'))
+
+    # Carica dati (cache condivisa con generate_comparison_table.py)
+    df_2022 = cached_net_load(
+        Path('outputs/.cache/df_2022.pkl'), cfg_2022,
+        [Path('data/res_1_year_pu.mat'), Path('data/buildings_load.mat'), Path('data/PUN_2022.mat')],
+        lambda: load_timeseries(Path('data'), cfg_2022),
+    )
+    df_2025 = cached_net_load(
+        Path('outputs/.cache/df_2025.pkl'), cfg_2025,
+        [Path('data/res_1_year_pu.mat'), Path('data/buildings_load.mat'),
+         Path('test_2025/PUN_2025.mat'), Path('test_2025/run_test_2025.py')],
+        build_2025,
+    )
+
+    # Carica schedule (indice orario ordinato e univoco: allineamento per posizione, senza hash-join)
+    sched_paths = (Path('outputs/mpc_2022_cf045.csv'), Path('test_2025/outputs_2025/mpc_2025_cf014.csv'))
+    sched_2022, sched_2025 = (read_schedule(path).sort_index() for path in sched_paths)
+    for path, sched in zip(sched_paths, (sched_2022, sched_2025)):
+        if not sched.index.is_unique:
+            dup = sched.index[sched.index.duplicated()].unique().tolist()
+            raise ValueError(f'Ore duplicate in {path}: {dup}')
+
+    # Merge dati
+    merged_2022 = pd.concat([df_2022, sched_2022], axis=1, join='inner')
+    merged_2025 = pd.concat([df_2025, sched_2025], axis=1, join='inner')
+
+    # Crea date (ora dell'anno -> timestamp), convertite una sola volta nei float
+    # di matplotlib: tutti i pannelli temporali riusano lo stesso array
+    xnum_2022 = mdates.date2num(pd.Timestamp(2022, 1, 1) + pd.to_timedelta(merged_2022.index, unit='h'))
+    xnum_2025 = mdates.date2num(pd.Timestamp(2025, 1, 1) + pd.to_timedelta(merged_2025.index, unit='h'))
+
+    arrs_2022 = _plot_arrays(merged_2022)
+    arrs_2025 = _plot_arrays(merged_2025)
+
+    print('Dati caricati. Creazione grafici...')
+
+    # Calcola energie per 2022 e 2025
+    e_2022 = _energy_totals(merged_2022)
+    e_2025 = _energy_totals(merged_2025)
+
+    # Bilancio: IN = OUT
+    # IN: PV + Wind + Import + FC + DG
+    # OUT: Load + Export + ELY + Curt
+
+    in_2022 = e_2022['PV'] + e_2022['Wind'] + e_2022['Import'] + e_2022['FC'] + e_2022['DG']
+    out_2022 = e_2022['Load'] + e_2022['Export'] + e_2022['ELY'] + e_2022['Curt']
+
+    in_2025 = e_2025['PV'] + e_2025['Wind'] + e_2025['Import'] + e_2025['FC'] + e_2025['DG']
+    out_2025 = e_2025['Load'] + e_2025['Export'] + e_2025['ELY'] + e_2025['Curt']
+
+    # Le 8 figure sono indipendenti: ognuna e' resa in un processo separato
+    # (rasterizzazione Agg + compressione PNG), i dati viaggiano come argomenti
+    figures = [
+        ('profilo_potenza_2022.png', _plot_power_profile, (xnum_2022, arrs_2022, 2022)),
+        ('profilo_potenza_2025.png', _plot_power_profile, (xnum_2025, arrs_2025, 2025)),
+        ('sistema_h2_2022.png', _plot_h2_detail, (xnum_2022, arrs_2022, 2022)),
+        ('sistema_h2_2025.png', _plot_h2_detail, (xnum_2025, arrs_2025, 2025)),
+        ('bilancio_energetico_confronto.png', _plot_energy_bars, (e_2022, e_2025)),
+        ('bilancio_energetico_stacked.png', _plot_energy_stacked,
+         ([(2022, e_2022, in_2022, out_2022), (2025, e_2025, in_2025, out_2025)],)),
+        ('profilo_settimanale_confronto.png', _plot_weekly_profile, (merged_2022, merged_2025)),
+        ('riepilogo_confronto.png', _plot_summary_table,
+         (e_2022, e_2025, in_2022, out_2022, in_2025, out_2025)),
+    ]
+    with ProcessPoolExecutor(max_workers=min(len(figures), os.cpu_count() or 1)) as pool:
+        futures = [pool.submit(plot, *args, f'outputs/plots/{name}') for name, plot, args in figures]
+        for i, ((name, _, _), fut) in enumerate(zip(figures, futures), start=1):
+            fut.result()
+            print(f'{i}. Salvato: {name}')
+
+    print('\n' + '='*60)
+    print('TUTTI I GRAFICI CREATI CON SUCCESSO!')
+    print('='*60)
+    print('\nFile salvati in outputs/plots/:')
+    print('  1. profilo_potenza_2022.png')
+    print('  2. profilo_potenza_2025.png')
+    print('  3. sistema_h2_2022.png')
+    print('  4. sistema_h2_2025.png')
+    print('  5. bilancio_energetico_confronto.png')
+    print('  6. bilancio_energetico_stacked.png')
+    print('  7. profilo_settimanale_confronto.png')
+    print('  8. riepilogo_confronto.png')
+
+    print('\n' + '='*60)
+    print('VERIFICA BILANCIO ENERGETICO')
+    print('='*60)
+    print(f'\n2022:')
+    print(f'  IN  = PV + Wind + Import + FC + DG = {in_2022:,.2f} MWh')
+    print(f'  OUT = Load + Export + ELY + Curt   = {out_2022:,.2f} MWh')
+    print(f'  Differenza: {abs(in_2022-out_2022):.2f} MWh ({abs(in_2022-out_2022)/in_2022*100:.4f}%)')
+
+    print(f'\n2025:')
+    print(f'  IN  = PV + Wind + Import + FC + DG = {in_2025:,.2f} MWh')
+    print(f'  OUT = Load + Export + ELY + Curt   = {out_2025:,.2f} MWh')
+    print(f'  Differenza: {abs(in_2025-out_2025):.2f} MWh ({abs(in_2025-out_2025)/in_2025*100:.4f}%)')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,28 +4,41 @@ Genera tabella comparativa completa 2022 vs 2025 con tutti gli scenari cf
 import sys
 sys.path.insert(0, 'src')
 sys.path.insert(0, 'test_2025')
-import pandas as pd
 import numpy as np
 import yaml
 from pathlib import Path
 
-# Carica dati 2022
+# Carica dati 2022 (cache condivisa con create_all_plots.py)
 cfg_2022 = yaml.safe_load(Path('configs/system.yaml').read_text(encoding='utf-8'))
-from loader import load_timeseries, add_net_load
-bundle_2022 = load_timeseries(Path('data'), cfg_2022)
-df_2022 = add_net_load(bundle_2022.data)
+from loader import load_timeseries, cached_net_load, read_schedule
+df_2022 = cached_net_load(
+    Path('outputs/.cache/df_2022.pkl'), cfg_2022,
+    [Path('data/res_1_year_pu.mat'), Path('data/buildings_load.mat'), Path('data/PUN_2022.mat')],
+    lambda: load_timeseries(Path('data'), cfg_2022),
+)
 
 # Carica dati 2025
 cfg_2025 = yaml.safe_load(Path('test_2025/system_2025.yaml').read_text(encoding='utf-8'))
-from run_test_2025 import load_timeseries_2025
-bundle_2025 = load_timeseries_2025(Path('data'), Path('test_2025'), cfg_2025)
-df_2025 = add_net_load(bundle_2025.data)
+
+
+def _build_2025():
+    # Import differito: run_test_2025 carica model (cvxpy), serve solo se la cache va ricostruita
+    from run_test_2025 import load_timeseries_2025
+    return load_timeseries_2025(Path('data'), Path('test_2025'), cfg_2025)
+
+
+df_2025 = cached_net_load(
+    Path('outputs/.cache/df_2025.pkl'), cfg_2025,
+    [Path('data/res_1_year_pu.mat'), Path('data/buildings_load.mat'),
+     Path('test_2025/PUN_2025.mat'), Path('test_2025/run_test_2025.py')],
+    _build_2025,
+)
 
 # Carica tutti gli schedule
-sched_2022_cf045 = pd.read_csv('outputs/mpc_2022_cf045.csv').set_index('hour')
-sched_2022_cf060 = pd.read_csv('outputs/mpc_2022_cf060.csv').set_index('hour')
-sched_2025_cf014 = pd.read_csv('test_2025/outputs_2025/mpc_2025_cf014.csv').set_index('hour')
-sched_2025_cf020 = pd.read_csv('test_2025/outputs_2025/mpc_2025_cf020.csv').set_index('hour')
+sched_2022_cf045 = read_schedule(Path('outputs/mpc_2022_cf045.csv'))
+sched_2022_cf060 = read_schedule(Path('outputs/mpc_2022_cf060.csv'))
+sched_2025_cf014 = read_schedule(Path('test_2025/outputs_2025/mpc_2025_cf014.csv'))
+sched_2025_cf020 = read_schedule(Path('test_2025/outputs_2025/mpc_2025_cf020.csv'))
 
 eta_dg = cfg_2022['system']['eta_dg']
 dt = 1.0
@@ -90,14 +103,24 @@ print('\n' + '=' * 100)
 print('3. COSTI COMBUSTIBILE E DG - TUTTI GLI SCENARI')
 print('=' * 100)
 fmt3 = '{:<20} {:>20} {:>20} {:>20} {:>20}'
-print(fmt3.format('Parametro', '2022 cf=0.45', '2022 cf=0.60', '2025 cf=0.14', '2025 cf=0.20'))
+# Intestazioni delle 4 colonne, costanti per tutte le tabelle a 4 scenari
+labels = ('2022 cf=0.45', '2022 cf=0.60', '2025 cf=0.14', '2025 cf=0.20')
+
+
+def row3(label, values, spec=''):
+    """Riga a 4 scenari con lo stesso layout di fmt3: ogni valore formattato con spec in un solo passo."""
+    return f'{label:<20} ' + ' '.join(f'{v:>20{spec}}' for v in values)
+
+
+print(fmt3.format('Parametro', *labels))
 print('-' * 100)
 
 cf_values = [0.45, 0.60, 0.14, 0.20]
-dg_costs = [cf / eta_dg * 1000 for cf in cf_values]
+# Costo specifico DG per scenario (EUR/MWh), calcolato una volta e riusato nelle sezioni 5 e 8
+dg_costs = np.array(cf_values) / eta_dg * 1000
 
 print(fmt3.format('cf (EUR/kWh)', '0.45', '0.60', '0.14', '0.20'))
-print(fmt3.format('Costo DG (EUR/MWh)', f'{dg_costs[0]:.0f}', f'{dg_costs[1]:.0f}', f'{dg_costs[2]:.0f}', f'{dg_costs[3]:.0f}'))
+print(row3('Costo DG (EUR/MWh)', dg_costs, '.0f'))
 
 # ============================================================================
 # 4. FLUSSI ENERGETICI - TUTTI GLI SCENARI
@@ -105,11 +128,15 @@ print(fmt3.format('Costo DG (EUR/MWh)', f'{dg_costs[0]:.0f}', f'{dg_costs[1]:.0f
 print('\n' + '=' * 100)
 print('4. FLUSSI ENERGETICI (MWh) - TUTTI GLI SCENARI')
 print('=' * 100)
-print(fmt3.format('Flusso', '2022 cf=0.45', '2022 cf=0.60', '2025 cf=0.14', '2025 cf=0.20'))
+print(fmt3.format('Flusso', *labels))
 print('-' * 100)
 
 schedules = [sched_2022_cf045, sched_2022_cf060, sched_2025_cf014, sched_2025_cf020]
-labels = ['2022 cf=0.45', '2022 cf=0.60', '2025 cf=0.14', '2025 cf=0.20']
+
+# Colonne dei 4 scenari convertite una sola volta e impilate in matrici (n_ore, 4) float64:
+# ogni somma e' una riduzione NumPy per variabile, senza il dispatch di Series.sum
+S = {c: np.column_stack([sc[c].to_numpy(dtype=np.float64) for sc in schedules])
+     for c in ['p_ely_mw', 'p_fc_mw', 'p_import_mw', 'p_export_mw', 'p_dg_mw', 'p_curt_mw']}
 
 flussi_names = [
     ('Import dalla rete', 'p_import_mw'),
@@ -121,8 +148,7 @@ flussi_names = [
 ]
 
 for name, col in flussi_names:
-    values = [f'{s[col].sum() * dt:.2f}' for s in schedules]
-    print(fmt3.format(name, *values))
+    print(row3(name, S[col].sum(axis=0) * dt, '.2f'))
 
 # ============================================================================
 # 5. UTILIZZO DG - DETTAGLIO
@@ -130,26 +156,30 @@ for name, col in flussi_names:
 print('\n' + '=' * 100)
 print('5. UTILIZZO DIESEL GENERATOR (DG) - DETTAGLIO')
 print('=' * 100)
-print(fmt3.format('Parametro', '2022 cf=0.45', '2022 cf=0.60', '2025 cf=0.14', '2025 cf=0.20'))
+print(fmt3.format('Parametro', *labels))
 print('-' * 100)
 
-dg_energy = [s['p_dg_mw'].sum() * dt for s in schedules]
-dg_hours = [(s['p_dg_mw'] > 0.001).sum() for s in schedules]
-dg_max = [s['p_dg_mw'].max() for s in schedules]
+dg_energy = S['p_dg_mw'].sum(axis=0) * dt
+dg_max = S['p_dg_mw'].max(axis=0)
+# Ore attive e media quando acceso: una maschera booleana per schedule, senza slicing del DataFrame
+dg_hours = []
 dg_mean_when_on = []
 for s in schedules:
-    dg_on = s[s['p_dg_mw'] > 0.001]['p_dg_mw']
-    dg_mean_when_on.append(dg_on.mean() if len(dg_on) > 0 else 0)
-
-print(fmt3.format('Energia DG (MWh)', *[f'{v:.2f}' for v in dg_energy]))
-print(fmt3.format('Ore DG attivo', *[str(v) for v in dg_hours]))
+    p_dg = s['p_dg_mw'].to_numpy()
+    on = p_dg > 0.001
+    n_on = int(on.sum())
+    dg_hours.append(n_on)
+    dg_mean_when_on.append(p_dg[on].sum(dtype=np.float64) / n_on if n_on > 0 else 0)
+
+print(row3('Energia DG (MWh)', dg_energy, '.2f'))
+print(row3('Ore DG attivo', dg_hours))
 print(fmt3.format('% tempo DG attivo', *[f'{v/6528*100:.2f}%' for v in dg_hours]))
-print(fmt3.format('Potenza max DG (MW)', *[f'{v:.2f}' for v in dg_max]))
-print(fmt3.format('Potenza media DG (MW)', *[f'{v:.2f}' for v in dg_mean_when_on]))
+print(row3('Potenza max DG (MW)', dg_max, '.2f'))
+print(row3('Potenza media DG (MW)', dg_mean_when_on, '.2f'))
 
-# Costo DG
-dg_costs_eur = [dg_energy[i] * (cf_values[i] / eta_dg * 1000) for i in range(4)]
-print(fmt3.format('Costo DG (EUR)', *[f'{v:,.0f}' for v in dg_costs_eur]))
+# Costo DG: un prodotto per scenario dopo la riduzione
+dg_costs_eur = dg_energy * dg_costs
+print(row3('Costo DG (EUR)', dg_costs_eur, ',.0f'))
 
 # ============================================================================
 # 6. STATISTICHE OPERATIVE
@@ -157,26 +187,30 @@ print(fmt3.format('Costo DG (EUR)', *[f'{v:,.0f}' for v in dg_costs_eur]))
 print('\n' + '=' * 100)
 print('6. STATISTICHE OPERATIVE')
 print('=' * 100)
-print(fmt3.format('Statistica', '2022 cf=0.45', '2022 cf=0.60', '2025 cf=0.14', '2025 cf=0.20'))
+print(fmt3.format('Statistica', *labels))
 print('-' * 100)
 
+# Maschere "attivo" di tutte le colonne in un unico confronto, contate per colonna
+stats_cols = ['p_export_mw', 'p_dg_mw', 'p_ely_mw', 'p_fc_mw', 'p_import_mw']
 stats_data = []
 for s in schedules:
+    on = s[stats_cols].to_numpy() > 0.001
+    n_export, n_dg, n_ely, n_fc, _ = on.sum(axis=0).tolist()
     stats_data.append({
         'ore': len(s),
-        'export': (s['p_export_mw'] > 0.001).sum(),
-        'dg': (s['p_dg_mw'] > 0.001).sum(),
-        'ely': (s['p_ely_mw'] > 0.001).sum(),
-        'fc': (s['p_fc_mw'] > 0.001).sum(),
-        'simult': ((s['p_import_mw'] > 0.001) & (s['p_export_mw'] > 0.001)).sum(),
+        'export': n_export,
+        'dg': n_dg,
+        'ely': n_ely,
+        'fc': n_fc,
+        'simult': int((on[:, 4] & on[:, 0]).sum()),
     })
 
-print(fmt3.format('Ore totali', *[str(d['ore']) for d in stats_data]))
-print(fmt3.format('Ore con Export', *[str(d['export']) for d in stats_data]))
-print(fmt3.format('Ore con DG', *[str(d['dg']) for d in stats_data]))
-print(fmt3.format('Ore con ELY', *[str(d['ely']) for d in stats_data]))
-print(fmt3.format('Ore con FC', *[str(d['fc']) for d in stats_data]))
-print(fmt3.format('Ore Import+Export', *[str(d['simult']) for d in stats_data]))
+print(row3('Ore totali', [d['ore'] for d in stats_data]))
+print(row3('Ore con Export', [d['export'] for d in stats_data]))
+print(row3('Ore con DG', [d['dg'] for d in stats_data]))
+print(row3('Ore con ELY', [d['ely'] for d in stats_data]))
+print(row3('Ore con FC', [d['fc'] for d in stats_data]))
+print(row3('Ore Import+Export', [d['simult'] for d in stats_data]))
 
 # ============================================================================
 # 7. SISTEMA IDROGENO
@@ -184,22 +218,22 @@ print(fmt3.format('Ore Import+Export', *[str(d['simult']) for d in stats_data]))
 print('\n' + '=' * 100)
 print('7. SISTEMA IDROGENO (H2)')
 print('=' * 100)
-print(fmt3.format('Parametro', '2022 cf=0.45', '2022 cf=0.60', '2025 cf=0.14', '2025 cf=0.20'))
+print(fmt3.format('Parametro', *labels))
 print('-' * 100)
 
 h2_cap = cfg_2022['system']['h2_storage_mwh']
 eta_ely = cfg_2022['system']['eta_ely']
 eta_fc = cfg_2022['system']['eta_fc']
 
-ely_vals = [s['p_ely_mw'].sum() * dt for s in schedules]
-fc_vals = [s['p_fc_mw'].sum() * dt for s in schedules]
-cycles = [(ely_vals[i] + fc_vals[i]) / (2 * h2_cap) for i in range(4)]
-eff = [fc_vals[i] / ely_vals[i] * 100 if ely_vals[i] > 0 else 0 for i in range(4)]
+ely_vals = S['p_ely_mw'].sum(axis=0) * dt
+fc_vals = S['p_fc_mw'].sum(axis=0) * dt
+cycles = (ely_vals + fc_vals) / (2 * h2_cap)
+eff = np.divide(fc_vals * 100, ely_vals, out=np.zeros_like(fc_vals), where=ely_vals > 0)
 
-print(fmt3.format('Capacita H2 (MWh)', *[f'{h2_cap}' for _ in range(4)]))
-print(fmt3.format('Energia ELY (MWh)', *[f'{v:.2f}' for v in ely_vals]))
-print(fmt3.format('Energia FC (MWh)', *[f'{v:.2f}' for v in fc_vals]))
-print(fmt3.format('Cicli equivalenti', *[f'{v:.1f}' for v in cycles]))
+print(row3('Capacita H2 (MWh)', (h2_cap,) * 4))
+print(row3('Energia ELY (MWh)', ely_vals, '.2f'))
+print(row3('Energia FC (MWh)', fc_vals, '.2f'))
+print(row3('Cicli equivalenti', cycles, '.1f'))
 print(fmt3.format('Efficienza reale (%)', *[f'{v:.1f}%' for v in eff]))
 
 # ============================================================================
@@ -208,46 +242,63 @@ print(fmt3.format('Efficienza reale (%)', *[f'{v:.1f}%' for v in eff]))
 print('\n' + '=' * 100)
 print('8. ANALISI ECONOMICA (EUR)')
 print('=' * 100)
-print(fmt3.format('Voce', '2022 cf=0.45', '2022 cf=0.60', '2025 cf=0.14', '2025 cf=0.20'))
+print(fmt3.format('Voce', *labels))
 print('-' * 100)
 
-# Merge con dati prezzi
-merged_2022 = df_2022.copy()
-merged_2025 = df_2025.copy()
-
-dfs = [df_2022, df_2022, df_2025, df_2025]
-cfs = [0.45, 0.60, 0.14, 0.20]
-
-cost_import = []
-income_export = []
-cost_dg = []
-net_cost = []
-
-for i, (df, s, cf) in enumerate(zip(dfs, schedules, cfs)):
-    merged = df.join(s, how='inner')
-    ci = (merged['p_import_mw'] * merged['import_price_eur_per_mwh'] * dt).sum()
-    ie = (merged['p_export_mw'] * merged['pun_eur_per_mwh'] * dt).sum()
-    cd = (merged['p_dg_mw'] * (cf * 1000 / eta_dg) * dt).sum()
-    cost_import.append(ci)
-    income_export.append(ie)
-    cost_dg.append(cd)
-    net_cost.append(ci - ie + cd)
-
-print(fmt3.format('Costo Import', *[f'{v:,.0f}' for v in cost_import]))
-print(fmt3.format('Ricavo Export', *[f'{v:,.0f}' for v in income_export]))
-print(fmt3.format('Costo DG', *[f'{v:,.0f}' for v in cost_dg]))
-print(fmt3.format('COSTO NETTO', *[f'{v:,.0f}' for v in net_cost]))
-
-# Carico totale
-load_2022 = (df_2022.loc[sched_2022_cf045.index, 'load_actual_mw'] * dt).sum()
-load_2025 = (df_2025.loc[sched_2025_cf014.index, 'load_actual_mw'] * dt).sum()
-loads = [load_2022, load_2022, load_2025, load_2025]
+# Posizioni in df_2022/df_2025 delle ore degli schedule, una volta per anno: i due scenari
+# di uno stesso anno condividono l'indice orario
+year_rows = []
+for df, scheds, cols in [(df_2022, schedules[:2], slice(0, 2)), (df_2025, schedules[2:], slice(2, 4))]:
+    idx = scheds[0].index
+    for sc in scheds[1:]:
+        if not sc.index.equals(idx):
+            raise ValueError(f'Ore diverse tra gli schedule dello stesso anno: '
+                             f'{idx.symmetric_difference(sc.index).tolist()}')
+    rows = df.index.get_indexer(idx)
+    if (rows < 0).any():
+        raise KeyError(f'Ore mancanti nei dati: {idx[rows < 0].tolist()}')
+    year_rows.append((df, rows, cols))
+
+
+def econ_kernel(p_import, p_export, price_imp, price_pun, cost_dg, load_mwh, dt):
+    """
+    Voci economiche dei 4 scenari in un solo passaggio vettoriale.
+
+    Potenze e prezzi sono matrici (n_ore, scenari) allineate per riga; cost_dg e
+    load_mwh sono vettori per scenario. Restituisce (costo import, ricavo export,
+    costo netto, costo medio EUR/MWh) come array per scenario.
+    """
+    cost_import = dt * np.einsum('hk,hk->k', p_import, price_imp)
+    income_export = dt * np.einsum('hk,hk->k', p_export, price_pun)
+    net_cost = cost_import - income_export + cost_dg
+    return cost_import, income_export, net_cost, net_cost / load_mwh
+
+
+# Prezzi di import e PUN estratti per anno con un solo slice posizionale e replicati sulle
+# colonne dei due scenari dello stesso anno -> matrici (n_ore, scenari) come S
+price_imp = np.empty_like(S['p_import_mw'])
+price_pun = np.empty_like(S['p_export_mw'])
+loads = np.empty(4)
+for df, rows, cols in year_rows:
+    prices = df[['import_price_eur_per_mwh', 'pun_eur_per_mwh']].to_numpy()[rows]
+    price_imp[:, cols] = prices[:, :1]
+    price_pun[:, cols] = prices[:, 1:]
+    # Carico totale sulle stesse righe dei prezzi; dt applicato allo scalare finale.
+    # Potenze del loader in float32: accumulo esplicito in float64
+    loads[cols] = df['load_actual_mw'].to_numpy()[rows].sum(dtype=np.float64) * dt
+
+cost_import, income_export, net_cost, cpm = econ_kernel(
+    S['p_import_mw'], S['p_export_mw'], price_imp, price_pun, dg_costs_eur, loads, dt
+)
+
+print(row3('Costo Import', cost_import, ',.0f'))
+print(row3('Ricavo Export', income_export, ',.0f'))
+print(row3('Costo DG', dg_costs_eur, ',.0f'))
+print(row3('COSTO NETTO', net_cost, ',.0f'))
 
 print()
-print(fmt3.format('Carico totale (MWh)', *[f'{v:,.0f}' for v in loads]))
-
-cpm = [net_cost[i] / loads[i] for i in range(4)]
-print(fmt3.format('Costo medio (EUR/MWh)', *[f'{v:.2f}' for v in cpm]))
+print(row3('Carico totale (MWh)', loads, ',.0f'))
+print(row3('Costo medio (EUR/MWh)', cpm, '.2f'))
 
 # ============================================================================
 # 9. CONFRONTO SINTETICO
@@ -260,16 +311,22 @@ print(fmt2.format('Parametro', '2022 (media scenari)', '2025 (media scenari)'))
 print('-' * 90)
 
 # Medie
-avg_import_22 = (schedules[0]['p_import_mw'].sum() + schedules[1]['p_import_mw'].sum()) / 2 * dt
-avg_import_25 = (schedules[2]['p_import_mw'].sum() + schedules[3]['p_import_mw'].sum()) / 2 * dt
-avg_export_22 = (schedules[0]['p_export_mw'].sum() + schedules[1]['p_export_mw'].sum()) / 2 * dt
-avg_export_25 = (schedules[2]['p_export_mw'].sum() + schedules[3]['p_export_mw'].sum()) / 2 * dt
-avg_dg_22 = (schedules[0]['p_dg_mw'].sum() + schedules[1]['p_dg_mw'].sum()) / 2 * dt
-avg_dg_25 = (schedules[2]['p_dg_mw'].sum() + schedules[3]['p_dg_mw'].sum()) / 2 * dt
-avg_cost_22 = (net_cost[0] + net_cost[1]) / 2
-avg_cost_25 = (net_cost[2] + net_cost[3]) / 2
-avg_cpm_22 = (cpm[0] + cpm[1]) / 2
-avg_cpm_25 = (cpm[2] + cpm[3]) / 2
+# Totali per scenario (una riga per grandezza) -> (grandezza, anno, cf) -> media sui due
+# cf di ogni anno con un'unica riduzione
+scenario_totals = np.array([
+    S['p_import_mw'].sum(axis=0) * dt,
+    S['p_export_mw'].sum(axis=0) * dt,
+    S['p_dg_mw'].sum(axis=0) * dt,
+    net_cost,
+    cpm,
+])
+(
+    (avg_import_22, avg_import_25),
+    (avg_export_22, avg_export_25),
+    (avg_dg_22, avg_dg_25),
+    (avg_cost_22, avg_cost_25),
+    (avg_cpm_22, avg_cpm_25),
+) = scenario_totals.reshape(-1, 2, 2).mean(axis=2)
 
 print(fmt2.format('PUN medio (EUR/MWh)', f'{pun_2022.mean():.2f}', f'{pun_2025.mean():.2f}'))
 print(fmt2.format('Import medio F1 (EUR/MWh)', f'{cfg_2022["prices"]["import_f1_eur_per_kwh"]*1000:.2f}', f'{cfg_2025["prices"]["import_f1_eur_per_kwh"]*1000:.2f}'))
@@ -0,0 +1,41 @@
+"""
+Riduzione di serie orarie lunghe per i grafici.
+
+Con savefig a 150 dpi una figura larga 12-16 pollici ha 1800-2400 pixel orizzontali:
+disegnare un anno orario (8760 punti) non aggiunge dettaglio ma solo lavoro al render.
+Usato da plot_results (_downsample) e da report (save_plots).
+"""
+
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+def minmax_envelope(
+    hours: np.ndarray,            # Asse orario
+    series: List[np.ndarray],     # Serie da ridurre (stessa lunghezza di hours)
+    max_points: int | None,       # Punti massimi per serie, None = nessuna riduzione
+) -> Tuple[np.ndarray, List[np.ndarray], int]:
+    """
+    Riduce serie lunghe a coppie (min, max) per blocco di ore consecutive.
+
+    Ogni blocco di k ore diventa due punti al centro del blocco, il minimo e il massimo,
+    cosi' l'inviluppo (picchi di prezzo, accensioni brevi) resta visibile.
+
+    Returns:
+        (asse ridotto, serie ridotte, ore per blocco k); se len(hours) <= max_points
+        ritorna gli ingressi invariati con k = 1
+    """
+    n = len(hours)
+    if max_points is None or n <= max_points:
+        return hours, series, 1
+
+    k = -(-n // (max_points // 2))               # Ore per blocco (2 punti per blocco)
+    starts = np.arange(0, n, k)                  # Inizio di ogni blocco (l'ultimo puo' essere corto)
+    counts = np.diff(np.append(starts, n))
+    centers = np.add.reduceat(hours, starts, dtype=float) / counts
+    reduced = [np.column_stack([np.minimum.reduceat(v, starts),
+                                np.maximum.reduceat(v, starts)]).ravel() for v in series]
+    return np.repeat(centers, 2), reduced, k
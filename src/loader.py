@@ -15,15 +15,24 @@ I dati di input provengono da:
 
 from __future__ import annotations
 
+import hashlib
+import json
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Callable, Dict, Iterable, Tuple
 
 import numpy as np
 import pandas as pd
 from scipy.io import loadmat  # Per caricare file MATLAB .mat
 
-from tariff import build_hourly_index, tariff_f1_f2_f3
+import tariff
+
+
+# Tipo delle serie di potenza (PV, eolico, carico) restituite dal loader. I prezzi
+# restano in float64: le tariffe F1/F2/F3 non sono rappresentabili esattamente in
+# float32 e l'errore si vedrebbe sui costi annui.
+SERIES_DTYPE = np.float32
 
 
 @dataclass
@@ -41,19 +50,87 @@ class SeriesBundle:
     meta: Dict[str, float]
 
 
+def _mirror_path(path: Path) -> Path:
+    """Copia .npz affiancata al file .mat (es. PUN_2022.mat -> PUN_2022.mat.npz)."""
+    return path.with_name(path.name + '.npz')
+
+
+def _read_mat_mirror(path: Path) -> Dict[str, np.ndarray] | None:
+    """
+    Legge la copia .npz del file .mat, se esiste ed e' piu' recente del .mat.
+
+    Returns:
+        Dizionario {nome_variabile: array}, oppure None se la copia manca o e' obsoleta
+    """
+    mirror = _mirror_path(path)
+    try:
+        if mirror.stat().st_mtime_ns < path.stat().st_mtime_ns:
+            return None
+        with np.load(mirror, allow_pickle=False) as npz:
+            return {k: npz[k] for k in npz.files}
+    except (OSError, ValueError):
+        return None
+
+
+def _write_mat_mirror(path: Path, data: Dict[str, object]) -> None:
+    """
+    Salva le variabili del .mat in una copia .npz non compressa.
+
+    Viene scritta solo se tutte le variabili sono array numerici (niente struct
+    MATLAB o oggetti). Gli errori di scrittura (cartella in sola lettura) sono
+    ignorati: la copia e' solo un'accelerazione.
+    """
+    if not all(isinstance(v, np.ndarray) and v.dtype.kind in 'biuf' for v in data.values()):
+        return
+    mirror = _mirror_path(path)
+    tmp = mirror.with_name(mirror.name + '.tmp')
+    try:
+        with open(tmp, 'wb') as fh:
+            np.savez(fh, **data)
+        tmp.replace(mirror)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+@lru_cache(maxsize=8)
+def _load_mat_cached(path: str, mtime_ns: int) -> Dict[str, np.ndarray]:
+    """
+    Lettura effettiva del file .mat, memorizzata per (percorso, mtime).
+
+    Al primo caricamento le variabili vengono salvate in una copia .npz accanto
+    al file: le esecuzioni successive leggono direttamente gli array binari
+    senza ri-parsare il contenitore MATLAB.
+
+    Gli array restituiti sono in sola lettura: sono condivisi tra tutte le
+    chiamate che leggono lo stesso file (ad es. RES e carico per 2022 e 2025).
+    """
+    out = _read_mat_mirror(Path(path))
+    if out is None:
+        data = loadmat(path, squeeze_me=True, struct_as_record=False)
+        # Filtra le variabili di sistema MATLAB (iniziano con '__')
+        out = {k: v for k, v in data.items() if not k.startswith('__')}
+        _write_mat_mirror(Path(path), out)
+    for v in out.values():
+        if isinstance(v, np.ndarray):
+            v.setflags(write=False)
+    return out
+
+
 def _load_mat(path: Path) -> Dict[str, np.ndarray]:
     """
     Carica un file MATLAB .mat e restituisce le variabili come dizionario.
 
+    Il parsing viene fatto una sola volta per file: le chiamate successive
+    riusano il risultato finche' il file non viene modificato (mtime).
+
     Args:
         path: Percorso del file .mat
 
     Returns:
         Dizionario {nome_variabile: array} escludendo le variabili di sistema (__*)
     """
-    data = loadmat(path, squeeze_me=True, struct_as_record=False)
-    # Filtra le variabili di sistema MATLAB (iniziano con '__')
-    return {k: v for k, v in data.items() if not k.startswith('__')}
+    path = Path(path).resolve()
+    return dict(_load_mat_cached(str(path), path.stat().st_mtime_ns))
 
 
 def _normalize_hours(hours: np.ndarray) -> np.ndarray:
@@ -70,19 +147,64 @@ def _normalize_hours(hours: np.ndarray) -> np.ndarray:
     Returns:
         Array normalizzato con indici orari sequenziali 0-based
     """
-    hours = np.asarray(hours).astype(int)
+    # Copia unica (anche se l'input e' gia' int64): la sottrazione sotto e' in-place
+    hours = np.array(hours, dtype=np.int64)
+    lo, hi = hours.min(), hours.max()
 
     # Caso 1: indici 1-based -> converte a 0-based
-    if hours.min() == 1:
-        hours = hours - 1
+    if lo == 1:
+        np.subtract(hours, 1, out=hours)
+        hi -= 1
 
     # Caso 2: solo ora del giorno (0-23) ripetuta -> ricostruisce sequenza
-    if hours.max() <= 23 and len(hours) > 24:
+    if hi <= 23 and len(hours) > 24:
         hours = np.arange(len(hours), dtype=int)
 
     return hours
 
 
+def _align_load_hours(
+    n_hours: int,
+    load_hours: np.ndarray,
+    load_cols: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Allinea le colonne del carico sulle ore RES 0..n_hours-1.
+
+    Le ore RES coincidono con la posizione di riga, quindi l'allineamento e'
+    un'indicizzazione diretta invece di un join tra DataFrame. Nel caso tipico
+    (ore del carico gia' sequenziali da 0) le colonne sono usate cosi' come sono.
+
+    Args:
+        n_hours: Numero di ore della serie RES
+        load_hours: Ore normalizzate del profilo di carico
+        load_cols: Colonne del carico [n_ore_carico, k]
+
+    Returns:
+        (has_load, load_mw): maschera delle ore RES con dati di carico e colonne
+        del carico su n_hours righe (NaN dove manca il dato)
+    """
+    m = len(load_hours)
+    if m <= n_hours and np.array_equal(load_hours, np.arange(m)):
+        # Caso sequenziale: le prime m ore hanno il carico, le altre no
+        has_load = np.zeros(n_hours, dtype=bool)
+        has_load[:m] = True
+        if m == n_hours:
+            return has_load, load_cols
+        load_mw = np.full((n_hours, load_cols.shape[1]), np.nan, dtype=load_cols.dtype)
+        load_mw[:m] = load_cols
+        return has_load, load_mw
+
+    if len(np.unique(load_hours)) != m:
+        raise ValueError('Ore duplicate nel profilo di carico')
+    in_range = (load_hours >= 0) & (load_hours < n_hours)
+    has_load = np.zeros(n_hours, dtype=bool)
+    has_load[load_hours[in_range]] = True
+    load_mw = np.full((n_hours, load_cols.shape[1]), np.nan, dtype=load_cols.dtype)
+    load_mw[load_hours[in_range]] = load_cols[in_range]
+    return has_load, load_mw
+
+
 def _build_import_price_series(cfg: dict, hours: np.ndarray) -> np.ndarray:
     """
     Costruisce la serie dei prezzi di acquisto dalla rete.
@@ -108,8 +230,8 @@ def _build_import_price_series(cfg: dict, hours: np.ndarray) -> np.ndarray:
     if use_schedule:
         # Usa il calendario ARERA con festivita' italiane
         year = int(cfg['project'].get('year', 2022))
-        timestamps = build_hourly_index(year, hours)  # Converte ore in datetime
-        prices = tariff_f1_f2_f3(timestamps, f1, f2, f3)  # Assegna fascia a ogni ora
+        timestamps = tariff.build_hourly_index(year, hours)  # Converte ore in datetime
+        prices = tariff.tariff_f1_f2_f3(timestamps, f1, f2, f3)  # Assegna fascia a ogni ora
     else:
         # Usa semplicemente la media delle tre fasce
         avg = (f1 + f2 + f3) / 3.0
@@ -143,10 +265,11 @@ def load_timeseries(data_dir: Path, cfg: dict) -> SeriesBundle:
     load = _load_mat(data_dir / 'buildings_load.mat')  # Carico edifici [kW]
     pun = _load_mat(data_dir / 'PUN_2022.mat')         # Prezzo Unico Nazionale [EUR/MWh]
 
-    # Estrazione arrays dai file caricati
-    p_pv = np.asarray(res['P_pv'], dtype=float)    # [n_ore, 2] = [forecast, actual] in p.u.
-    p_w = np.asarray(res['P_w'], dtype=float)      # [n_ore, 2] = [forecast, actual] in p.u.
-    pul = np.asarray(load['Pul'], dtype=float)     # [n_ore, 3] = [ora, forecast, actual] in kW
+    # Estrazione arrays dai file caricati (potenze in float32: precisione ampiamente
+    # sufficiente, meta' della memoria attraversata da somme e prodotti)
+    p_pv = np.asarray(res['P_pv'], dtype=SERIES_DTYPE)    # [n_ore, 2] = [forecast, actual] in p.u.
+    p_w = np.asarray(res['P_w'], dtype=SERIES_DTYPE)      # [n_ore, 2] = [forecast, actual] in p.u.
+    pul = np.asarray(load['Pul'], dtype=SERIES_DTYPE)     # [n_ore, 3] = [ora, forecast, actual] in kW
     price = np.asarray(pun['pun'], dtype=float).reshape(-1)  # [n_ore] in EUR/MWh
 
     # ==================== PARAMETRI DI SCALA ====================
@@ -165,19 +288,6 @@ def load_timeseries(data_dir: Path, cfg: dict) -> SeriesBundle:
     hours_all = np.arange(p_pv.shape[0], dtype=int)  # Indice orario per RES/PUN
     load_hours = _normalize_hours(pul[:, 0])          # Indice orario per carico (normalizzato)
 
-    # ==================== DATAFRAME ANNUALE (RES + PUN) ====================
-
-    df_year = pd.DataFrame(
-        {
-            'hour': hours_all,
-            'pv_forecast_mw': p_pv[:, 0] * pv_nom,    # PV forecast [MW] = p.u. * nominale
-            'pv_actual_mw': p_pv[:, 1] * pv_nom,      # PV actual [MW]
-            'wind_forecast_mw': p_w[:, 0] * wind_nom, # Wind forecast [MW]
-            'wind_actual_mw': p_w[:, 1] * wind_nom,   # Wind actual [MW]
-            'pun_eur_per_mwh': price,                 # PUN [EUR/MWh]
-        }
-    ).set_index('hour')
-
     # ==================== SCALATURA CARICO ====================
 
     # Conversione da kW a MW
@@ -190,24 +300,32 @@ def load_timeseries(data_dir: Path, cfg: dict) -> SeriesBundle:
         peak = float(np.max(load_actual_mw))
         load_scale = load_nom_mw / peak if peak > 0 else 1.0
 
-    # Applica il fattore di scala
-    df_load = pd.DataFrame(
-        {
-            'hour': load_hours,
-            'load_forecast_mw': load_forecast_mw * load_scale,  # Carico forecast scalato [MW]
-            'load_actual_mw': load_actual_mw * load_scale,      # Carico actual scalato [MW]
-        }
-    ).set_index('hour')
+    # ==================== ALLINEAMENTO ORE RES / CARICO ====================
 
-    # ==================== UNIONE DATAFRAME ====================
+    has_load, load_mw = _align_load_hours(
+        len(hours_all), load_hours, np.column_stack([load_forecast_mw, load_actual_mw]) * load_scale
+    )
 
     use_full_year = bool(cfg['project'].get('use_full_year', False))
-    if use_full_year:
-        # Left join: mantiene tutte le ore del RES (anno intero)
-        df = df_year.join(df_load, how='left')
-    else:
-        # Inner join: mantiene solo le ore con dati di carico
-        df = df_year.join(df_load, how='inner')
+    # Anno intero: tutte le ore del RES (carico NaN dove manca)
+    # Altrimenti: solo le ore con dati di carico
+    rows = hours_all if use_full_year else hours_all[has_load]
+
+    # ==================== DATAFRAME (RES + PUN + CARICO) ====================
+
+    df = pd.DataFrame(
+        {
+            'pv_forecast_mw': p_pv[rows, 0] * pv_nom,      # PV forecast [MW] = p.u. * nominale
+            'pv_actual_mw': p_pv[rows, 1] * pv_nom,        # PV actual [MW]
+            'wind_forecast_mw': p_w[rows, 0] * wind_nom,   # Wind forecast [MW]
+            'wind_actual_mw': p_w[rows, 1] * wind_nom,     # Wind actual [MW]
+            'pun_eur_per_mwh': price[rows],                # PUN [EUR/MWh]
+            'load_forecast_mw': load_mw[rows, 0],          # Carico forecast scalato [MW]
+            'load_actual_mw': load_mw[rows, 1],            # Carico actual scalato [MW]
+        },
+        index=pd.Index(rows, name='hour'),
+        copy=False,  # Array appena creati: nessuna copia difensiva
+    )
 
     # ==================== PREZZI DI IMPORT ====================
 
@@ -244,16 +362,108 @@ def add_net_load(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame con le nuove colonne net_load_forecast_mw e net_load_actual_mw
     """
-    df = df.copy()
+    # Colonne (load, pv, wind) per forecast e actual in un unico blocco (n, 2, 3):
+    # somma e differenza scrivono direttamente nell'array di uscita, senza Series intermedie
+    block = df[['load_forecast_mw', 'pv_forecast_mw', 'wind_forecast_mw',
+                'load_actual_mw', 'pv_actual_mw', 'wind_actual_mw']].to_numpy()
+    block = block.reshape(len(df), 2, 3)
+    # Uscita (2, n): ogni riga e' contigua e diventa direttamente una colonna
+    net = np.empty((2, len(df)), dtype=block.dtype)
+    np.add(block[:, :, 1].T, block[:, :, 2].T, out=net)    # pv + wind
+    np.subtract(block[:, :, 0].T, net, out=net)            # load - (pv + wind)
+
+    # Con Copy-on-Write (default in pandas 3) assign condivide le colonne originali:
+    # vengono allocate solo le due colonne nette
+    return df.assign(net_load_forecast_mw=net[0], net_load_actual_mw=net[1])
+
+
+# Tipi delle colonne dei CSV di scheduling prodotti dall'MPC (run_mpc_full / run_test_2025).
+# Le potenze sono lette in float32: la risoluzione (~kW) e' ampiamente sufficiente per
+# grafici e report, e dimezza la memoria attraversata da somme e medie.
+SCHEDULE_DTYPES = {
+    'hour': 'int32',
+    'p_import_mw': 'float32',
+    'p_export_mw': 'float32',
+    'p_ely_mw': 'float32',
+    'p_fc_mw': 'float32',
+    'p_dg_mw': 'float32',
+    'p_curt_mw': 'float32',
+    'soc_mwh': 'float32',
+    'objective_eur': 'float64',
+}
+
+
+def read_schedule(path: Path) -> pd.DataFrame:
+    """
+    Legge uno scheduling MPC (CSV o Parquet) con tipi espliciti e indice orario.
 
-    # Carico netto previsto
-    df['net_load_forecast_mw'] = df['load_forecast_mw'] - (
-        df['pv_forecast_mw'] + df['wind_forecast_mw']
-    )
+    Con i dtype dichiarati il parser non deve inferire i tipi delle colonne.
+    Le colonne non presenti in SCHEDULE_DTYPES sono lette con i tipi di default.
+    I file .parquet (scritti da run_mpc_full con --out *.parquet) sono gia' tipizzati
+    e indicizzati per ora: si leggono a colonne senza parsing del testo (richiede pyarrow).
 
-    # Carico netto effettivo
-    df['net_load_actual_mw'] = df['load_actual_mw'] - (
-        df['pv_actual_mw'] + df['wind_actual_mw']
-    )
+    Args:
+        path: Percorso del file CSV/Parquet (colonna 'hour' + potenze [MW] e SOC [MWh])
+
+    Returns:
+        DataFrame con indice = ora
+    """
+    if Path(path).suffix == '.parquet':
+        schedule = pd.read_parquet(path)
+        dtypes = {c: t for c, t in SCHEDULE_DTYPES.items() if c in schedule.columns}
+        return schedule.astype(dtypes)
+    return pd.read_csv(path, dtype=SCHEDULE_DTYPES).set_index('hour')
+
+
+# Moduli da cui dipendono i dati caricati: una loro modifica invalida la cache
+_CACHE_MODULES = (Path(__file__), Path(tariff.__file__))
+
+
+def _cache_key(cfg: dict, sources: Iterable[Path]) -> str:
+    """
+    Chiave di invalidazione della cache: hash della configurazione e dei file sorgente.
+
+    Per ogni file (inclusi i .mat, questo modulo e tariff.py, da cui load_timeseries
+    prende i prezzi di import) si usano percorso, dimensione e data di modifica:
+    se uno di questi cambia la cache viene ricostruita.
+    """
+    h = hashlib.sha256(json.dumps(cfg, sort_keys=True, default=str).encode('utf-8'))
+    for src in [*_CACHE_MODULES, *sources]:
+        st = Path(src).stat()
+        h.update(f'{Path(src).as_posix()}:{st.st_size}:{st.st_mtime_ns}'.encode('utf-8'))
+    return h.hexdigest()
+
+
+def cached_net_load(
+    cache_path: Path,                         # File di cache (pickle) da leggere/scrivere
+    cfg: dict,                                # Configurazione usata per caricare i dati
+    sources: Iterable[Path],                  # File di input da cui dipendono i dati
+    build: Callable[[], SeriesBundle],        # Caricamento dei dati se la cache non e' valida
+) -> pd.DataFrame:
+    """
+    Restituisce build().data con il carico netto, riusando una cache su disco.
+
+    Evita di ri-parsare i file .mat quando piu' script (grafici, tabelle)
+    lavorano sugli stessi dati. La cache e' valida finche' non cambiano la
+    configurazione o i file sorgente (vedi _cache_key).
+
+    Args:
+        cache_path: Percorso del file di cache
+        cfg: Dizionario di configurazione
+        sources: File di input (.mat, moduli di caricamento) da monitorare
+        build: Funzione che carica il SeriesBundle da zero
+
+    Returns:
+        DataFrame equivalente a add_net_load(build().data)
+    """
+    key = _cache_key(cfg, sources)
+
+    if cache_path.exists():
+        cached = pd.read_pickle(cache_path)
+        if cached.get('key') == key:
+            return cached['data']
 
+    df = add_net_load(build().data)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    pd.to_pickle({'key': key, 'data': df}, cache_path)
     return df
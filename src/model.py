@@ -16,9 +16,12 @@ L'obiettivo e' minimizzare i costi operativi soddisfacendo il carico richiesto.
 
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Dict
-import shutil
+from functools import lru_cache
+import multiprocessing
+import warnings
+from typing import Dict, List, Sequence
 
 import cvxpy as cp
 import numpy as np
@@ -30,6 +33,13 @@ try:
 except Exception:  # pragma: no cover - optional dependency
     pulp = None
 
+# Importazione opzionale dei binding Python di HiGHS (modello passato direttamente al solver)
+try:
+    import highspy
+    from scipy import sparse
+except Exception:  # pragma: no cover - optional dependency
+    highspy = None
+
 
 @dataclass
 class MPCResult:
@@ -45,149 +55,882 @@ class MPCResult:
     objective_value: float
 
 
-def _solve_with_pulp(
+# Colonne dello schedule restituito dai solver (potenze [MW] e stato di carica [MWh])
+_SCHEDULE_COLUMNS = ['p_import_mw', 'p_export_mw', 'p_ely_mw', 'p_fc_mw', 'p_dg_mw', 'p_curt_mw', 'soc_mwh']
+
+# Soglia [MW] oltre la quale un'unita' e' considerata accesa nel warm start
+_ON_TOL_MW = 1e-6
+
+
+def _warm_start_values(
+    warm_start: MPCResult,   # Risultato della finestra precedente
+    idx: np.ndarray,         # Ore della finestra corrente
+    soc_init_mwh: float,     # Stato di carica iniziale della finestra corrente [MWh]
+) -> Dict[str, np.ndarray] | None:
+    """
+    Soluzione iniziale per la finestra corrente ricavata da quella precedente.
+
+    Lo schedule precedente viene riallineato sulle ore correnti (spostamento di un
+    passo nel receding horizon) e l'ultima ora viene ripetuta. Gli stati on/off
+    sono dedotti dalle potenze. Ritorna None se le finestre non si sovrappongono.
+
+    Returns:
+        Dizionario {nome_variabile: valori} con le stesse chiavi delle variabili del modello
+    """
+    prev = warm_start.schedule.reindex(idx).ffill()
+    if prev.isna().to_numpy().any():
+        return None
+
+    # Potenze riportate a >= 0: i solver restituiscono residui dell'ordine di -1e-15
+    values = {name: np.maximum(prev[f'{name}_mw'].to_numpy(dtype=float), 0.0)
+              for name in ('p_import', 'p_export', 'p_ely', 'p_fc', 'p_dg', 'p_curt')}
+    for unit in ('import', 'export', 'ely', 'fc', 'dg'):
+        values[f'u_{unit}'] = (values[f'p_{unit}'] > _ON_TOL_MW).astype(float)
+    values['soc'] = np.concatenate([[soc_init_mwh], prev['soc_mwh'].to_numpy(dtype=float)])
+    return values
+
+
+def _step_durations(dt: float | tuple, n: int) -> np.ndarray:
+    """Durata [ore] di ciascuno degli n passi del modello: dt costante o una per passo."""
+    return np.broadcast_to(np.asarray(dt, dtype=float), (n,))
+
+
+# Ore iniziali della finestra sempre risolte con passo orario (la parte che viene eseguita)
+_TAIL_START_H = 24
+
+
+def _tail_blocks(horizon_h: int, tail_aggregation: int) -> np.ndarray | None:
+    """
+    Numero di ore di ciascun passo del modello con la coda dell'orizzonte aggregata.
+
+    Le prime _TAIL_START_H ore restano orarie; le successive sono raggruppate in blocchi
+    di tail_aggregation ore (l'ultimo blocco puo' essere piu' corto). Ritorna None se
+    non c'e' nulla da aggregare.
+    """
+    if tail_aggregation <= 1 or horizon_h <= _TAIL_START_H + 1:
+        return None
+    tail = horizon_h - _TAIL_START_H
+    blocks = [tail_aggregation] * (tail // tail_aggregation)
+    if tail % tail_aggregation:
+        blocks.append(tail % tail_aggregation)
+    return np.array([1] * _TAIL_START_H + blocks)
+
+
+def _expand_blocks(
+    result: MPCResult,     # Risultato del modello aggregato (un passo per blocco)
+    counts: np.ndarray,    # Ore di ciascun blocco (vedi _tail_blocks)
+    dt: float,             # Passo temporale orario [ore]
+    sp: SystemParams,      # Parametri di sistema gia' convertiti in float
+    soc_init_mwh: float,   # Stato di carica iniziale [MWh]
+) -> MPCResult:
+    """
+    Riporta su base oraria lo schedule del modello aggregato.
+
+    Le potenze di un blocco sono ripetute su ciascuna delle sue ore e lo stato di carica
+    e' ricalcolato ora per ora dalla dinamica dello storage: coincide con quello del
+    modello alla fine di ogni blocco. L'obiettivo resta quello del modello aggregato.
+    """
+    out = np.repeat(result.schedule.to_numpy(), counts, axis=0)
+    flow = dt * (sp.eta_ely * out[:, 2] - (1.0 / sp.eta_fc) * out[:, 3])
+    out[:, 6] = soc_init_mwh + np.cumsum(flow)
+    schedule = pd.DataFrame(out, index=pd.Index(np.arange(len(out)), name='hour'),
+                            columns=_SCHEDULE_COLUMNS)
+    return MPCResult(schedule=schedule, objective_value=result.objective_value)
+
+
+def _greedy_dispatch(
     load: np.ndarray,           # Carico elettrico richiesto [MW] per ogni ora
     pv: np.ndarray,             # Produzione fotovoltaica prevista [MW]
     wind: np.ndarray,           # Produzione eolica prevista [MW]
     import_price: np.ndarray,   # Prezzo di acquisto dalla rete [EUR/MWh]
-    export_price: np.ndarray,   # Prezzo di vendita alla rete (PUN) [EUR/MWh]
-    cfg: dict,                  # Configurazione del sistema
+    sp: SystemParams,           # Parametri di sistema gia' convertiti in float
     soc_init_mwh: float,        # Stato di carica iniziale dello storage [MWh]
     fuel_price: float,          # Prezzo del combustibile diesel [EUR/MWh]
-    dt: float,                  # Passo temporale [ore]
-) -> MPCResult | None:
+    dt: float | tuple,          # Passo temporale [ore], o durata di ogni passo (vedi _tail_blocks)
+) -> Dict[str, np.ndarray]:
     """
-    Risolve il problema di ottimizzazione usando PuLP come solver.
+    Soluzione iniziale euristica (dispatch greedy ora per ora, senza LP).
 
-    Questa funzione e' un'alternativa al solver CVXPY e viene usata se disponibile
-    il solver CBC (o Gurobi/HiGHS).
+    Per ogni ora si copre il carico netto (carico - PV - eolico) in ordine di merito:
+    - surplus: elettrolizzatore (fino allo spazio nello storage), poi export, poi curtailment
+    - deficit: fuel cell (fino all'H2 disponibile), poi la piu' economica tra import e
+      diesel; l'eventuale eccesso dovuto alla potenza minima del diesel va in curtailment
+    Serve come punto di partenza del branch-and-bound quando manca la finestra precedente.
 
-    Ritorna None se PuLP o CBC non sono disponibili.
+    Returns:
+        Dizionario {nome_variabile: valori} nello stesso formato di _warm_start_values
     """
-    # Verifica disponibilita' di PuLP e del solver CBC
-    if pulp is None or shutil.which('cbc') is None:
-        return None
+    H = len(load)
+    net = (np.asarray(load, dtype=float) - np.asarray(pv, dtype=float)
+           - np.asarray(wind, dtype=float)).tolist()
+    import_cheaper = (np.asarray(import_price, dtype=float) <= fuel_price / sp.eta_dg).tolist()
+    steps = _step_durations(dt, H)
+    k_ely = (steps * sp.eta_ely).tolist()          # MWh di H2 per MW assorbito dall'elettrolizzatore
+    k_fc = (steps * (1.0 / sp.eta_fc)).tolist()    # MWh di H2 per MW prodotto dalla fuel cell
+
+    out = np.zeros((7, H))  # Righe: p_import, p_export, p_ely, p_fc, p_dg, p_curt, soc
+    soc = float(soc_init_mwh)
+    for t in range(H):
+        imp = exp = ely = fc = dg = curt = 0.0
+        if net[t] < 0.0:
+            surplus = -net[t]
+            ely = min(surplus, sp.ely_nom_mw, (sp.h2_storage_mwh - soc) / k_ely[t])
+            if ely < sp.ely_min_mw:
+                ely = 0.0
+            exp = min(surplus - ely, sp.export_max_mw)
+            curt = surplus - ely - exp
+        else:
+            deficit = net[t]
+            fc = min(deficit, sp.fc_nom_mw, soc / k_fc[t])
+            if fc < sp.fc_min_mw:
+                fc = 0.0
+            rest = deficit - fc
+            if rest > 0.0:
+                if import_cheaper[t] or rest < sp.dg_min_mw:
+                    imp = min(rest, sp.import_max_mw)
+                    if rest - imp > 0.0:
+                        dg = min(max(rest - imp, sp.dg_min_mw), sp.dg_nom_mw)
+                else:
+                    dg = min(rest, sp.dg_nom_mw)
+                    imp = min(rest - dg, sp.import_max_mw)
+                curt = max(imp + dg - rest, 0.0)
+        soc = min(max(soc + k_ely[t] * ely - k_fc[t] * fc, 0.0), sp.h2_storage_mwh)
+        out[:, t] = (imp, exp, ely, fc, dg, curt, soc)
+
+    values = dict(zip(('p_import', 'p_export', 'p_ely', 'p_fc', 'p_dg', 'p_curt'), out[:6]))
+    for unit in ('import', 'export', 'ely', 'fc', 'dg'):
+        values[f'u_{unit}'] = (values[f'p_{unit}'] > _ON_TOL_MW).astype(float)
+    values['soc'] = np.concatenate([[soc_init_mwh], out[6]])
+    return values
+
+
+def _easy_hour_u_max(
+    load: np.ndarray,   # Carico elettrico richiesto [MW] per ogni ora
+    pv: np.ndarray,     # Produzione fotovoltaica prevista [MW]
+    wind: np.ndarray,   # Produzione eolica prevista [MW]
+    sp: SystemParams,   # Parametri di sistema gia' convertiti in float
+) -> Dict[str, np.ndarray]:
+    """
+    Limiti superiori dei binari on/off che fissano a spento le unita' nelle ore "facili".
 
-    # Estrazione parametri di sistema dalla configurazione
-    sys = cfg['system']
-    horizon_h = len(load)  # Lunghezza dell'orizzonte di ottimizzazione [ore]
-    eta_dg = float(sys.get('eta_dg', 0.6))  # Efficienza del generatore diesel [0-1]
+    - surplus RES oltre la potenza minima dell'elettrolizzatore: diesel e fuel cell spenti
+    - deficit oltre meta' della potenza nominale del diesel: elettrolizzatore spento
+    Le ore restanti mantengono il limite 1 e sono le sole su cui il branch-and-bound decide.
+    Non si fissano unita' accese (es. u_ely=1 nel surplus): con lo storage pieno il
+    problema diventerebbe infeasible, mentre spegnere un'unita' e' sempre ammissibile.
+    E' un'euristica (es. esclude l'arbitraggio diesel -> export nelle ore di surplus),
+    attivata da project.binary_fixing.
+
+    Returns:
+        Dizionario {nome_binario: limite superiore 0/1 per ora} per u_dg, u_fc, u_ely
+    """
+    surplus = (np.asarray(pv, dtype=float) + np.asarray(wind, dtype=float)
+               - np.asarray(load, dtype=float))
+    on_surplus = np.where(surplus > sp.ely_min_mw, 0.0, 1.0)
+    return {
+        'u_dg': on_surplus,
+        'u_fc': on_surplus.copy(),
+        'u_ely': np.where(surplus < -0.5 * sp.dg_nom_mw, 0.0, 1.0),
+    }
+
+
+# Scostamento relativo massimo dal bound LP per accettare la soluzione arrotondata
+_ROUNDING_GAP = 1e-4
+
+
+def _solve_relax_and_fix(prob, solver, binaries: list, powers: list, tol: float = 1e-6) -> None:
+    """
+    Risolve il MILP partendo dal rilassamento continuo, evitando il branch-and-bound se possibile.
+
+    1. Risolve il rilassamento LP (binari continui in [0, 1])
+    2. Arrotondamento: ogni binario vale 1 se la sua potenza nel rilassamento e' > tol
+       (unita' accesa, anche se il binario e' frazionario), altrimenti 0. Con tutti i
+       binari fissati resta un LP: se e' ammissibile e il costo e' entro _ROUNDING_GAP
+       dal bound del rilassamento la soluzione e' accettata senza branch-and-bound
+    3. Altrimenti fissa ai valori arrotondati i soli binari gia' interi (entro tol)
+       nel rilassamento e risolve il MILP residuo sui binari frazionari
+
+    E' un'euristica: se il MILP ristretto non risulta ottimo (es. infeasible)
+    i binari vengono liberati e si risolve il problema completo.
+    powers[i] e' la variabile di potenza comandata da binaries[i].
+    """
+    for v in binaries:
+        v.cat = pulp.LpContinuous
+    prob.solve(solver)
+    relaxed_ok = prob.status == pulp.LpStatusOptimal
+    relaxed = [v.varValue for v in binaries]
+    bounds = [(v.lowBound, v.upBound) for v in binaries]
+
+    if relaxed_ok:
+        lp_bound = pulp.value(prob.objective)
+        for v, p, (lo, up) in zip(binaries, powers, bounds):
+            x = 1 if (p.varValue or 0.0) > tol else 0
+            x = min(max(x, lo), up)
+            v.bounds(x, x)
+        prob.solve(solver)
+        if (prob.status == pulp.LpStatusOptimal
+                and pulp.value(prob.objective) <= lp_bound + _ROUNDING_GAP * max(1.0, abs(lp_bound))):
+            for v in binaries:
+                v.cat = pulp.LpInteger
+            return
+        for v, (lo, up) in zip(binaries, bounds):
+            v.bounds(lo, up)
+
+    fixed = []
+    for v, x, (lo, up) in zip(binaries, relaxed, bounds):
+        v.cat = pulp.LpInteger  # Binario = intero con bound [0, 1]
+        if relaxed_ok and x is not None and abs(x - round(x)) <= tol:
+            v.bounds(round(x), round(x))
+            v.setInitialValue(round(x))
+            fixed.append((v, lo, up))
+
+    prob.solve(solver)
+    if fixed and prob.status != pulp.LpStatusOptimal:
+        for v, lo, up in fixed:
+            v.bounds(lo, up)
+        prob.solve(solver)
+
+
+def _lp_con(terms, sense, rhs: float = 0.0):
+    """Vincolo lineare PuLP sum(coef * var) <sense> rhs da una lista di coppie (variabile, coefficiente)."""
+    return pulp.LpConstraint(pulp.LpAffineExpression(terms), sense, rhs=rhs)
+
+
+@dataclass(frozen=True, slots=True)
+class SystemParams:
+    """
+    Parametri fisici del sistema (sezione 'system' della configurazione) gia' in float.
+
+    Costruito una volta per chiamata di solve_horizon: i modelli leggono attributi
+    invece di ripetere lookup nel dizionario e conversioni float(). Essendo frozen
+    e hashable fa anche da chiave della cache dei problemi CVXPY.
+    """
+    import_max_mw: float   # Massima potenza importabile [MW]
+    export_max_mw: float   # Massima potenza esportabile [MW]
+    ely_nom_mw: float      # Potenza nominale elettrolizzatore [MW]
+    ely_min_mw: float      # Potenza minima tecnica elettrolizzatore [MW]
+    eta_ely: float         # Efficienza elettrolizzatore [0-1]
+    fc_nom_mw: float       # Potenza nominale fuel cell [MW]
+    fc_min_mw: float       # Potenza minima tecnica fuel cell [MW]
+    eta_fc: float          # Efficienza fuel cell [0-1]
+    h2_storage_mwh: float  # Capacita' storage idrogeno [MWh]
+    dg_nom_mw: float       # Potenza nominale generatore diesel [MW]
+    dg_min_mw: float       # Potenza minima tecnica generatore diesel [MW]
+    eta_dg: float          # Efficienza generatore diesel [0-1]
+
+    @classmethod
+    def from_config(cls, sys: dict) -> SystemParams:
+        """Converte la sezione 'system' della configurazione (eta_dg opzionale, default 0.6)."""
+        return cls(
+            import_max_mw=float(sys['import_max_mw']),
+            export_max_mw=float(sys['export_max_mw']),
+            ely_nom_mw=float(sys['ely_nom_mw']),
+            ely_min_mw=float(sys['ely_min_mw']),
+            eta_ely=float(sys['eta_ely']),
+            fc_nom_mw=float(sys['fc_nom_mw']),
+            fc_min_mw=float(sys['fc_min_mw']),
+            eta_fc=float(sys['eta_fc']),
+            h2_storage_mwh=float(sys['h2_storage_mwh']),
+            dg_nom_mw=float(sys['dg_nom_mw']),
+            dg_min_mw=float(sys['dg_min_mw']),
+            eta_dg=float(sys.get('eta_dg', 0.6)),
+        )
+
+
+# Solver PuLP gia' scelti, per uso del warm start (None = nessun solver disponibile)
+_PULP_SOLVERS: Dict[bool, object] = {}
+
+
+def _pulp_solver(warm_start: bool):
+    """
+    Restituisce il solver PuLP da usare, scegliendolo alla prima chiamata.
+
+    Ordine di preferenza: HiGHS in-process (libreria highspy: nessun sottoprocesso
+    ne' file .lp/.sol su disco ad ogni solve) -> Gurobi -> CBC (fallback).
+    La disponibilita' (libreria, licenza Gurobi, eseguibile CBC) e' verificata con
+    available() una sola volta: i costruttori non falliscono se il solver manca.
+
+    Returns:
+        Solver PuLP, o None se nessuno e' disponibile
+    """
+    if warm_start not in _PULP_SOLVERS:
+        factories = (
+            ('HiGHS', lambda: pulp.HiGHS(msg=False, threads=1)),
+            ('Gurobi', lambda: pulp.GUROBI(msg=False, warmStart=warm_start)),
+            ('CBC', lambda: pulp.PULP_CBC_CMD(msg=False, warmStart=warm_start)),
+        )
+        solver = None
+        for name, factory in factories:
+            try:
+                candidate = factory()
+                if candidate.available():
+                    solver = candidate
+                    break
+            except (pulp.PulpSolverError, OSError) as exc:
+                # Solver installato ma non utilizzabile (licenza, libreria): si passa al
+                # successivo segnalando il motivo invece di scartarlo in silenzio
+                warnings.warn(f'Solver PuLP {name} non utilizzabile, provo il successivo: {exc}')
+        _PULP_SOLVERS[warm_start] = solver
+    return _PULP_SOLVERS[warm_start]
+
+
+# Solver MILP di CVXPY in ordine di preferenza
+_CVXPY_MILP_SOLVERS = (cp.GUROBI, cp.CBC, cp.HIGHS, cp.ECOS_BB)
+
+
+@lru_cache(maxsize=None)
+def _cvxpy_solver() -> str | None:
+    """Primo solver MILP installato per CVXPY (verificato una volta), None se nessuno."""
+    installed = set(cp.installed_solvers())
+    return next((s for s in _CVXPY_MILP_SOLVERS if s in installed), None)
+
+
+# Modelli PuLP gia' costruiti, per (orizzonte, passo, parametri di sistema)
+_PULP_CACHE: Dict[tuple, tuple] = {}
+
+
+def _pulp_model(horizon_h: int, dt: float | tuple, sp: SystemParams):
+    """
+    Restituisce il modello PuLP per l'orizzonte dato, costruendolo se serve.
+
+    La struttura (variabili, coefficienti dei vincoli) dipende solo dai parametri di
+    sistema; tra una finestra e l'altra _solve_with_pulp aggiorna in place costi
+    dell'obiettivo, termini noti e bound, come per il modello HiGHS.
+
+    Returns:
+        (prob, var, con): problema, variabili per nome ({ora: LpVariable}) e vincoli
+        da aggiornare ('balance' per ora, 'soc1' dinamica della prima ora, 'mutex' per ora)
+    """
+    key = (horizon_h, dt, sp)
+    cached = _PULP_CACHE.get(key)
+    if cached is not None:
+        return cached
 
     # Creazione del problema di ottimizzazione (minimizzazione)
     prob = pulp.LpProblem('mpc', pulp.LpMinimize)
+    hours = range(horizon_h)
+
+    # Parametri usati nel ciclo orario come variabili locali
+    import_max, export_max = sp.import_max_mw, sp.export_max_mw
+    ely_nom, ely_min = sp.ely_nom_mw, sp.ely_min_mw
+    fc_nom, fc_min = sp.fc_nom_mw, sp.fc_min_mw
+    dg_nom, dg_min = sp.dg_nom_mw, sp.dg_min_mw
+    steps = _step_durations(dt, horizon_h)
+    k_ely = (steps * sp.eta_ely).tolist()          # MWh di H2 per MW assorbito dall'elettrolizzatore
+    k_fc = (steps * (1.0 / sp.eta_fc)).tolist()    # MWh di H2 per MW prodotto dalla fuel cell
 
     # ==================== VARIABILI DI DECISIONE ====================
 
-    # Potenze continue [MW] - una variabile per ogni ora dell'orizzonte
-    p_import = [pulp.LpVariable(f'p_import_{t}', lowBound=0) for t in range(horizon_h)]  # Potenza importata dalla rete
-    p_export = [pulp.LpVariable(f'p_export_{t}', lowBound=0) for t in range(horizon_h)]  # Potenza esportata alla rete
-    p_ely = [pulp.LpVariable(f'p_ely_{t}', lowBound=0) for t in range(horizon_h)]        # Potenza assorbita dall'elettrolizzatore
-    p_fc = [pulp.LpVariable(f'p_fc_{t}', lowBound=0) for t in range(horizon_h)]          # Potenza prodotta dalla cella a combustibile
-    p_dg = [pulp.LpVariable(f'p_dg_{t}', lowBound=0) for t in range(horizon_h)]          # Potenza prodotta dal generatore diesel
-    p_curt = [pulp.LpVariable(f'p_curt_{t}', lowBound=0) for t in range(horizon_h)]      # Potenza curtailed (tagliata/sprecata)
+    # Potenze continue [MW] - una variabile per ogni ora dell'orizzonte (nomi '<nome>_<t>')
+    p_import = pulp.LpVariable.dicts('p_import', hours, lowBound=0)  # Potenza importata dalla rete
+    p_export = pulp.LpVariable.dicts('p_export', hours, lowBound=0)  # Potenza esportata alla rete
+    p_ely = pulp.LpVariable.dicts('p_ely', hours, lowBound=0)        # Potenza assorbita dall'elettrolizzatore
+    p_fc = pulp.LpVariable.dicts('p_fc', hours, lowBound=0)          # Potenza prodotta dalla cella a combustibile
+    p_dg = pulp.LpVariable.dicts('p_dg', hours, lowBound=0)          # Potenza prodotta dal generatore diesel
+    p_curt = pulp.LpVariable.dicts('p_curt', hours, lowBound=0)      # Potenza curtailed (tagliata/sprecata)
 
     # Variabili binarie di accensione/spegnimento (1=acceso, 0=spento)
-    u_dg = [pulp.LpVariable(f'u_dg_{t}', cat='Binary') for t in range(horizon_h)]    # Stato on/off generatore diesel
-    u_ely = [pulp.LpVariable(f'u_ely_{t}', cat='Binary') for t in range(horizon_h)]  # Stato on/off elettrolizzatore
-    u_fc = [pulp.LpVariable(f'u_fc_{t}', cat='Binary') for t in range(horizon_h)]    # Stato on/off cella a combustibile
+    u_dg = pulp.LpVariable.dicts('u_dg', hours, cat='Binary')    # Stato on/off generatore diesel
+    u_ely = pulp.LpVariable.dicts('u_ely', hours, cat='Binary')  # Stato on/off elettrolizzatore
+    u_fc = pulp.LpVariable.dicts('u_fc', hours, cat='Binary')    # Stato on/off cella a combustibile
 
-    # Variabili binarie per mutua esclusione import/export
-    u_import = [pulp.LpVariable(f'u_import_{t}', cat='Binary') for t in range(horizon_h)]  # 1 se si importa
-    u_export = [pulp.LpVariable(f'u_export_{t}', cat='Binary') for t in range(horizon_h)]  # 1 se si esporta
+    # Variabili binarie per mutua esclusione import/export (attivata per finestra in _solve_with_pulp)
+    u_import = pulp.LpVariable.dicts('u_import', hours, cat='Binary')  # 1 se si importa
+    u_export = pulp.LpVariable.dicts('u_export', hours, cat='Binary')  # 1 se si esporta
 
-    # Stato di carica dello storage idrogeno [MWh] (horizon_h + 1 perche' include stato iniziale)
-    soc = [pulp.LpVariable(f'soc_{t}', lowBound=0, upBound=float(sys['h2_storage_mwh']))
-           for t in range(horizon_h + 1)]
+    # Stato di carica dello storage idrogeno [MWh] a fine ora t (chiavi 1..horizon_h):
+    # lo stato iniziale e' noto ed entra come costante nella dinamica della prima ora
+    soc = pulp.LpVariable.dicts('soc', range(1, horizon_h + 1), lowBound=0,
+                                upBound=sp.h2_storage_mwh)
 
     # ==================== VINCOLI ====================
 
-    # Vincolo: stato di carica iniziale
-    prob += soc[0] == soc_init_mwh
+    # I vincoli sono costruiti direttamente da coppie (variabile, coefficiente): evita le
+    # espressioni intermedie che PuLP crea per ogni operatore (+, *, <=)
+    LE, GE, EQ = pulp.LpConstraintLE, pulp.LpConstraintGE, pulp.LpConstraintEQ
+
+    # Vincolo di mutua esclusione: non si puo' importare ed esportare contemporaneamente
+    mutex = [_lp_con([(u_import[t], 1.0), (u_export[t], 1.0)], LE, 1.0) for t in hours]
+
+    # Vincolo di bilancio energetico: generazione = consumo
+    # Lato generazione: PV + Eolico + Import + Diesel + Fuel Cell
+    # Lato consumo: Carico + Elettrolizzatore + Export + Curtailment
+    # (termine noto carico - RES impostato per finestra)
+    balance = [
+        _lp_con([(p_import[t], 1.0), (p_dg[t], 1.0), (p_fc[t], 1.0),
+                 (p_ely[t], -1.0), (p_export[t], -1.0), (p_curt[t], -1.0)], EQ)
+        for t in hours
+    ]
 
-    for t in range(horizon_h):
-        # Vincolo di mutua esclusione: non si puo' importare ed esportare contemporaneamente
-        prob += u_import[t] + u_export[t] <= 1
+    # Dinamica dello storage idrogeno:
+    # SOC(t+1) = SOC(t) + dt * (eta_ely * p_ely - p_fc / eta_fc), con SOC(0) = soc_init_mwh
+    soc1 = _lp_con([(soc[1], 1.0), (p_ely[0], -k_ely[0]), (p_fc[0], k_fc[0])], EQ)
+    constraints = mutex + balance + [soc1]
+
+    for t in hours:
+        constraints += [
+            # Vincoli di potenza massima (legati allo stato on/off)
+            _lp_con([(p_import[t], 1.0), (u_import[t], -import_max)], LE),  # Max potenza importabile
+            _lp_con([(p_export[t], 1.0), (u_export[t], -export_max)], LE),  # Max potenza esportabile
+
+            # Vincoli min/max elettrolizzatore (se acceso deve operare tra min e nominale)
+            _lp_con([(p_ely[t], 1.0), (u_ely[t], -ely_nom)], LE),   # Potenza nominale elettrolizzatore
+            _lp_con([(p_ely[t], 1.0), (u_ely[t], -ely_min)], GE),   # Potenza minima tecnica elettrolizzatore
+
+            # Vincoli min/max cella a combustibile
+            _lp_con([(p_fc[t], 1.0), (u_fc[t], -fc_nom)], LE),      # Potenza nominale fuel cell
+            _lp_con([(p_fc[t], 1.0), (u_fc[t], -fc_min)], GE),      # Potenza minima tecnica fuel cell
+
+            # Vincoli min/max generatore diesel
+            _lp_con([(p_dg[t], 1.0), (u_dg[t], -dg_nom)], LE),      # Potenza nominale diesel
+            _lp_con([(p_dg[t], 1.0), (u_dg[t], -dg_min)], GE),      # Potenza minima tecnica diesel
+        ]
+    for t in hours[1:]:
+        constraints.append(
+            _lp_con([(soc[t + 1], 1.0), (soc[t], -1.0), (p_ely[t], -k_ely[t]), (p_fc[t], k_fc[t])], EQ)
+        )
 
-        # Vincoli di potenza massima (legati allo stato on/off)
-        prob += p_import[t] <= float(sys['import_max_mw']) * u_import[t]  # Max potenza importabile
-        prob += p_export[t] <= float(sys['export_max_mw']) * u_export[t]  # Max potenza esportabile
+    # Un'unica aggiunta al problema invece di un 'prob +=' per vincolo
+    prob.extend(constraints)
 
-        # Vincoli min/max elettrolizzatore (se acceso deve operare tra min e nominale)
-        prob += p_ely[t] <= float(sys['ely_nom_mw']) * u_ely[t]   # Potenza nominale elettrolizzatore
-        prob += p_ely[t] >= float(sys['ely_min_mw']) * u_ely[t]   # Potenza minima tecnica elettrolizzatore
+    # Obiettivo con tutte le voci di costo (coefficienti aggiornati per finestra)
+    prob += pulp.LpAffineExpression(
+        [(v, 0.0) for var in (p_import, p_export, p_dg, p_curt) for v in var.values()]
+    )
 
-        # Vincoli min/max cella a combustibile
-        prob += p_fc[t] <= float(sys['fc_nom_mw']) * u_fc[t]      # Potenza nominale fuel cell
-        prob += p_fc[t] >= float(sys['fc_min_mw']) * u_fc[t]      # Potenza minima tecnica fuel cell
+    var = {
+        'p_import': p_import, 'p_export': p_export, 'p_ely': p_ely, 'p_fc': p_fc,
+        'p_dg': p_dg, 'p_curt': p_curt, 'u_dg': u_dg, 'u_ely': u_ely, 'u_fc': u_fc,
+        'u_import': u_import, 'u_export': u_export, 'soc': soc,
+    }
+    _PULP_CACHE[key] = (prob, var, {'balance': balance, 'soc1': soc1, 'mutex': mutex})
+    return _PULP_CACHE[key]
 
-        # Vincoli min/max generatore diesel
-        prob += p_dg[t] <= float(sys['dg_nom_mw']) * u_dg[t]      # Potenza nominale diesel
-        prob += p_dg[t] >= float(sys['dg_min_mw']) * u_dg[t]      # Potenza minima tecnica diesel
 
-        # Vincolo di bilancio energetico: generazione = consumo
-        # Lato generazione: PV + Eolico + Import + Diesel + Fuel Cell
-        # Lato consumo: Carico + Elettrolizzatore + Export + Curtailment
-        prob += (
-            pv[t] + wind[t] + p_import[t] + p_dg[t] + p_fc[t]
-            == load[t] + p_ely[t] + p_export[t] + p_curt[t]
-        )
+def _solve_with_pulp(
+    load: np.ndarray,           # Carico elettrico richiesto [MW] per ogni ora
+    pv: np.ndarray,             # Produzione fotovoltaica prevista [MW]
+    wind: np.ndarray,           # Produzione eolica prevista [MW]
+    import_price: np.ndarray,   # Prezzo di acquisto dalla rete [EUR/MWh]
+    export_price: np.ndarray,   # Prezzo di vendita alla rete (PUN) [EUR/MWh]
+    cfg: dict,                  # Configurazione del sistema
+    sp: SystemParams,           # Parametri di sistema gia' convertiti in float
+    soc_init_mwh: float,        # Stato di carica iniziale dello storage [MWh]
+    fuel_price: float,          # Prezzo del combustibile diesel [EUR/MWh]
+    dt: float | tuple,          # Passo temporale [ore], o durata di ogni passo (vedi _tail_blocks)
+    warm: Dict[str, np.ndarray] | None = None,  # Soluzione iniziale (vedi _warm_start_values)
+    u_max: Dict[str, np.ndarray] | None = None,  # Binari fissati a 0 (vedi _easy_hour_u_max)
+) -> MPCResult | None:
+    """
+    Risolve il problema di ottimizzazione usando PuLP come solver.
 
-        # Dinamica dello storage idrogeno:
-        # SOC(t+1) = SOC(t) + dt * (energia_in - energia_out)
-        # energia_in = eta_ely * p_ely (idrogeno prodotto dall'elettrolizzatore)
-        # energia_out = p_fc / eta_fc (idrogeno consumato dalla fuel cell)
-        prob += soc[t + 1] == soc[t] + dt * (
-            float(sys['eta_ely']) * p_ely[t] - (1.0 / float(sys['eta_fc'])) * p_fc[t]
-        )
+    Questa funzione e' un'alternativa al solver CVXPY e viene usata se disponibile
+    un solver PuLP (HiGHS, Gurobi o CBC, vedi _pulp_solver). Il modello e' costruito una volta per orizzonte
+    (vedi _pulp_model); qui si aggiornano solo i dati della finestra.
+
+    Ritorna None se PuLP o un suo solver non sono disponibili.
+    """
+    # Verifica disponibilita' di PuLP e di un solver (scelto una volta e riusato)
+    if pulp is None:
+        return None
+    solver = _pulp_solver(warm is not None)
+    if solver is None:
+        return None
+
+    horizon_h = len(load)  # Lunghezza dell'orizzonte di ottimizzazione [ore]
+    prob, var, con = _pulp_model(horizon_h, dt, sp)
+    hours = range(horizon_h)
+
+    # ==================== DATI DELLA FINESTRA ====================
+
+    # Termine noto del bilancio (carico - RES) e SOC iniziale nella dinamica della prima ora
+    rhs = (np.asarray(load, dtype=float)
+           - (np.asarray(pv, dtype=float) + np.asarray(wind, dtype=float))).tolist()
+    for c, r in zip(con['balance'], rhs):
+        c.changeRHS(r)
+    con['soc1'].changeRHS(float(soc_init_mwh))
+
+    # Mutua esclusione import/export solo nelle ore in cui serve: se il prezzo di import
+    # supera quello di export, importare ed esportare insieme costa (import - export) * dt
+    # per MWh scambiato e non e' mai ottimo. Restano le ore di arbitraggio (import <= export),
+    # in genere nessuna; nelle altre il vincolo e' disattivato e u_import/u_export valgono 1
+    need_mutex = (np.asarray(import_price, dtype=float) <= np.asarray(export_price, dtype=float)).tolist()
+    for t in hours:
+        con['mutex'][t].changeRHS(1.0 if need_mutex[t] else 2.0)
+        lo = 0 if need_mutex[t] else 1
+        var['u_import'][t].bounds(lo, 1)
+        var['u_export'][t].bounds(lo, 1)
+
+    # Binari on/off: unita' spente nelle ore facili (vedi _easy_hour_u_max), liberi altrove.
+    # Sempre reimpostati: il modello e' riusato e lp_fixing puo' averli fissati
+    for name in ('u_dg', 'u_ely', 'u_fc'):
+        up = [1] * horizon_h if u_max is None else u_max[name].astype(int).tolist()
+        for t, v in var[name].items():
+            v.bounds(0, up[t])
 
     # ==================== FUNZIONE OBIETTIVO ====================
 
     curtail_penalty = 1.0  # Penalita' per energia curtailed [EUR/MWh]
 
+    # Coefficienti orari [EUR/MW] scritti direttamente nell'obiettivo
     # Costo totale = Costo import - Ricavo export + Costo diesel + Penalita' curtailment
-    objective = (
-        # Costo dell'energia importata dalla rete
-        pulp.lpSum(import_price[t] * p_import[t] * dt for t in range(horizon_h))
-        # Ricavo dalla vendita di energia alla rete (sottratto perche' e' un guadagno)
-        - pulp.lpSum(export_price[t] * p_export[t] * dt for t in range(horizon_h))
-        # Costo del combustibile diesel (diviso per efficienza per ottenere energia primaria)
-        + pulp.lpSum((fuel_price / eta_dg) * p_dg[t] * dt for t in range(horizon_h))
-        # Penalita' per energia curtailed (incentiva a non sprecare energia)
-        + pulp.lpSum(curtail_penalty * p_curt[t] * dt for t in range(horizon_h))
+    steps = _step_durations(dt, horizon_h)
+    obj = prob.objective
+    coefs = (
+        ('p_import', (np.asarray(import_price, dtype=float) * steps).tolist()),   # Costo import
+        ('p_export', (-np.asarray(export_price, dtype=float) * steps).tolist()),  # Ricavo export (negativo)
+        ('p_dg', ((fuel_price / sp.eta_dg) * steps).tolist()),                    # Costo combustibile diesel
+        ('p_curt', (curtail_penalty * steps).tolist()),                           # Penalita' curtailment
     )
-    prob += objective
+    for name, coef in coefs:
+        for v, c in zip(var[name].values(), coef):
+            obj[v] = c
 
     # ==================== RISOLUZIONE ====================
 
-    # Prova i solver in ordine di preferenza: Gurobi (piu' veloce) -> HiGHS -> CBC (fallback)
-    try:
-        solver = pulp.GUROBI(msg=False)
-    except:
-        try:
-            solver = pulp.HiGHS(msg=False)
-        except:
-            solver = pulp.PULP_CBC_CMD(msg=False)
-    prob.solve(solver)
+    # Soluzione iniziale dalla finestra precedente (usata da Gurobi e CBC; HiGHS via PuLP la ignora)
+    if warm is not None:
+        for name, values in warm.items():
+            for t, v in var[name].items():  # Le chiavi sono le ore (soc da 1)
+                v.setInitialValue(values[t], check=False)  # Eventuali residui fuori bound li corregge il solver
+
+    if cfg['project'].get('lp_fixing', False):
+        # Rilassamento LP + arrotondamento o fissaggio dei binari gia' interi, poi MILP residuo
+        units = ('dg', 'ely', 'fc', 'import', 'export')
+        binaries = [v for unit in units for v in var[f'u_{unit}'].values()]
+        powers = [v for unit in units for v in var[f'p_{unit}'].values()]
+        _solve_relax_and_fix(prob, solver, binaries, powers)
+    else:
+        prob.solve(solver)
 
     # ==================== COSTRUZIONE RISULTATI ====================
 
+    # Valori delle variabili letti direttamente da varValue (None -> NaN se non risolto)
+    # in un'unica matrice (7, horizon_h): una riga per colonna dello schedule
+    result_vars = ('p_import', 'p_export', 'p_ely', 'p_fc', 'p_dg', 'p_curt', 'soc')
+    values = np.fromiter(
+        (v.varValue for name in result_vars for v in var[name].values()),
+        dtype=np.float64, count=7 * horizon_h,
+    )
+
     # Crea DataFrame con lo scheduling ottimale
     schedule = pd.DataFrame(
-        {
-            'hour': np.arange(horizon_h),
-            'p_import_mw': [pulp.value(v) for v in p_import],   # Potenza importata [MW]
-            'p_export_mw': [pulp.value(v) for v in p_export],   # Potenza esportata [MW]
-            'p_ely_mw': [pulp.value(v) for v in p_ely],         # Potenza elettrolizzatore [MW]
-            'p_fc_mw': [pulp.value(v) for v in p_fc],           # Potenza fuel cell [MW]
-            'p_dg_mw': [pulp.value(v) for v in p_dg],           # Potenza diesel [MW]
-            'p_curt_mw': [pulp.value(v) for v in p_curt],       # Potenza curtailed [MW]
-            'soc_mwh': [pulp.value(v) for v in soc[1:]],        # Stato di carica [MWh]
-        }
-    ).set_index('hour')
+        values.reshape(7, horizon_h).T,
+        columns=_SCHEDULE_COLUMNS,
+        index=pd.Index(np.arange(horizon_h), name='hour'),
+    )
 
     return MPCResult(schedule=schedule, objective_value=float(pulp.value(prob.objective)))
 
 
+# Blocchi di colonne del modello HiGHS (horizon_h colonne ciascuno), seguiti da soc (horizon_h + 1)
+_HIGHS_BLOCKS = ('p_import', 'p_export', 'p_ely', 'p_fc', 'p_dg', 'p_curt',
+                 'u_dg', 'u_ely', 'u_fc', 'u_import', 'u_export')
+_N_POWER = 6  # Primi blocchi continui (potenze); i successivi sono binari
+
+# Modelli HiGHS gia' costruiti, per (orizzonte, passo, parametri di sistema)
+_HIGHS_CACHE: Dict[tuple, tuple] = {}
+
+
+def _highs_model(horizon_h: int, dt: float | tuple, sp: SystemParams):
+    """
+    Restituisce il modello HiGHS a sparsita' fissa per l'orizzonte dato, costruendolo se serve.
+
+    Stessa formulazione di _solve_with_pulp scritta come matrice dei vincoli (CSC):
+    tra una finestra e l'altra cambiano solo costi, termine noto del bilancio, SOC
+    iniziale e mutua esclusione import/export, aggiornati con changeCols*/changeRows*.
+
+    Returns:
+        (highs, rows): istanza Highs con il modello caricato e offset dei blocchi di righe
+    """
+    key = (horizon_h, dt, sp)
+    cached = _HIGHS_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    H = horizon_h
+    t = np.arange(H)
+    col = {name: b * H + t for b, name in enumerate(_HIGHS_BLOCKS)}  # Indici colonna per blocco
+    soc = len(_HIGHS_BLOCKS) * H + np.arange(H + 1)                   # Colonne dello stato di carica
+    n_col = soc[-1] + 1
+    inf = highspy.kHighsInf
+
+    # Righe aggiunte a blocchi: ogni termine (colonne, coefficiente) contribuisce una voce per riga
+    entries, row_lower, row_upper, rows = [], [], [], {}
+
+    def add(name, terms, lo, up):
+        m = len(terms[0][0])
+        r = np.arange(m) + sum(len(x) for x in row_lower)  # Righe dopo quelle gia' aggiunte
+        for c, coef in terms:
+            entries.append((r, c, np.full(m, coef)))
+        row_lower.append(np.full(m, lo))
+        row_upper.append(np.full(m, up))
+        rows[name] = r
+
+    add('soc0', [(soc[:1], 1.0)], 0.0, 0.0)                                   # SOC iniziale
+    add('mutex', [(col['u_import'], 1.0), (col['u_export'], 1.0)], -inf, 1.0)  # Mutua esclusione
+    add('imp_max', [(col['p_import'], 1.0), (col['u_import'], -sp.import_max_mw)], -inf, 0.0)
+    add('exp_max', [(col['p_export'], 1.0), (col['u_export'], -sp.export_max_mw)], -inf, 0.0)
+    add('ely_max', [(col['p_ely'], 1.0), (col['u_ely'], -sp.ely_nom_mw)], -inf, 0.0)
+    add('ely_min', [(col['p_ely'], 1.0), (col['u_ely'], -sp.ely_min_mw)], 0.0, inf)
+    add('fc_max', [(col['p_fc'], 1.0), (col['u_fc'], -sp.fc_nom_mw)], -inf, 0.0)
+    add('fc_min', [(col['p_fc'], 1.0), (col['u_fc'], -sp.fc_min_mw)], 0.0, inf)
+    add('dg_max', [(col['p_dg'], 1.0), (col['u_dg'], -sp.dg_nom_mw)], -inf, 0.0)
+    add('dg_min', [(col['p_dg'], 1.0), (col['u_dg'], -sp.dg_min_mw)], 0.0, inf)
+    # Bilancio: import + DG + FC - ELY - export - curtailment = carico - RES (termine noto per finestra)
+    add('balance', [(col['p_import'], 1.0), (col['p_dg'], 1.0), (col['p_fc'], 1.0),
+                    (col['p_ely'], -1.0), (col['p_export'], -1.0), (col['p_curt'], -1.0)], 0.0, 0.0)
+    # Dinamica: SOC(t+1) - SOC(t) - dt*eta_ely*p_ely + dt/eta_fc*p_fc = 0 (dt del passo t)
+    steps = _step_durations(dt, H)
+    add('dynamics', [(soc[1:], 1.0), (soc[:-1], -1.0),
+                     (col['p_ely'], -steps * sp.eta_ely), (col['p_fc'], steps * (1.0 / sp.eta_fc))], 0.0, 0.0)
+
+    r, c, v = (np.concatenate(x) for x in zip(*entries))
+    nz = v != 0.0
+    n_row = rows['dynamics'][-1] + 1
+    A = sparse.csc_matrix((v[nz], (r[nz], c[nz])), shape=(n_row, n_col))
+
+    lp = highspy.HighsLp()
+    lp.num_col_ = int(n_col)
+    lp.num_row_ = int(n_row)
+    lp.col_cost_ = np.zeros(n_col)
+    lp.col_lower_ = np.zeros(n_col)
+    col_upper = np.full(n_col, inf)
+    col_upper[_N_POWER * H:len(_HIGHS_BLOCKS) * H] = 1.0   # Binari in [0, 1]
+    col_upper[soc] = sp.h2_storage_mwh                     # Capacita' storage
+    lp.col_upper_ = col_upper
+    lp.row_lower_ = np.concatenate(row_lower)
+    lp.row_upper_ = np.concatenate(row_upper)
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.num_col_ = int(n_col)
+    lp.a_matrix_.num_row_ = int(n_row)
+    lp.a_matrix_.start_ = A.indptr
+    lp.a_matrix_.index_ = A.indices
+    lp.a_matrix_.value_ = A.data
+    lp.integrality_ = (
+        [highspy.HighsVarType.kContinuous] * (_N_POWER * H)
+        + [highspy.HighsVarType.kInteger] * ((len(_HIGHS_BLOCKS) - _N_POWER) * H)
+        + [highspy.HighsVarType.kContinuous] * (H + 1)
+    )
+
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', False)
+    # Un thread per solve: i MILP orari sono piccoli e il parallelismo tra finestre e'
+    # affidato a solve_many_horizons (nessun thread pool interno da ereditare col fork)
+    h.setOptionValue('threads', 1)
+    h.passModel(lp)
+
+    _HIGHS_CACHE[key] = (h, rows)
+    return _HIGHS_CACHE[key]
+
+
+def _solve_with_highs(
+    load: np.ndarray,           # Carico elettrico richiesto [MW] per ogni ora
+    pv: np.ndarray,             # Produzione fotovoltaica prevista [MW]
+    wind: np.ndarray,           # Produzione eolica prevista [MW]
+    import_price: np.ndarray,   # Prezzo di acquisto dalla rete [EUR/MWh]
+    export_price: np.ndarray,   # Prezzo di vendita alla rete (PUN) [EUR/MWh]
+    sp: SystemParams,           # Parametri di sistema gia' convertiti in float
+    soc_init_mwh: float,        # Stato di carica iniziale dello storage [MWh]
+    fuel_price: float,          # Prezzo del combustibile diesel [EUR/MWh]
+    dt: float | tuple,          # Passo temporale [ore], o durata di ogni passo (vedi _tail_blocks)
+    warm: Dict[str, np.ndarray] | None = None,  # Soluzione iniziale (vedi _warm_start_values)
+    u_max: Dict[str, np.ndarray] | None = None,  # Binari fissati a 0 (vedi _easy_hour_u_max)
+) -> MPCResult | None:
+    """
+    Risolve il problema di ottimizzazione con i binding Python di HiGHS.
+
+    Il modello (matrice dei vincoli a sparsita' fissa) e' costruito una sola volta
+    per orizzonte; ad ogni finestra si aggiornano solo i vettori numerici, senza la
+    traduzione del modello di PuLP/CVXPY.
+
+    Ritorna None se highspy non e' disponibile o non viene trovata una soluzione ottima.
+    """
+    if highspy is None:
+        return None
+
+    H = len(load)
+    h, rows = _highs_model(H, dt, sp)
+    n_col = len(_HIGHS_BLOCKS) * H + H + 1
+    blk = {name: slice(b * H, (b + 1) * H) for b, name in enumerate(_HIGHS_BLOCKS)}
+
+    # Costi orari [EUR/MW]: import - export + combustibile diesel + penalita' curtailment
+    curtail_penalty = 1.0  # Penalita' per energia curtailed [EUR/MWh]
+    steps = _step_durations(dt, H)
+    cost = np.zeros(n_col)
+    cost[blk['p_import']] = np.asarray(import_price, dtype=float) * steps
+    cost[blk['p_export']] = -np.asarray(export_price, dtype=float) * steps
+    cost[blk['p_dg']] = (fuel_price / sp.eta_dg) * steps
+    cost[blk['p_curt']] = curtail_penalty * steps
+    h.changeColsCost(n_col, np.arange(n_col, dtype=np.int32), cost)
+
+    # Termine noto del bilancio (carico - RES) e SOC iniziale
+    rhs = np.asarray(load, dtype=float) - (np.asarray(pv, dtype=float) + np.asarray(wind, dtype=float))
+    h.changeRowsBounds(H, rows['balance'].astype(np.int32), rhs, rhs)
+    h.changeRowBounds(int(rows['soc0'][0]), float(soc_init_mwh), float(soc_init_mwh))
+
+    # Mutua esclusione solo nelle ore di arbitraggio (import <= export, vedi _solve_with_pulp):
+    # nelle altre ore il vincolo e' disattivato e u_import/u_export sono fissati a 1
+    need_mutex = np.asarray(import_price, dtype=float) <= np.asarray(export_price, dtype=float)
+    h.changeRowsBounds(H, rows['mutex'].astype(np.int32),
+                       np.full(H, -highspy.kHighsInf), np.where(need_mutex, 1.0, 2.0))
+    u_grid = np.r_[np.arange(H) + blk['u_import'].start, np.arange(H) + blk['u_export'].start]
+    u_lower = np.tile(np.where(need_mutex, 0.0, 1.0), 2)
+    h.changeColsBounds(2 * H, u_grid.astype(np.int32), u_lower, np.ones(2 * H))
+
+    # Binari on/off fissati a 0 nelle ore facili (limite 1 altrove: il modello e' riusato)
+    u_units = np.r_[np.arange(H) + blk['u_dg'].start, np.arange(H) + blk['u_ely'].start,
+                    np.arange(H) + blk['u_fc'].start]
+    u_upper = np.ones(3 * H) if u_max is None else np.r_[u_max['u_dg'], u_max['u_ely'], u_max['u_fc']]
+    h.changeColsBounds(3 * H, u_units.astype(np.int32), np.zeros(3 * H), u_upper)
+
+    # Soluzione iniziale dalla finestra precedente
+    if warm is not None:
+        x0 = np.empty(n_col)
+        for name in _HIGHS_BLOCKS:
+            x0[blk[name]] = warm[name]
+        x0[u_grid] = np.maximum(x0[u_grid], u_lower)
+        x0[len(_HIGHS_BLOCKS) * H:] = warm['soc']
+        start = highspy.HighsSolution()
+        start.col_value = x0
+        h.setSolution(start)
+
+    h.run()
+    if h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+        return None
+
+    x = np.asarray(h.getSolution().col_value)
+    arr = np.column_stack([x[:_N_POWER * H].reshape(_N_POWER, H).T, x[len(_HIGHS_BLOCKS) * H + 1:]])
+    schedule = pd.DataFrame(
+        arr,
+        columns=_SCHEDULE_COLUMNS,
+        index=pd.Index(np.arange(H), name='hour'),
+    )
+    return MPCResult(schedule=schedule, objective_value=float(h.getInfo().objective_function_value))
+
+
+# Problemi CVXPY gia' costruiti, per (orizzonte, passo, parametri di sistema)
+_PROBLEM_CACHE: Dict[tuple, tuple] = {}
+
+
+def _cvxpy_problem(horizon_h: int, dt: float | tuple, sp: SystemParams):
+    """
+    Restituisce il problema CVXPY parametrico per l'orizzonte dato, costruendolo se serve.
+
+    I dati che cambiano tra le finestre del receding horizon (previsioni, prezzi,
+    SOC iniziale, costo del combustibile) sono cp.Parameter; i parametri di sistema
+    sono costanti. Con la struttura fissa CVXPY riusa la canonicalizzazione (DPP)
+    e ad ogni solve aggiorna solo i dati numerici.
+
+    Returns:
+        (problem, params, variables): problema, dizionario dei Parameter e delle Variable
+    """
+    key = (horizon_h, dt, sp)
+    cached = _PROBLEM_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    # Dati della finestra (aggiornati ad ogni chiamata)
+    params = {
+        'load': cp.Parameter(horizon_h),          # Carico previsto [MW]
+        'pv': cp.Parameter(horizon_h),            # Produzione PV prevista [MW]
+        'wind': cp.Parameter(horizon_h),          # Produzione eolica prevista [MW]
+        'import_price': cp.Parameter(horizon_h),  # Prezzo acquisto [EUR/MWh]
+        'export_price': cp.Parameter(horizon_h),  # Prezzo vendita PUN [EUR/MWh]
+        'soc_init': cp.Parameter(),               # Stato di carica iniziale [MWh]
+        'fuel_coef': cp.Parameter(),              # Costo diesel fuel_price / eta_dg [EUR/MWh]
+        'u_dg_max': cp.Parameter(horizon_h, nonneg=True),   # Limite binario diesel (0 = spento)
+        'u_ely_max': cp.Parameter(horizon_h, nonneg=True),  # Limite binario elettrolizzatore
+        'u_fc_max': cp.Parameter(horizon_h, nonneg=True),   # Limite binario fuel cell
+    }
+
+    # Variabili di decisione continue [MW]
+    p_import = cp.Variable(horizon_h, nonneg=True)  # Potenza importata dalla rete
+    p_export = cp.Variable(horizon_h, nonneg=True)  # Potenza esportata alla rete
+    p_ely = cp.Variable(horizon_h, nonneg=True)     # Potenza elettrolizzatore
+    p_fc = cp.Variable(horizon_h, nonneg=True)      # Potenza fuel cell
+    p_dg = cp.Variable(horizon_h, nonneg=True)      # Potenza generatore diesel
+    p_curt = cp.Variable(horizon_h, nonneg=True)    # Potenza curtailed
+
+    # Variabili binarie on/off per unita' con potenza minima tecnica
+    u_dg = cp.Variable(horizon_h, boolean=True)     # Stato on/off diesel
+    u_ely = cp.Variable(horizon_h, boolean=True)    # Stato on/off elettrolizzatore
+    u_fc = cp.Variable(horizon_h, boolean=True)     # Stato on/off fuel cell
+
+    # Variabili binarie per mutua esclusione import/export
+    u_import = cp.Variable(horizon_h, boolean=True)
+    u_export = cp.Variable(horizon_h, boolean=True)
+
+    # Stato di carica storage [MWh], limitato tra 0 e la capacita' come bound della variabile:
+    # i solver che li supportano li trattano come limiti di colonna, non come righe di vincolo
+    soc = cp.Variable(horizon_h + 1, bounds=[0.0, sp.h2_storage_mwh])
+
+    steps = _step_durations(dt, horizon_h)  # Durata di ogni passo [ore]
+
+    # ==================== VINCOLI CVXPY ====================
+
+    constraints = [soc[0] == params['soc_init']]  # Condizione iniziale
+
+    # Mutua esclusione: non si puo' importare ed esportare contemporaneamente
+    constraints += [u_import + u_export <= 1]
+
+    # Vincoli di potenza massima (big-M constraints)
+    constraints += [p_import <= sp.import_max_mw * u_import]
+    constraints += [p_export <= sp.export_max_mw * u_export]
+
+    # Vincoli min/max per elettrolizzatore
+    constraints += [p_ely <= sp.ely_nom_mw * u_ely]
+    constraints += [p_ely >= sp.ely_min_mw * u_ely]
+
+    # Vincoli min/max per fuel cell
+    constraints += [p_fc <= sp.fc_nom_mw * u_fc]
+    constraints += [p_fc >= sp.fc_min_mw * u_fc]
+
+    # Vincoli min/max per generatore diesel
+    constraints += [p_dg <= sp.dg_nom_mw * u_dg]
+    constraints += [p_dg >= sp.dg_min_mw * u_dg]
+
+    # Binari on/off fissati a 0 nelle ore facili (vedi _easy_hour_u_max)
+    constraints += [u_dg <= params['u_dg_max'], u_ely <= params['u_ely_max'],
+                    u_fc <= params['u_fc_max']]
+
+    # Bilancio energetico: generazione = consumo
+    constraints += [
+        params['pv'] + params['wind'] + p_import + p_dg + p_fc
+        == params['load'] + p_ely + p_export + p_curt
+    ]
+
+    # Dinamica dello storage idrogeno (equazione di stato)
+    constraints += [
+        soc[1:] == soc[:-1] + cp.multiply(steps, sp.eta_ely * p_ely - (1.0 / sp.eta_fc) * p_fc)
+    ]
+
+    # ==================== FUNZIONE OBIETTIVO CVXPY ====================
+
+    curtail_penalty = 1.0  # Penalita' per curtailment [EUR/MWh]
+
+    # Costruzione del costo totale: prodotti scalari (@), un solo nodo affine per voce
+    # invece di multiply elemento per elemento + sum
+    cost = cp.multiply(steps, params['import_price']) @ p_import    # Costo import
+    cost -= cp.multiply(steps, params['export_price']) @ p_export   # Ricavo export (negativo)
+    cost += params['fuel_coef'] * (steps @ p_dg)                    # Costo diesel
+    cost += (curtail_penalty * steps) @ p_curt                      # Penalita' curtailment
+
+    problem = cp.Problem(cp.Minimize(cost), constraints)
+    # La cache ha senso solo se il problema e' DPP: CVXPY compila la mappa parametri -> dati
+    # del solver alla prima risoluzione e in seguito aggiorna solo i coefficienti (~2 ms
+    # contro ~40 ms per 168 ore). Un'espressione non DPP farebbe ricompilare ad ogni solve
+    if not problem.is_dpp():
+        raise RuntimeError('Il problema MPC CVXPY deve essere DPP per riusare la compilazione')
+    variables = {
+        'p_import': p_import, 'p_export': p_export, 'p_ely': p_ely,
+        'p_fc': p_fc, 'p_dg': p_dg, 'p_curt': p_curt, 'soc': soc,
+        'u_dg': u_dg, 'u_ely': u_ely, 'u_fc': u_fc, 'u_import': u_import, 'u_export': u_export,
+    }
+    _PROBLEM_CACHE[key] = (problem, params, variables)
+    return _PROBLEM_CACHE[key]
+
+
 def solve_horizon(
     df: pd.DataFrame,                       # DataFrame con i dati di input (previsioni, prezzi)
     cfg: dict,                              # Dizionario di configurazione del sistema
@@ -195,12 +938,15 @@ def solve_horizon(
     horizon_h: int,                         # Lunghezza dell'orizzonte [ore]
     soc_init_mwh: float = 0.0,              # Stato di carica iniziale [MWh]
     fuel_eur_per_kwh: float | None = None,  # Prezzo combustibile [EUR/kWh], se None usa config
+    warm_start: MPCResult | None = None,    # Risultato della finestra precedente (receding horizon)
+    tail_aggregation: int | None = None,    # Ore per blocco oltre le prime 24, se None usa config
 ) -> MPCResult:
     """
     Risolve il problema MPC per una singola finestra temporale (orizzonte).
 
     Questa e' la funzione principale da chiamare per ottenere lo scheduling ottimale.
-    Prova prima il solver PuLP, se non disponibile usa CVXPY.
+    Prova prima HiGHS tramite highspy, poi il solver PuLP, se non disponibili usa CVXPY.
+    Con project.lp_fixing si parte direttamente da PuLP (vedi _solve_window).
 
     Args:
         df: DataFrame contenente le colonne:
@@ -214,6 +960,12 @@ def solve_horizon(
         horizon_h: Numero di ore da ottimizzare
         soc_init_mwh: Stato di carica iniziale dello storage idrogeno
         fuel_eur_per_kwh: Costo del combustibile diesel. Se None usa valore da config.
+        warm_start: Soluzione della finestra precedente, traslata sulle ore correnti e
+            passata al solver come punto di partenza del branch-and-bound
+        tail_aggregation: Se > 1, le ore oltre le prime 24 sono risolte a blocchi di
+            tail_aggregation ore (medie di previsioni e prezzi): MILP piu' piccolo per
+            orizzonti lunghi, di cui si esegue comunque solo l'inizio. Lo schedule resta
+            orario (potenze costanti nel blocco). Se None usa project.tail_aggregation (default 1)
 
     Returns:
         MPCResult con schedule ottimale e valore della funzione obiettivo
@@ -221,28 +973,105 @@ def solve_horizon(
     # Estrazione parametri dalla configurazione
     dt = float(cfg['project']['timestep_h'])  # Passo temporale [ore]
 
-    sys = cfg['system']
-    h2_cap = float(sys['h2_storage_mwh'])  # Capacita' storage idrogeno [MWh]
-    eta_ely = float(sys['eta_ely'])        # Efficienza elettrolizzatore [0-1]
-    eta_fc = float(sys['eta_fc'])          # Efficienza fuel cell [0-1]
+    sp = SystemParams.from_config(cfg['system'])  # Parametri di sistema in float, una volta per chiamata
 
-    # Estrazione della finestra temporale dal DataFrame
+    # Estrazione della finestra temporale dal DataFrame: posizioni delle ore richieste,
+    # poi solo le 5 colonne necessarie (nessuna copia del blocco completo di righe)
     idx = np.arange(start_hour, start_hour + horizon_h)
-    block = df.loc[idx].copy()
+    rows = df.index.get_indexer(idx)
+    if (rows < 0).any():
+        raise KeyError(f'Ore mancanti nei dati: {idx[rows < 0].tolist()}')
+    if df.index.is_monotonic_increasing and rows[-1] - rows[0] == horizon_h - 1:
+        rows = slice(rows[0], rows[0] + horizon_h)  # Ore contigue: viste senza copia
 
     # Estrazione dei vettori di input per l'ottimizzazione
-    load = block['load_forecast_mw'].to_numpy()   # Carico previsto [MW]
-    pv = block['pv_forecast_mw'].to_numpy()       # Produzione PV prevista [MW]
-    wind = block['wind_forecast_mw'].to_numpy()   # Produzione eolica prevista [MW]
+    load = df['load_forecast_mw'].to_numpy()[rows]   # Carico previsto [MW]
+    pv = df['pv_forecast_mw'].to_numpy()[rows]       # Produzione PV prevista [MW]
+    wind = df['wind_forecast_mw'].to_numpy()[rows]   # Produzione eolica prevista [MW]
 
-    import_price = block['import_price_eur_per_mwh'].to_numpy()  # Prezzo acquisto [EUR/MWh]
-    export_price = block['pun_eur_per_mwh'].to_numpy()           # Prezzo vendita PUN [EUR/MWh]
+    import_price = df['import_price_eur_per_mwh'].to_numpy()[rows]  # Prezzo acquisto [EUR/MWh]
+    export_price = df['pun_eur_per_mwh'].to_numpy()[rows]           # Prezzo vendita PUN [EUR/MWh]
 
     # Conversione prezzo combustibile da EUR/kWh a EUR/MWh
     if fuel_eur_per_kwh is None:
         fuel_eur_per_kwh = float(cfg['prices']['fuel_eur_per_kwh'])
     fuel_price = fuel_eur_per_kwh * 1000.0  # [EUR/MWh]
 
+    # Opzionale: coda dell'orizzonte (oltre le prime 24 ore) aggregata in blocchi di piu' ore
+    if tail_aggregation is None:
+        tail_aggregation = int(cfg['project'].get('tail_aggregation', 1))
+    counts = _tail_blocks(horizon_h, tail_aggregation)
+    if counts is not None:
+        # Medie di previsioni e prezzi per blocco; durata del passo = ore del blocco * dt
+        # (la finestra precedente non si allinea ai blocchi: warm start dal greedy)
+        starts = np.r_[0, np.cumsum(counts)[:-1]]
+        load, pv, wind, import_price, export_price = (
+            np.add.reduceat(np.asarray(x, dtype=float), starts) / counts
+            for x in (load, pv, wind, import_price, export_price)
+        )
+        dt_model = tuple((dt * counts).tolist())
+        warm = _greedy_dispatch(load, pv, wind, import_price, sp, soc_init_mwh, fuel_price, dt_model)
+    else:
+        # Punto di partenza per i solver MILP: finestra precedente se disponibile, altrimenti
+        # dispatch greedy (sempre una soluzione completa, anche per la prima finestra)
+        dt_model = dt
+        warm = None if warm_start is None else _warm_start_values(warm_start, idx, soc_init_mwh)
+        if warm is None:
+            warm = _greedy_dispatch(load, pv, wind, import_price, sp, soc_init_mwh, fuel_price, dt)
+
+    # Opzionale: unita' spente nelle ore di netto surplus/deficit, meno binari da decidere
+    u_max = _easy_hour_u_max(load, pv, wind, sp) if cfg['project'].get('binary_fixing', False) else None
+
+    result = _solve_window(load, pv, wind, import_price, export_price, cfg, sp,
+                           soc_init_mwh, fuel_price, dt_model, warm, u_max)
+    if counts is not None:
+        result = _expand_blocks(result, counts, dt, sp, soc_init_mwh)
+    result.schedule.index = pd.Index(idx, name='hour')  # Aggiorna indice con ore reali
+    return result
+
+
+def _solve_window(
+    load: np.ndarray,           # Carico elettrico richiesto [MW] per ogni passo
+    pv: np.ndarray,             # Produzione fotovoltaica prevista [MW]
+    wind: np.ndarray,           # Produzione eolica prevista [MW]
+    import_price: np.ndarray,   # Prezzo di acquisto dalla rete [EUR/MWh]
+    export_price: np.ndarray,   # Prezzo di vendita alla rete (PUN) [EUR/MWh]
+    cfg: dict,                  # Configurazione del sistema
+    sp: SystemParams,           # Parametri di sistema gia' convertiti in float
+    soc_init_mwh: float,        # Stato di carica iniziale dello storage [MWh]
+    fuel_price: float,          # Prezzo del combustibile diesel [EUR/MWh]
+    dt: float | tuple,          # Passo temporale [ore], o durata di ogni passo (vedi _tail_blocks)
+    warm: Dict[str, np.ndarray] | None,   # Soluzione iniziale (vedi _warm_start_values)
+    u_max: Dict[str, np.ndarray] | None,  # Binari fissati a 0 (vedi _easy_hour_u_max)
+) -> MPCResult:
+    """
+    Risolve il MILP di una finestra gia' estratta: HiGHS diretto, poi PuLP, poi CVXPY.
+
+    Con project.lp_fixing il modello HiGHS diretto e' saltato: il rilassamento LP
+    con fissaggio dei binari (_solve_relax_and_fix) e' implementato solo su PuLP.
+    Lo schedule restituito ha indice 0..n-1 (un passo del modello per riga).
+    """
+    horizon_h = len(load)  # Numero di passi del modello
+
+    # ==================== TENTATIVO CON HIGHS (BINDING DIRETTI) ====================
+
+    if not cfg['project'].get('lp_fixing', False):
+        highs_result = _solve_with_highs(
+            load=load,
+            pv=pv,
+            wind=wind,
+            import_price=import_price,
+            export_price=export_price,
+            sp=sp,
+            soc_init_mwh=soc_init_mwh,
+            fuel_price=fuel_price,
+            dt=dt,
+            warm=warm,
+            u_max=u_max,
+        )
+        if highs_result is not None:
+            return highs_result
+
     # ==================== TENTATIVO CON PULP ====================
 
     pulp_result = _solve_with_pulp(
@@ -252,112 +1081,106 @@ def solve_horizon(
         import_price=import_price,
         export_price=export_price,
         cfg=cfg,
+        sp=sp,
         soc_init_mwh=soc_init_mwh,
         fuel_price=fuel_price,
         dt=dt,
+        warm=warm,
+        u_max=u_max,
     )
     if pulp_result is not None:
-        pulp_result.schedule.index = idx  # Aggiorna indice con ore reali
         return pulp_result
 
     # ==================== FALLBACK A CVXPY ====================
 
-    # Se PuLP non e' disponibile, usa CVXPY come solver alternativo
-
-    # Variabili di decisione continue [MW]
-    p_import = cp.Variable(horizon_h, nonneg=True)  # Potenza importata dalla rete
-    p_export = cp.Variable(horizon_h, nonneg=True)  # Potenza esportata alla rete
-    p_ely = cp.Variable(horizon_h, nonneg=True)     # Potenza elettrolizzatore
-    p_fc = cp.Variable(horizon_h, nonneg=True)      # Potenza fuel cell
-    p_dg = cp.Variable(horizon_h, nonneg=True)      # Potenza generatore diesel
-    p_curt = cp.Variable(horizon_h, nonneg=True)    # Potenza curtailed
-
-    # Variabili binarie on/off per unita' con potenza minima tecnica
-    u_dg = cp.Variable(horizon_h, boolean=True)     # Stato on/off diesel
-    u_ely = cp.Variable(horizon_h, boolean=True)    # Stato on/off elettrolizzatore
-    u_fc = cp.Variable(horizon_h, boolean=True)     # Stato on/off fuel cell
-
-    # Variabili binarie per mutua esclusione import/export
-    u_import = cp.Variable(horizon_h, boolean=True)
-    u_export = cp.Variable(horizon_h, boolean=True)
+    # Se PuLP non e' disponibile, usa CVXPY come solver alternativo.
+    # Il problema e' costruito una sola volta per (orizzonte, parametri di sistema):
+    # nelle finestre successive cambiano solo i valori dei Parameter
+    problem, params, var = _cvxpy_problem(horizon_h, dt, sp)
+    if warm is not None:
+        for name, values in warm.items():
+            var[name].value = values
+
+    params['load'].value = np.asarray(load, dtype=float)
+    params['pv'].value = np.asarray(pv, dtype=float)
+    params['wind'].value = np.asarray(wind, dtype=float)
+    params['import_price'].value = np.asarray(import_price, dtype=float)
+    params['export_price'].value = np.asarray(export_price, dtype=float)
+    params['soc_init'].value = float(soc_init_mwh)
+    params['fuel_coef'].value = fuel_price / sp.eta_dg  # Costo diesel [EUR/MWh]
+    for name in ('u_dg', 'u_ely', 'u_fc'):
+        params[f'{name}_max'].value = np.ones(horizon_h) if u_max is None else u_max[name]
 
-    # Stato di carica storage [MWh]
-    soc = cp.Variable(horizon_h + 1)
-
-    # ==================== VINCOLI CVXPY ====================
+    # ==================== RISOLUZIONE CVXPY ====================
 
-    constraints = [soc[0] == soc_init_mwh]  # Condizione iniziale
+    # Solver scelto una volta: Gurobi -> CBC -> HiGHS -> ECOS_BB (vedi _cvxpy_solver)
+    problem.solve(solver=_cvxpy_solver(), verbose=False)
 
-    # Mutua esclusione: non si puo' importare ed esportare contemporaneamente
-    constraints += [u_import + u_export <= 1]
+    # ==================== COSTRUZIONE RISULTATI ====================
 
-    # Vincoli di potenza massima (big-M constraints)
-    constraints += [p_import <= float(sys['import_max_mw']) * u_import]
-    constraints += [p_export <= float(sys['export_max_mw']) * u_export]
+    # Valori ottimi in un'unica matrice (horizon_h, 7): un solo blocco float64, nessun set_index
+    out = np.empty((horizon_h, 7), dtype=np.float64)
+    out[:, 0] = var['p_import'].value   # Potenza importata ottimale [MW]
+    out[:, 1] = var['p_export'].value   # Potenza esportata ottimale [MW]
+    out[:, 2] = var['p_ely'].value      # Potenza elettrolizzatore ottimale [MW]
+    out[:, 3] = var['p_fc'].value       # Potenza fuel cell ottimale [MW]
+    out[:, 4] = var['p_dg'].value       # Potenza diesel ottimale [MW]
+    out[:, 5] = var['p_curt'].value     # Potenza curtailed ottimale [MW]
+    out[:, 6] = var['soc'].value[1:]    # Stato di carica ottimale [MWh]
+    schedule = pd.DataFrame(out, index=pd.Index(np.arange(horizon_h), name='hour'),
+                            columns=_SCHEDULE_COLUMNS)
 
-    # Vincoli min/max per elettrolizzatore
-    constraints += [p_ely <= float(sys['ely_nom_mw']) * u_ely]
-    constraints += [p_ely >= float(sys['ely_min_mw']) * u_ely]
+    return MPCResult(schedule=schedule, objective_value=float(problem.value))
 
-    # Vincoli min/max per fuel cell
-    constraints += [p_fc <= float(sys['fc_nom_mw']) * u_fc]
-    constraints += [p_fc >= float(sys['fc_min_mw']) * u_fc]
 
-    # Vincoli min/max per generatore diesel
-    constraints += [p_dg <= float(sys['dg_nom_mw']) * u_dg]
-    constraints += [p_dg >= float(sys['dg_min_mw']) * u_dg]
+# Dati condivisi dai processi worker di solve_many_horizons (impostati dall'initializer)
+_WORKER_DATA: tuple | None = None
 
-    # Vincoli sullo stato di carica dello storage
-    constraints += [soc >= 0.0, soc <= h2_cap]
 
-    # Bilancio energetico: generazione = consumo
-    constraints += [
-        pv + wind + p_import + p_dg + p_fc
-        == load + p_ely + p_export + p_curt
-    ]
+def _init_worker(df: pd.DataFrame, cfg: dict, horizon_h: int, fuel_eur_per_kwh: float | None) -> None:
+    """Initializer dei worker: riceve i dati comuni una sola volta per processo."""
+    global _WORKER_DATA
+    _WORKER_DATA = (df, cfg, horizon_h, fuel_eur_per_kwh)
 
-    # Dinamica dello storage idrogeno (equazione di stato)
-    constraints += [
-        soc[1:] == soc[:-1] + dt * (eta_ely * p_ely - (1.0 / eta_fc) * p_fc)
-    ]
 
-    # ==================== FUNZIONE OBIETTIVO CVXPY ====================
+def _solve_job(job: tuple) -> MPCResult:
+    """Risolve una finestra (start_hour, soc_init_mwh) con i dati del worker."""
+    df, cfg, horizon_h, fuel_eur_per_kwh = _WORKER_DATA
+    start_hour, soc_init_mwh = job
+    return solve_horizon(df, cfg, start_hour, horizon_h, soc_init_mwh, fuel_eur_per_kwh=fuel_eur_per_kwh)
 
-    curtail_penalty = 1.0  # Penalita' per curtailment [EUR/MWh]
-    eta_dg = float(sys.get('eta_dg', 0.6))  # Efficienza diesel
 
-    # Costruzione del costo totale
-    cost = cp.sum(cp.multiply(import_price, p_import) * dt)        # Costo import
-    cost -= cp.sum(cp.multiply(export_price, p_export) * dt)       # Ricavo export (negativo)
-    cost += cp.sum(cp.multiply(fuel_price / eta_dg, p_dg) * dt)    # Costo diesel
-    cost += curtail_penalty * cp.sum(p_curt * dt)                  # Penalita' curtailment
-
-    # ==================== RISOLUZIONE CVXPY ====================
-
-    problem = cp.Problem(cp.Minimize(cost), constraints)
-
-    # Prova i solver in ordine di preferenza: Gurobi -> CBC -> ECOS_BB (fallback)
-    try:
-        problem.solve(solver=cp.GUROBI, verbose=False)
-    except Exception:
-        try:
-            problem.solve(solver=cp.CBC, verbose=False)
-        except Exception:
-            problem.solve(solver=cp.ECOS_BB, verbose=False)
-
-    # ==================== COSTRUZIONE RISULTATI ====================
+def solve_many_horizons(
+    df: pd.DataFrame,                       # DataFrame con i dati di input (previsioni, prezzi)
+    cfg: dict,                              # Dizionario di configurazione del sistema
+    starts: Sequence[int],                  # Ore di inizio delle finestre
+    horizon_h: int,                         # Lunghezza dell'orizzonte [ore]
+    socs: Sequence[float],                  # Stato di carica iniziale per ogni finestra [MWh]
+    fuel_eur_per_kwh: float | None = None,  # Prezzo combustibile [EUR/kWh], se None usa config
+    workers: int | None = None,             # Numero di processi (None = numero di CPU)
+) -> List[MPCResult]:
+    """
+    Risolve in parallelo finestre MPC indipendenti (es. giorni diversi o scenari Monte Carlo).
 
-    schedule = pd.DataFrame(
-        {
-            'hour': idx,
-            'p_import_mw': p_import.value,   # Potenza importata ottimale [MW]
-            'p_export_mw': p_export.value,   # Potenza esportata ottimale [MW]
-            'p_ely_mw': p_ely.value,         # Potenza elettrolizzatore ottimale [MW]
-            'p_fc_mw': p_fc.value,           # Potenza fuel cell ottimale [MW]
-            'p_dg_mw': p_dg.value,           # Potenza diesel ottimale [MW]
-            'p_curt_mw': p_curt.value,       # Potenza curtailed ottimale [MW]
-            'soc_mwh': soc.value[1:],        # Stato di carica ottimale [MWh]
-        }
-    ).set_index('hour')
+    Le finestre di un receding horizon dipendono l'una dall'altra tramite il SOC e
+    vanno risolte in sequenza; qui ogni coppia (start, soc) e' un problema a se'.
+    Con il metodo 'fork' i worker ereditano df e cfg senza serializzarli; negli
+    altri casi vengono inviati una sola volta per processo tramite l'initializer.
 
-    return MPCResult(schedule=schedule, objective_value=float(problem.value))
+    Returns:
+        Lista di MPCResult nello stesso ordine di starts
+    """
+    jobs = list(zip(starts, socs))
+    workers = min(workers or multiprocessing.cpu_count(), len(jobs))
+    if workers <= 1:
+        return [solve_horizon(df, cfg, h, horizon_h, soc, fuel_eur_per_kwh=fuel_eur_per_kwh)
+                for h, soc in jobs]
+
+    ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(df, cfg, horizon_h, fuel_eur_per_kwh),
+    ) as ex:
+        return list(ex.map(_solve_job, jobs))
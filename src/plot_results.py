@@ -14,8 +14,10 @@ I grafici sono progettati per presentazioni e report tecnici.
 from __future__ import annotations
 
 import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import datetime, timedelta
 
 import numpy as np
 import pandas as pd
@@ -25,7 +27,72 @@ import yaml
 import sys
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-from loader import load_timeseries, add_net_load
+from loader import load_timeseries, add_net_load, read_schedule
+from downsample import minmax_envelope
+
+
+# Margini fissi delle figure (frazioni della figura) al posto di tight_layout, che rifa'
+# il calcolo del layout misurando tutti i testi. Con questi margini etichette e titoli
+# restano dentro la figura, quindi savefig non usa bbox_inches='tight' (che misura di
+# nuovo ogni artista per ritagliare il bianco esterno)
+_SUBPLOTS_LAYOUT = dict(left=0.06, right=0.98, top=0.95, bottom=0.07, hspace=0.18)
+
+# Risoluzione dei PNG salvati: a 150 dpi una figura larga 16 pollici ha 2400 pixel,
+# sufficienti per slide e report (come save_plots in report.py), con un quarto dei
+# pixel da rasterizzare e comprimere rispetto a 300 dpi
+_SAVE_DPI = 150
+
+# Colonne sommate per giorno in plot_daily_summary (nomi originali, nessun rename)
+_DAILY_COLUMNS = ('load_forecast_mw', 'p_import_mw', 'p_export_mw', 'p_dg_mw', 'p_ely_mw', 'p_fc_mw')
+
+
+def _merge_schedule(
+    df: pd.DataFrame,                  # DataFrame con dati di input
+    schedule: pd.DataFrame,            # DataFrame con scheduling ottimale
+    columns: list[str] | None = None,  # Colonne da tenere (di df o di schedule), None = tutte
+) -> pd.DataFrame:
+    """
+    Affianca dati di input e scheduling sulle ore in comune (indici interi ordinati e unici).
+
+    concat sull'asse delle colonne allinea gli indici senza il percorso generale di join;
+    se entrambi gli indici sono ordinati pandas usa il merge lineare (nessuna hash table).
+    Con columns si allineano solo le colonne usate dal grafico invece dell'intero frame.
+    """
+    if columns is not None:
+        df = df[[c for c in df.columns if c in columns]]
+        schedule = schedule[[c for c in schedule.columns if c in columns]]
+    return pd.concat([df, schedule], axis=1, join='inner')
+
+
+def _res_total(merged: pd.DataFrame) -> np.ndarray:
+    """
+    Produzione rinnovabile totale (PV + eolico) [MW] come ndarray.
+
+    Usa la colonna 'res_total_mw' se gia' calcolata una volta sui dati di input (main),
+    altrimenti somma le due previsioni (funzioni chiamate direttamente su df).
+    """
+    if 'res_total_mw' in merged.columns:
+        return merged['res_total_mw'].to_numpy()
+    return merged['pv_forecast_mw'].to_numpy() + merged['wind_forecast_mw'].to_numpy()
+
+
+def _downsample(
+    merged: pd.DataFrame,          # Finestra gia' tagliata da plottare
+    max_points: int | None,        # Punti massimi per serie, None = nessuna riduzione
+) -> tuple[pd.DataFrame, int]:
+    """
+    Riduce una finestra lunga a coppie (min, max) per blocco di ore (vedi minmax_envelope).
+
+    Returns:
+        (frame ridotto, ore per blocco k); se len(merged) <= max_points ritorna (merged, 1)
+    """
+    if max_points is None or len(merged) <= max_points:
+        return merged, 1
+
+    hours, series, k = minmax_envelope(
+        merged.index.to_numpy(copy=False), [merged[col].to_numpy() for col in merged.columns], max_points)
+    index = pd.Index(hours, name=merged.index.name)
+    return pd.DataFrame(dict(zip(merged.columns, series)), index=index), k
 
 
 def plot_energy_balance_stacked(
@@ -35,6 +102,8 @@ def plot_energy_balance_stacked(
     save_path: str | None = None,  # Percorso per salvare l'immagine
     hours: int | None = None,   # Numero di ore da visualizzare
     start_hour: int = 0,        # Ora di inizio della finestra
+    merged: pd.DataFrame | None = None,  # _merge_schedule(df, schedule) gia' calcolato (opzionale)
+    max_points: int | None = 4000,  # Oltre questi punti le serie sono ridotte a min/max per blocco
 ):
     """
     GRAFICO PRINCIPALE: Bilancio energetico con aree impilate (stacked).
@@ -59,36 +128,46 @@ def plot_energy_balance_stacked(
         save_path: Se specificato, salva il grafico su file
         hours: Numero di ore da mostrare (default: tutte)
         start_hour: Ora iniziale della finestra da visualizzare
+        merged: Unione df/schedule gia' calcolata (_merge_schedule): se fornita il join
+            non viene ripetuto (la finestra hours/start_hour si applica comunque)
+        max_points: Punti massimi per serie: finestre piu' lunghe (es. un anno) sono
+            ridotte a coppie min/max per blocco di ore (_downsample), None = tutti i punti
 
     Returns:
         Oggetto Figure di matplotlib
     """
-    merged = df.join(schedule, how='inner')
+    if merged is None:
+        merged = _merge_schedule(df, schedule)
 
     # Selezione della finestra temporale
     if hours is not None:
         end_hour = min(start_hour + hours, len(merged))
         merged = merged.iloc[start_hour:end_hour]
 
-    timesteps = merged.index.values
+    merged, _ = _downsample(merged, max_points)
+    timesteps = merged.index.to_numpy(copy=False)
 
     # ==================== PREPARAZIONE DATI ====================
 
-    # Produzione rinnovabile totale
-    res_total = merged['pv_forecast_mw'] + merged['wind_forecast_mw']
+    # Colonne estratte una sola volta come ndarray: i pannelli usano solo questi array
+    # (to_numpy per colonna conserva il dtype, float32 per le previsioni)
+    load, imp_price, pun, p_import, p_export, p_dg, p_ely, p_fc = (
+        merged[col].to_numpy() for col in (
+            'load_forecast_mw', 'import_price_eur_per_mwh', 'pun_eur_per_mwh',
+            'p_import_mw', 'p_export_mw', 'p_dg_mw', 'p_ely_mw', 'p_fc_mw'))
 
     # FONTI (positive) - energia che entra nel sistema
-    y_res = res_total.values           # Rinnovabili (PV + eolico)
-    y_import = merged['p_import_mw'].values  # Import dalla rete
-    y_dg = merged['p_dg_mw'].values    # Generatore diesel
-    y_fc = merged['p_fc_mw'].values    # Fuel cell (scarica H2)
+    y_res = _res_total(merged)         # Rinnovabili (PV + eolico)
+    y_import = p_import                # Import dalla rete
+    y_dg = p_dg                        # Generatore diesel
+    y_fc = p_fc                        # Fuel cell (scarica H2)
 
     # USI (negative) - energia che esce dal sistema (oltre al carico)
-    y_export = -merged['p_export_mw'].values  # Export alla rete (negativo)
-    y_ely = -merged['p_ely_mw'].values        # Elettrolizzatore (carica H2, negativo)
+    y_export = -p_export               # Export alla rete (negativo)
+    y_ely = -p_ely                     # Elettrolizzatore (carica H2, negativo)
 
     # Carico (linea di riferimento)
-    y_load = merged['load_forecast_mw'].values
+    y_load = load
 
     # ==================== CREAZIONE FIGURA ====================
 
@@ -99,29 +178,25 @@ def plot_energy_balance_stacked(
     # ==========================================================
     ax1 = axes[0]
 
-    # Stack positivo (fonti di energia) - dal basso verso l'alto
-    ax1.fill_between(timesteps, 0, y_res,
-                     label='RES (PV+Wind)', color='green', alpha=0.7)
-    ax1.fill_between(timesteps, y_res, y_res + y_import,
-                     label='Import', color='blue', alpha=0.7)
-    ax1.fill_between(timesteps, y_res + y_import, y_res + y_import + y_dg,
-                     label='Diesel Gen', color='brown', alpha=0.7)
-    ax1.fill_between(timesteps, y_res + y_import + y_dg, y_res + y_import + y_dg + y_fc,
-                     label='Fuel Cell', color='purple', alpha=0.7)
+    # Stack positivo (fonti di energia) - dal basso verso l'alto, in un'unica chiamata.
+    # edgecolor uguale ai colors: bordo dello stesso colore del riempimento, come con color=
+    pos_colors = ['green', 'blue', 'brown', 'purple']
+    layers = ax1.stackplot(timesteps, y_res, y_import, y_dg, y_fc,
+                           labels=['RES (PV+Wind)', 'Import', 'Diesel Gen', 'Fuel Cell'],
+                           colors=pos_colors, edgecolor=pos_colors, alpha=0.7)
 
     # Stack negativo (usi di energia oltre il carico)
-    ax1.fill_between(timesteps, 0, y_export,
-                     label='Export', color='cyan', alpha=0.7)
-    ax1.fill_between(timesteps, y_export, y_export + y_ely,
-                     label='Electrolyzer', color='magenta', alpha=0.7)
+    neg_colors = ['cyan', 'magenta']
+    layers += ax1.stackplot(timesteps, y_export, y_ely,
+                            labels=['Export', 'Electrolyzer'],
+                            colors=neg_colors, edgecolor=neg_colors, alpha=0.7)
+    # stackplot blocca l'asse y sullo zero: si mantiene il margine dell'autoscale
+    for layer in layers:
+        layer.sticky_edges.y.clear()
 
     # Linea del carico (domanda da soddisfare)
     ax1.plot(timesteps, y_load, 'r-', linewidth=2, label='Load (domanda)')
 
-    # Calcolo bilancio per verifica
-    total_in = y_res + y_import + y_dg + y_fc   # Totale fonti
-    total_out = y_load - y_export - y_ely       # Totale usi (export e ely sono gia' negativi)
-
     ax1.axhline(y=0, color='black', linewidth=1)
     ax1.set_ylabel('Potenza [MW]')
     ax1.set_title(title if title else 'Bilancio Energetico')
@@ -134,17 +209,15 @@ def plot_energy_balance_stacked(
     ax2 = axes[1]
 
     # Serie dei prezzi
-    ax2.plot(timesteps, merged['import_price_eur_per_mwh'],
+    ax2.plot(timesteps, imp_price,
              'r-', linewidth=1.5, label='Prezzo Import (ARERA)')
-    ax2.plot(timesteps, merged['pun_eur_per_mwh'],
+    ax2.plot(timesteps, pun,
              'b-', linewidth=1.5, label='Prezzo Export (PUN)')
 
     # Linea orizzontale del costo marginale diesel (750 EUR/MWh per cf=0.45)
     ax2.axhline(y=750, color='brown', linestyle='--', linewidth=1, label='Costo DG')
 
     # Evidenzia zone di arbitraggio (quando conviene comprare e rivendere)
-    pun = merged['pun_eur_per_mwh'].values
-    imp_price = merged['import_price_eur_per_mwh'].values
     arbitrage_mask = pun > imp_price  # Arbitraggio se PUN > prezzo import
 
     ax2.fill_between(timesteps, imp_price, pun,
@@ -162,17 +235,17 @@ def plot_energy_balance_stacked(
     ax3 = axes[2]
 
     # Flussi con la rete elettrica
-    ax3.plot(timesteps, merged['p_import_mw'],
+    ax3.plot(timesteps, p_import,
              'b-', linewidth=1.5, label='Import')
-    ax3.plot(timesteps, merged['p_export_mw'],
+    ax3.plot(timesteps, p_export,
              'c-', linewidth=1.5, label='Export')
-    ax3.plot(timesteps, merged['p_dg_mw'],
+    ax3.plot(timesteps, p_dg,
              color='brown', linewidth=1.5, label='Diesel Gen')
 
     # Sistema idrogeno
-    ax3.plot(timesteps, merged['p_ely_mw'],
+    ax3.plot(timesteps, p_ely,
              'm--', linewidth=1, label='Electrolyzer')
-    ax3.plot(timesteps, merged['p_fc_mw'],
+    ax3.plot(timesteps, p_fc,
              color='purple', linestyle='--', linewidth=1, label='Fuel Cell')
 
     ax3.axhline(y=0, color='black', linewidth=0.5)
@@ -181,13 +254,14 @@ def plot_energy_balance_stacked(
     ax3.legend(loc='upper right', ncol=3)
     ax3.grid(True, alpha=0.3)
 
-    plt.tight_layout()
+    fig.subplots_adjust(**_SUBPLOTS_LAYOUT)
 
     if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+        fig.savefig(save_path, dpi=_SAVE_DPI)
         print(f'Salvato: {save_path}')
-
-    plt.show()
+        plt.close(fig)  # Gia' su file: pyplot non la trattiene fino a fine script
+    else:
+        plt.show()
     return fig
 
 
@@ -198,6 +272,8 @@ def plot_arbitrage_analysis(
     save_path: str | None = None,
     hours: int | None = None,
     start_hour: int = 0,
+    merged: pd.DataFrame | None = None,
+    max_points: int | None = 4000,
 ):
     """
     Grafico specifico per l'analisi delle opportunita' di arbitraggio.
@@ -218,17 +294,31 @@ def plot_arbitrage_analysis(
         save_path: Percorso per salvare l'immagine
         hours: Numero di ore da visualizzare
         start_hour: Ora iniziale
+        merged: Join df/schedule gia' calcolato (vedi plot_energy_balance_stacked)
+        max_points: Punti massimi per serie (vedi plot_energy_balance_stacked)
 
     Returns:
         Oggetto Figure di matplotlib
     """
-    merged = df.join(schedule, how='inner')
+    if merged is None:
+        # Solo prezzi e flussi con la rete usati nei pannelli
+        merged = _merge_schedule(df, schedule, ['pun_eur_per_mwh', 'import_price_eur_per_mwh',
+                                                'p_import_mw', 'p_export_mw', 'p_dg_mw'])
 
     if hours is not None:
         end_hour = min(start_hour + hours, len(merged))
         merged = merged.iloc[start_hour:end_hour]
 
-    timesteps = merged.index.values
+    # k = ore per blocco dopo la riduzione: le barre si allargano di conseguenza
+    merged, k = _downsample(merged, max_points)
+    timesteps = merged.index.to_numpy(copy=False)
+
+    # Colonne estratte una sola volta come ndarray (vedi plot_energy_balance_stacked)
+    pun, imp_price, p_import, p_export, p_dg = (
+        merged[col].to_numpy() for col in (
+            'pun_eur_per_mwh',               # Prezzo di vendita (PUN)
+            'import_price_eur_per_mwh',      # Prezzo di acquisto
+            'p_import_mw', 'p_export_mw', 'p_dg_mw'))
 
     fig, axes = plt.subplots(2, 1, figsize=(16, 10), sharex=True)
 
@@ -237,21 +327,23 @@ def plot_arbitrage_analysis(
     # ==========================================================
     ax1 = axes[0]
 
-    pun = merged['pun_eur_per_mwh'].values      # Prezzo di vendita (PUN)
-    imp_price = merged['import_price_eur_per_mwh'].values  # Prezzo di acquisto
-
     ax1.plot(timesteps, imp_price, 'r-', linewidth=2, label='Prezzo Import')
     ax1.plot(timesteps, pun, 'b-', linewidth=2, label='Prezzo Export (PUN)')
     ax1.axhline(y=750, color='brown', linestyle='--', linewidth=1.5, label='Costo DG (750 EUR/MWh)')
 
+    # Maschere delle due zone in un unico buffer bool, riempito in place (np.greater out=)
+    zones = np.empty((2, len(pun)), dtype=bool)
+    np.greater(pun, imp_price, out=zones[0])  # Tipo 1: PUN > prezzo import
+    np.greater(pun, 750, out=zones[1])        # Tipo 2: PUN > costo DG
+
     # Zona arbitraggio Tipo 1: PUN > Import (conviene comprare e vendere)
     ax1.fill_between(timesteps, imp_price, pun,
-                     where=(pun > imp_price),
+                     where=zones[0],
                      alpha=0.4, color='green', label='Arbitraggio: compra+vendi')
 
     # Zona arbitraggio Tipo 2: PUN > DG cost (conviene anche accendere il diesel)
     ax1.fill_between(timesteps, 750, pun,
-                     where=(pun > 750),
+                     where=zones[1],
                      alpha=0.3, color='orange', label='Arbitraggio: anche DG conviene')
 
     ax1.set_ylabel('Prezzo [EUR/MWh]')
@@ -265,13 +357,19 @@ def plot_arbitrage_analysis(
     # ==========================================================
     ax2 = axes[1]
 
-    # Barre per import (positive) e export (negative)
-    ax2.bar(timesteps, merged['p_import_mw'],
-            width=0.8, label='Import', color='blue', alpha=0.7)
-    ax2.bar(timesteps, -merged['p_export_mw'],
-            width=0.8, label='Export', color='cyan', alpha=0.7)
-    ax2.bar(timesteps, merged['p_dg_mw'],
-            width=0.4, label='Diesel Gen', color='brown', alpha=0.9)
+    # Barre per import (positive) e export (negative); dopo la riduzione basta il massimo
+    # di ogni blocco (righe dispari): la barra del minimo resterebbe nascosta sotto.
+    # Ogni barra e' un Rectangle (migliaia su un anno): con zorder sotto 0 e
+    # set_rasterization_zorder(0) in PDF/SVG diventano un'unica immagine, assi e testi
+    # restano vettoriali (nessun effetto sui PNG)
+    bars = slice(1, None, 2) if k > 1 else slice(None)
+    ax2.bar(timesteps[bars], p_import[bars],
+            width=0.8 * k, label='Import', color='blue', alpha=0.7, zorder=-1)
+    ax2.bar(timesteps[bars], -p_export[bars],
+            width=0.8 * k, label='Export', color='cyan', alpha=0.7, zorder=-1)
+    ax2.bar(timesteps[bars], p_dg[bars],
+            width=0.4 * k, label='Diesel Gen', color='brown', alpha=0.9, zorder=-1)
+    ax2.set_rasterization_zorder(0)
 
     # Linee di riferimento per i limiti
     ax2.axhline(y=0, color='black', linewidth=1)
@@ -285,13 +383,14 @@ def plot_arbitrage_analysis(
     ax2.legend(loc='upper right')
     ax2.grid(True, alpha=0.3)
 
-    plt.tight_layout()
+    fig.subplots_adjust(**_SUBPLOTS_LAYOUT)
 
     if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+        fig.savefig(save_path, dpi=_SAVE_DPI)
         print(f'Salvato: {save_path}')
-
-    plt.show()
+        plt.close(fig)  # Gia' su file: pyplot non la trattiene fino a fine script
+    else:
+        plt.show()
     return fig
 
 
@@ -302,6 +401,7 @@ def plot_h2_system(
     save_path: str | None = None,
     hours: int | None = None,
     start_hour: int = 0,
+    merged: pd.DataFrame | None = None,
 ):
     """
     Grafico dedicato al sistema di stoccaggio idrogeno.
@@ -320,17 +420,21 @@ def plot_h2_system(
         save_path: Percorso per salvare l'immagine
         hours: Numero di ore da visualizzare
         start_hour: Ora iniziale
+        merged: Join df/schedule gia' calcolato (vedi plot_energy_balance_stacked)
 
     Returns:
         Oggetto Figure di matplotlib
     """
-    merged = df.join(schedule, how='inner')
+    if merged is None:
+        # Solo le colonne del sistema idrogeno (da df serve solo l'indice delle ore)
+        merged = _merge_schedule(df, schedule, ['p_ely_mw', 'p_fc_mw', 'soc_mwh'])
 
     if hours is not None:
         end_hour = min(start_hour + hours, len(merged))
         merged = merged.iloc[start_hour:end_hour]
 
-    timesteps = merged.index.values
+    timesteps = merged.index.to_numpy(copy=False)
+    p_ely, p_fc, soc = (merged[col].to_numpy() for col in ('p_ely_mw', 'p_fc_mw', 'soc_mwh'))
     h2_capacity = 12.0  # Capacita' storage idrogeno [MWh]
 
     fig, axes = plt.subplots(2, 1, figsize=(16, 8), sharex=True)
@@ -341,11 +445,11 @@ def plot_h2_system(
     ax1 = axes[0]
 
     # Elettrolizzatore (consuma energia elettrica per produrre H2) - mostrato negativo
-    ax1.fill_between(timesteps, 0, -merged['p_ely_mw'],
+    ax1.fill_between(timesteps, 0, -p_ely,
                      label='Electrolyzer (consuma)', color='magenta', alpha=0.7)
 
     # Fuel Cell (consuma H2 per produrre energia elettrica) - mostrato positivo
-    ax1.fill_between(timesteps, 0, merged['p_fc_mw'],
+    ax1.fill_between(timesteps, 0, p_fc,
                      label='Fuel Cell (produce)', color='purple', alpha=0.7)
 
     ax1.axhline(y=0, color='black', linewidth=1)
@@ -360,7 +464,7 @@ def plot_h2_system(
     ax2 = axes[1]
 
     # Converte SOC da MWh a percentuale della capacita'
-    soc_percent = (merged['soc_mwh'] / h2_capacity) * 100
+    soc_percent = (soc / h2_capacity) * 100
 
     ax2.fill_between(timesteps, 0, soc_percent,
                      color='teal', alpha=0.5)
@@ -376,13 +480,14 @@ def plot_h2_system(
     ax2.legend(loc='upper right')
     ax2.grid(True, alpha=0.3)
 
-    plt.tight_layout()
+    fig.subplots_adjust(**_SUBPLOTS_LAYOUT)
 
     if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+        fig.savefig(save_path, dpi=_SAVE_DPI)
         print(f'Salvato: {save_path}')
-
-    plt.show()
+        plt.close(fig)  # Gia' su file: pyplot non la trattiene fino a fine script
+    else:
+        plt.show()
     return fig
 
 
@@ -391,6 +496,7 @@ def plot_daily_summary(
     schedule: pd.DataFrame,
     title: str = "",
     save_path: str | None = None,
+    merged: pd.DataFrame | None = None,
 ):
     """
     Grafico riassuntivo giornaliero: energie totali per ogni giorno.
@@ -407,38 +513,28 @@ def plot_daily_summary(
         schedule: DataFrame con le decisioni dell'ottimizzatore
         title: Titolo del grafico
         save_path: Percorso per salvare l'immagine
+        merged: Join df/schedule gia' calcolato (vedi plot_energy_balance_stacked)
 
     Returns:
         Oggetto Figure di matplotlib
     """
-    merged = df.join(schedule, how='inner')
-
-    # Raggruppa per giorno (ogni 24 ore)
-    merged['day'] = merged.index // 24
-
-    # Aggregazione giornaliera (somma delle potenze = energia in MWh con dt=1h)
-    daily = merged.groupby('day').agg({
-        'load_forecast_mw': 'sum',
-        'pv_forecast_mw': 'sum',
-        'wind_forecast_mw': 'sum',
-        'p_import_mw': 'sum',
-        'p_export_mw': 'sum',
-        'p_dg_mw': 'sum',
-        'p_ely_mw': 'sum',
-        'p_fc_mw': 'sum',
-    }).rename(columns={
-        'load_forecast_mw': 'Load',
-        'pv_forecast_mw': 'PV',
-        'wind_forecast_mw': 'Wind',
-        'p_import_mw': 'Import',
-        'p_export_mw': 'Export',
-        'p_dg_mw': 'DG',
-        'p_ely_mw': 'ELY',
-        'p_fc_mw': 'FC',
-    })
-
-    # Calcola RES totale
-    daily['RES'] = daily['PV'] + daily['Wind']
+    if merged is None:
+        merged = _merge_schedule(df, schedule)
+
+    # Raggruppa per giorno (ogni 24 ore): l'indice e' ordinato, quindi ogni giorno e' un
+    # blocco contiguo di righe e basta una somma per blocco (np.add.reduceat) invece di
+    # groupby con hash table; giorni incompleti o buchi nell'indice restano gestiti
+    day = merged.index.to_numpy(copy=False) // 24
+    starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])  # Prima riga di ogni giorno
+    days = day[starts]
+
+    # Aggregazione giornaliera (somma delle potenze = energia in MWh con dt=1h); le serie
+    # float32 sono accumulate in float64 senza copiarle
+    load, imp, exp, dg, ely, fc = (
+        np.add.reduceat(merged[col].to_numpy(), starts, dtype=float) for col in _DAILY_COLUMNS)
+
+    # RES totale giornaliera
+    res = np.add.reduceat(_res_total(merged), starts, dtype=float)
 
     fig, axes = plt.subplots(2, 1, figsize=(16, 10))
 
@@ -447,20 +543,19 @@ def plot_daily_summary(
     # ==========================================================
     ax1 = axes[0]
 
-    days = daily.index.values
     width = 0.8
 
     # Barre impilate: RES + Import + DG + FC
-    ax1.bar(days, daily['RES'], width, label='RES', color='green', alpha=0.7)
-    ax1.bar(days, daily['Import'], width, bottom=daily['RES'],
+    ax1.bar(days, res, width, label='RES', color='green', alpha=0.7)
+    ax1.bar(days, imp, width, bottom=res,
             label='Import', color='blue', alpha=0.7)
-    ax1.bar(days, daily['DG'], width, bottom=daily['RES'] + daily['Import'],
+    ax1.bar(days, dg, width, bottom=res + imp,
             label='DG', color='brown', alpha=0.7)
-    ax1.bar(days, daily['FC'], width, bottom=daily['RES'] + daily['Import'] + daily['DG'],
+    ax1.bar(days, fc, width, bottom=res + imp + dg,
             label='FC', color='purple', alpha=0.7)
 
     # Linea del carico giornaliero
-    ax1.plot(days, daily['Load'], 'r-o', linewidth=2, markersize=3, label='Load')
+    ax1.plot(days, load, 'r-o', linewidth=2, markersize=3, label='Load')
 
     ax1.set_ylabel('Energia [MWh/giorno]')
     ax1.set_title(title if title else 'Energie Giornaliere')
@@ -473,8 +568,8 @@ def plot_daily_summary(
     ax2 = axes[1]
 
     # Export (positivo) e ELY (negativo per simmetria)
-    ax2.bar(days, daily['Export'], width, label='Export', color='cyan', alpha=0.7)
-    ax2.bar(days, -daily['ELY'], width, label='ELY', color='magenta', alpha=0.7)
+    ax2.bar(days, exp, width, label='Export', color='cyan', alpha=0.7)
+    ax2.bar(days, -ely, width, label='ELY', color='magenta', alpha=0.7)
 
     ax2.axhline(y=0, color='black', linewidth=1)
     ax2.set_ylabel('Energia [MWh/giorno]')
@@ -482,13 +577,14 @@ def plot_daily_summary(
     ax2.legend(loc='upper right')
     ax2.grid(True, alpha=0.3, axis='y')
 
-    plt.tight_layout()
+    fig.subplots_adjust(**_SUBPLOTS_LAYOUT)
 
     if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+        fig.savefig(save_path, dpi=_SAVE_DPI)
         print(f'Salvato: {save_path}')
-
-    plt.show()
+        plt.close(fig)  # Gia' su file: pyplot non la trattiene fino a fine script
+    else:
+        plt.show()
     return fig
 
 
@@ -518,7 +614,7 @@ def plot_single_hour_breakdown(
     Returns:
         Oggetto Figure di matplotlib (o None se ora non trovata)
     """
-    merged = df.join(schedule, how='inner')
+    merged = _merge_schedule(df, schedule)
 
     if hour not in merged.index:
         print(f"Ora {hour} non trovata nei dati")
@@ -566,19 +662,21 @@ def plot_single_hour_breakdown(
     out_labels = ['Load', 'Export', 'ELY']
     out_colors = ['red', 'cyan', 'magenta']
 
-    # Barra IN (impilata)
-    bottom_in = 0
-    for val, label, color in zip(in_values, in_labels, in_colors):
-        if val > 0.01:  # Mostra solo se > 0
-            ax1.bar(0, val, bottom=bottom_in, color=color, label=f'{label}: {val:.2f} MW')
-            bottom_in += val
-
-    # Barra OUT (impilata)
-    bottom_out = 0
-    for val, label, color in zip(out_values, out_labels, out_colors):
-        if val > 0.01:
-            ax1.bar(1, val, bottom=bottom_out, color=color, label=f'{label}: {val:.2f} MW')
-            bottom_out += val
+    # Barre IN (x=0) e OUT (x=1) impilate in un'unica chiamata a bar: si tengono solo i
+    # segmenti > 0.01 MW (mostra solo se > 0), ognuno parte dalla somma di quelli sotto
+    x, heights, bottoms, colors, labels = [], [], [], [], []
+    for pos, values, names, cols in ((0, in_values, in_labels, in_colors),
+                                     (1, out_values, out_labels, out_colors)):
+        vals = np.array(values)
+        mask = vals > 0.01
+        shown = vals[mask]
+        x.append(np.full(len(shown), pos))
+        heights.append(shown)
+        bottoms.append(np.concatenate(([0.0], np.cumsum(shown)))[:len(shown)])
+        colors.extend(np.array(cols)[mask])
+        labels.extend(f'{name}: {val:.2f} MW' for name, val in zip(np.array(names)[mask], shown))
+    ax1.bar(np.concatenate(x), np.concatenate(heights), bottom=np.concatenate(bottoms),
+            color=colors, label=labels)
 
     ax1.set_xticks([0, 1])
     ax1.set_xticklabels(['ENTRATE\n(IN)', 'USCITE\n(OUT)'])
@@ -636,16 +734,85 @@ def plot_single_hour_breakdown(
              verticalalignment='top', fontfamily='monospace',
              bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
 
-    plt.tight_layout()
+    fig.subplots_adjust(**_SUBPLOTS_LAYOUT)
 
     if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+        fig.savefig(save_path, dpi=_SAVE_DPI)
         print(f'Salvato: {save_path}')
-
-    plt.show()
+        plt.close(fig)  # Gia' su file: pyplot non la trattiene fino a fine script
+    else:
+        plt.show()
     return fig
 
 
+def _run_scenario(
+    name: str,                   # Nome dello scenario (cf045, cf060)
+    sched: pd.DataFrame,         # Scheduling dello scenario
+    df: pd.DataFrame,            # Dati di input (con res_total_mw)
+    args: argparse.Namespace,    # Argomenti di main (finestra --start/--hours)
+    out_dir: Path,               # Cartella di output dei grafici
+) -> None:
+    """
+    Genera i quattro grafici di uno scenario (bilancio, arbitraggio, H2, riepilogo).
+
+    Eseguita da main in sequenza o in un processo separato per scenario.
+    """
+    plt.switch_backend('Agg')  # Anche nei worker avviati senza fork: solo output su file
+
+    # Join calcolato una sola volta per scenario e finestra tagliata una volta:
+    # i tre grafici sulla finestra ricevono la stessa fetta, il riepilogo tutto l'anno
+    merged = _merge_schedule(df, sched)
+    window = merged.iloc[args.start:min(args.start + args.hours, len(merged))]
+
+    print(f'\n=== Bilancio Energetico ({name}) ===')
+    plot_energy_balance_stacked(
+        df, sched,
+        title=f'Bilancio Energetico - {name} ({args.hours}h)',
+        save_path=str(out_dir / f'balance_{name}.png'),
+        merged=window,
+    )
+
+    print(f'\n=== Analisi Arbitraggio ({name}) ===')
+    plot_arbitrage_analysis(
+        df, sched,
+        title=f'Analisi Arbitraggio - {name} ({args.hours}h)',
+        save_path=str(out_dir / f'arbitrage_{name}.png'),
+        merged=window,
+    )
+
+    print(f'\n=== Sistema H2 ({name}) ===')
+    plot_h2_system(
+        df, sched,
+        title=f'Sistema Idrogeno - {name} ({args.hours}h)',
+        save_path=str(out_dir / f'h2_system_{name}.png'),
+        merged=window,
+    )
+
+    print(f'\n=== Riepilogo Giornaliero ({name}) ===')
+    plot_daily_summary(
+        df, sched,
+        title=f'Energie Giornaliere - {name}',
+        save_path=str(out_dir / f'daily_summary_{name}.png'),
+        merged=merged,
+    )
+
+
+# Dati comuni ai processi worker di main (impostati dall'initializer, come in model.py)
+_WORKER_DATA: tuple | None = None
+
+
+def _init_worker(df: pd.DataFrame, args: argparse.Namespace, out_dir: Path) -> None:
+    """Initializer dei worker: riceve df una sola volta per processo (nessuna copia con fork)."""
+    global _WORKER_DATA
+    _WORKER_DATA = (df, args, out_dir)
+
+
+def _run_worker(name: str, sched: pd.DataFrame) -> None:
+    """Genera i grafici di uno scenario con i dati comuni del worker."""
+    df, args, out_dir = _WORKER_DATA
+    _run_scenario(name, sched, df, args, out_dir)
+
+
 def main():
     """
     Funzione principale: genera tutti i grafici dai risultati MPC.
@@ -671,14 +838,21 @@ def main():
     parser.add_argument('--hour-detail', type=int, default=None, help='Mostra dettaglio per ora specifica')
     args = parser.parse_args()
 
+    # Tutti i grafici vanno su file: backend Agg, senza inizializzare l'interfaccia grafica
+    plt.switch_backend('Agg')
+
     # Caricamento configurazione e dati
     cfg = yaml.safe_load(Path(args.config).read_text())
     bundle = load_timeseries(Path('data'), cfg)
     df = add_net_load(bundle.data)
+    # RES totale calcolata una volta sui dati di input: la usano tutti i grafici e gli scenari
+    df = df.assign(res_total_mw=df['pv_forecast_mw'].to_numpy() + df['wind_forecast_mw'].to_numpy())
 
-    # Caricamento degli scheduling per i due scenari di costo combustibile
-    s45 = pd.read_csv(args.schedule_45).set_index('hour')  # Scenario cf=0.45
-    s60 = pd.read_csv(args.schedule_60).set_index('hour')  # Scenario cf=0.60
+    # Caricamento degli scheduling per i due scenari di costo combustibile (tipi espliciti,
+    # potenze in float32), ordinati per ora: con indici ordinati e unici pandas allinea
+    # con un merge lineare invece che con hash
+    s45 = read_schedule(Path(args.schedule_45)).sort_index()  # Scenario cf=0.45
+    s60 = read_schedule(Path(args.schedule_60)).sort_index()  # Scenario cf=0.60
 
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -701,42 +875,26 @@ def main():
             )
         return
 
-    # Generazione di tutti i grafici per ogni scenario
-    for name, sched in schedules:
-        print(f'\n=== Bilancio Energetico ({name}) ===')
-        plot_energy_balance_stacked(
-            df, sched,
-            title=f'Bilancio Energetico - {name} ({args.hours}h)',
-            save_path=str(out_dir / f'balance_{name}.png'),
-            hours=args.hours,
-            start_hour=args.start
-        )
-
-        print(f'\n=== Analisi Arbitraggio ({name}) ===')
-        plot_arbitrage_analysis(
-            df, sched,
-            title=f'Analisi Arbitraggio - {name} ({args.hours}h)',
-            save_path=str(out_dir / f'arbitrage_{name}.png'),
-            hours=args.hours,
-            start_hour=args.start
-        )
-
-        print(f'\n=== Sistema H2 ({name}) ===')
-        plot_h2_system(
-            df, sched,
-            title=f'Sistema Idrogeno - {name} ({args.hours}h)',
-            save_path=str(out_dir / f'h2_system_{name}.png'),
-            hours=args.hours,
-            start_hour=args.start
-        )
-
-        print(f'\n=== Riepilogo Giornaliero ({name}) ===')
-        plot_daily_summary(
-            df, sched,
-            title=f'Energie Giornaliere - {name}',
-            save_path=str(out_dir / f'daily_summary_{name}.png'),
-        )
+    # Generazione di tutti i grafici per ogni scenario: gli scenari sono indipendenti,
+    # con piu' CPU ognuno e' reso in un processo separato (come solve_many_horizons,
+    # df passato dall'initializer: con 'fork' i worker lo ereditano senza serializzarlo,
+    # negli altri casi e' inviato una volta per processo; per task viaggia solo lo scheduling)
+    workers = min(len(schedules), os.cpu_count() or 1)
+    if workers <= 1:
+        for name, sched in schedules:
+            _run_scenario(name, sched, df, args, out_dir)
+        return
 
+    ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(df, args, out_dir),
+    ) as ex:
+        futures = [ex.submit(_run_worker, name, sched) for name, sched in schedules]
+        for fut in futures:
+            fut.result()  # Propaga eventuali errori dei worker
 
 if __name__ == '__main__':
     main()
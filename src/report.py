@@ -20,23 +20,55 @@ import numpy as np
 import pandas as pd
 import yaml
 
-from loader import load_timeseries, add_net_load
+from loader import load_timeseries, add_net_load, read_schedule
+from downsample import minmax_envelope
 
 
-def _safe_sum(series: pd.Series) -> float:
-    """
-    Calcola la somma di una serie gestendo i valori NaN.
+# Metriche energetiche [MWh] -> colonna di potenza [MW] da integrare nel tempo
+_ENERGY_COLUMNS = {
+    # Energie in ingresso
+    'energy_load_mwh': 'load_forecast_mw',    # Energia carico
+    'energy_pv_mwh': 'pv_forecast_mw',        # Energia PV
+    'energy_wind_mwh': 'wind_forecast_mw',    # Energia eolica
 
-    Sostituisce i NaN con 0 prima di sommare, evitando errori
-    quando alcuni dati sono mancanti.
+    # Energie scambiate con la rete
+    'energy_import_mwh': 'p_import_mw',       # Energia importata
+    'energy_export_mwh': 'p_export_mw',       # Energia esportata
 
-    Args:
-        series: Serie pandas da sommare
+    # Energie diesel e idrogeno
+    'energy_dg_mwh': 'p_dg_mw',               # Energia diesel
+    'energy_ely_mwh': 'p_ely_mw',             # Energia elettrolizzatore
+    'energy_fc_mwh': 'p_fc_mw',               # Energia fuel cell
 
-    Returns:
-        Somma dei valori (NaN trattati come 0)
+    # Energia sprecata
+    'energy_curt_mwh': 'p_curt_mw',           # Energia curtailed
+}
+
+# Punti massimi per serie nei grafici di save_plots: a 150 dpi una figura larga 12 pollici
+# ha 1800 pixel, un anno orario (8760 punti) non aggiunge dettaglio visibile
+_PLOT_MAX_POINTS = 4000
+
+
+def _join_schedule(
+    df: pd.DataFrame,          # DataFrame con dati di input (indice orario univoco)
+    schedule: pd.DataFrame,    # DataFrame con scheduling ottimale
+) -> pd.DataFrame:
+    """
+    Equivalente di df.join(schedule, how='inner') per il caso comune.
+
+    Lo scheduling copre di solito un sottoinsieme ordinato delle ore di df: le righe
+    di df si prendono per posizione (get_indexer) e si affiancano allo scheduling con
+    indici gia' identici, senza il percorso generale di allineamento del join.
+    Se qualche ora manca in df o l'indice non e' ordinato si usa il join.
     """
-    return float(series.fillna(0.0).sum())
+    hours = schedule.index
+    if hours.is_monotonic_increasing and hours.is_unique:
+        rows = df.index.get_indexer(hours)
+        if (rows >= 0).all():
+            left = df.take(rows)
+            left.index = hours
+            return pd.concat([left, schedule], axis=1)
+    return df.join(schedule, how='inner')
 
 
 def build_report(
@@ -44,6 +76,7 @@ def build_report(
     schedule: pd.DataFrame,                 # DataFrame con scheduling ottimale
     cfg: dict,                              # Configurazione del sistema
     fuel_eur_per_kwh: float | None = None,  # Costo combustibile [EUR/kWh]
+    merged: pd.DataFrame | None = None,     # _join_schedule(df, schedule) gia' calcolato
 ) -> pd.DataFrame:
     """
     Calcola le metriche aggregate dallo scheduling MPC.
@@ -58,6 +91,8 @@ def build_report(
         schedule: DataFrame con le decisioni dell'ottimizzatore
         cfg: Dizionario di configurazione
         fuel_eur_per_kwh: Costo del combustibile (opzionale, default da config)
+        merged: Unione df/schedule gia' calcolata dal chiamante: se fornita il join
+            non viene ripetuto (main la condivide con save_plots)
 
     Returns:
         DataFrame con una riga contenente tutte le metriche calcolate
@@ -71,49 +106,40 @@ def build_report(
     eta_dg = float(cfg['system'].get('eta_dg', 0.6))  # Efficienza diesel
 
     # Unione dati di input e scheduling (inner join sulle ore comuni)
-    merged = df.join(schedule, how='inner')
+    if merged is None:
+        merged = _join_schedule(df, schedule)
 
     # ==================== METRICHE ENERGETICHE [MWh] ====================
 
-    metrics = {
-        'hours': len(merged),  # Numero di ore simulate
+    # Tutte le potenze in un'unica matrice float64: una sola riduzione per colonna invece
+    # di una Series intermedia + fillna + sum per metrica. I NaN diventano 0 gia' nella
+    # conversione (na_value), senza una seconda copia dell'array
+    cols = list(_ENERGY_COLUMNS.values())
+    power = merged[cols].to_numpy(dtype=np.float64, na_value=0.0)
+    energies = power.sum(axis=0) * dt
 
-        # Energie in ingresso
-        'energy_load_mwh': _safe_sum(merged['load_forecast_mw'] * dt),   # Energia carico
-        'energy_pv_mwh': _safe_sum(merged['pv_forecast_mw'] * dt),       # Energia PV
-        'energy_wind_mwh': _safe_sum(merged['wind_forecast_mw'] * dt),   # Energia eolica
-
-        # Energie scambiate con la rete
-        'energy_import_mwh': _safe_sum(merged['p_import_mw'] * dt),      # Energia importata
-        'energy_export_mwh': _safe_sum(merged['p_export_mw'] * dt),      # Energia esportata
-
-        # Energie diesel e idrogeno
-        'energy_dg_mwh': _safe_sum(merged['p_dg_mw'] * dt),              # Energia diesel
-        'energy_ely_mwh': _safe_sum(merged['p_ely_mw'] * dt),            # Energia elettrolizzatore
-        'energy_fc_mwh': _safe_sum(merged['p_fc_mw'] * dt),              # Energia fuel cell
-
-        # Energia sprecata
-        'energy_curt_mwh': _safe_sum(merged['p_curt_mw'] * dt),          # Energia curtailed
-    }
+    metrics = {'hours': len(merged)}  # Numero di ore simulate
+    metrics.update(zip(_ENERGY_COLUMNS, energies.tolist()))
 
     # ==================== METRICHE ECONOMICHE [EUR] ====================
 
+    p_import = power[:, cols.index('p_import_mw')]
+    p_export = power[:, cols.index('p_export_mw')]
+    import_price, pun = merged[['import_price_eur_per_mwh', 'pun_eur_per_mwh']].to_numpy(
+        dtype=np.float64, na_value=0.0).T
+
     # Costo dell'energia importata dalla rete
     # cost = sum(p_import * prezzo_import * dt)
-    metrics['cost_import_eur'] = _safe_sum(
-        merged['p_import_mw'] * merged['import_price_eur_per_mwh'] * dt
-    )
+    metrics['cost_import_eur'] = float(np.dot(p_import, import_price)) * dt
 
     # Ricavo dalla vendita di energia alla rete (al prezzo PUN)
     # income = sum(p_export * PUN * dt)
-    metrics['income_export_eur'] = _safe_sum(
-        merged['p_export_mw'] * merged['pun_eur_per_mwh'] * dt
-    )
+    metrics['income_export_eur'] = float(np.dot(p_export, pun)) * dt
 
     # Costo del combustibile diesel
     # Il costo e' (fuel_price / eta_dg) perche' per produrre 1 MWh elettrico
     # servono (1/eta_dg) MWh di combustibile
-    metrics['cost_dg_eur'] = _safe_sum(merged['p_dg_mw'] * (fuel_price / eta_dg) * dt)
+    metrics['cost_dg_eur'] = metrics['energy_dg_mwh'] * (fuel_price / eta_dg)
 
     # Costo netto totale = import - export + diesel
     metrics['net_cost_eur'] = (
@@ -153,7 +179,13 @@ def save_report(report: pd.DataFrame, out_path: Path) -> None:
     report.to_csv(out_path, index=False)
 
 
-def save_plots(df: pd.DataFrame, schedule: pd.DataFrame, out_dir: Path) -> None:
+def save_plots(
+    df: pd.DataFrame,
+    schedule: pd.DataFrame,
+    out_dir: Path,
+    merged: pd.DataFrame | None = None,
+    max_points: int | None = _PLOT_MAX_POINTS,
+) -> None:
     """
     Genera e salva grafici riassuntivi dei risultati.
 
@@ -167,66 +199,54 @@ def save_plots(df: pd.DataFrame, schedule: pd.DataFrame, out_dir: Path) -> None:
         df: DataFrame con i dati di input
         schedule: DataFrame con lo scheduling ottimale
         out_dir: Cartella di output per i grafici
+        merged: Join df/schedule gia' calcolato (vedi build_report)
+        max_points: Punti massimi per serie: orizzonti piu' lunghi sono ridotti a
+            coppie min/max per blocco di ore (minmax_envelope), None = tutti i punti
     """
     import matplotlib.pyplot as plt
 
     out_dir.mkdir(parents=True, exist_ok=True)
-    merged = df.join(schedule, how='inner')
-
-    # ==================== GRAFICO 1: CARICO E RINNOVABILI ====================
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(merged.index, merged['load_forecast_mw'], label='load')
-    plt.plot(merged.index, merged['pv_forecast_mw'], label='pv')
-    plt.plot(merged.index, merged['wind_forecast_mw'], label='wind')
-    plt.legend()
-    plt.title('Load and renewables')
-    plt.xlabel('hour')
-    plt.ylabel('MW')
-    plt.tight_layout()
-    plt.savefig(out_dir / 'load_renewables.png', dpi=150)
-    plt.close()
-
-    # ==================== GRAFICO 2: RETE E DIESEL ====================
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(merged.index, merged['p_import_mw'], label='import')
-    plt.plot(merged.index, merged['p_export_mw'], label='export')
-    plt.plot(merged.index, merged['p_dg_mw'], label='dg')
-    plt.legend()
-    plt.title('Grid and DG')
-    plt.xlabel('hour')
-    plt.ylabel('MW')
-    plt.tight_layout()
-    plt.savefig(out_dir / 'grid_dg.png', dpi=150)
-    plt.close()
-
-    # ==================== GRAFICO 3: SISTEMA IDROGENO ====================
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(merged.index, merged['p_ely_mw'], label='ely')
-    plt.plot(merged.index, merged['p_fc_mw'], label='fc')
-    plt.plot(merged.index, merged['soc_mwh'], label='soc')
-    plt.legend()
-    plt.title('Hydrogen system')
-    plt.xlabel('hour')
-    plt.ylabel('MW / MWh')
-    plt.tight_layout()
-    plt.savefig(out_dir / 'hydrogen.png', dpi=150)
-    plt.close()
-
-    # ==================== GRAFICO 4: PREZZI ====================
-
-    plt.figure(figsize=(12, 6))
-    plt.plot(merged.index, merged['import_price_eur_per_mwh'], label='import price')
-    plt.plot(merged.index, merged['pun_eur_per_mwh'], label='export price')
-    plt.legend()
-    plt.title('Prices')
-    plt.xlabel('hour')
-    plt.ylabel('EUR/MWh')
-    plt.tight_layout()
-    plt.savefig(out_dir / 'prices.png', dpi=150)
-    plt.close()
+    if merged is None:
+        merged = _join_schedule(df, schedule)
+
+    # Asse orario e colonne estratte una sola volta come ndarray per i quattro grafici
+    # (to_numpy per colonna conserva il dtype originale)
+    hours = merged.index.to_numpy(copy=False)
+    hours, series, _ = minmax_envelope(hours, [merged[col].to_numpy() for col in (
+        'load_forecast_mw', 'pv_forecast_mw', 'wind_forecast_mw', 'p_import_mw',
+        'p_export_mw', 'p_dg_mw', 'p_ely_mw', 'p_fc_mw', 'soc_mwh',
+        'import_price_eur_per_mwh', 'pun_eur_per_mwh')], max_points)
+    load, pv, wind, imp, exp, dg, ely, fc, soc, import_price, pun = series
+
+    # Una sola figura per i quattro grafici: gli assi sono ripuliti (cla) prima di ogni
+    # grafico invece di ricreare Figure, Axes e canvas Agg a ogni file. I margini sono
+    # riportati a quelli iniziali prima di tight_layout, che altrimenti partirebbe da
+    # quelli del grafico precedente (stesse immagini dei quattro file separati)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    margins = {k: getattr(fig.subplotpars, k) for k in ('left', 'right', 'bottom', 'top')}
+    panels = (
+        # (file, titolo, unita' asse y, [(serie, etichetta), ...])
+        ('load_renewables.png', 'Load and renewables', 'MW',
+         [(load, 'load'), (pv, 'pv'), (wind, 'wind')]),
+        ('grid_dg.png', 'Grid and DG', 'MW',
+         [(imp, 'import'), (exp, 'export'), (dg, 'dg')]),
+        ('hydrogen.png', 'Hydrogen system', 'MW / MWh',
+         [(ely, 'ely'), (fc, 'fc'), (soc, 'soc')]),
+        ('prices.png', 'Prices', 'EUR/MWh',
+         [(import_price, 'import price'), (pun, 'export price')]),
+    )
+    for filename, title, ylabel, lines in panels:
+        ax.cla()
+        fig.subplots_adjust(**margins)
+        for values, label in lines:
+            ax.plot(hours, values, label=label)
+        ax.legend()
+        ax.set_title(title)
+        ax.set_xlabel('hour')
+        ax.set_ylabel(ylabel)
+        fig.tight_layout()
+        fig.savefig(out_dir / filename, dpi=150)
+    plt.close(fig)
 
 
 def main() -> None:
@@ -235,7 +255,7 @@ def main() -> None:
 
     Argomenti da linea di comando:
     --config: percorso file di configurazione YAML
-    --schedule: percorso file CSV con scheduling MPC
+    --schedule: percorso file CSV (o .parquet) con scheduling MPC
     --out: percorso file di output per il report
     --fuel-cost: costo combustibile [EUR/kWh] (opzionale)
     --load-nom: potenza nominale carico [MW] per scalatura (opzionale)
@@ -261,19 +281,22 @@ def main() -> None:
     bundle = load_timeseries(Path('data'), cfg)
     df = add_net_load(bundle.data)
 
-    # Caricamento scheduling MPC
-    schedule = pd.read_csv(args.schedule)
-    if 'hour' in schedule.columns:
-        schedule = schedule.set_index('hour')
+    # Caricamento scheduling MPC (CSV o Parquet, stessi tipi di plot_results)
+    schedule = read_schedule(Path(args.schedule))
+
+    # Join calcolato una sola volta e condiviso da report e grafici
+    merged = _join_schedule(df, schedule)
 
     # Generazione report
-    report = build_report(df, schedule, cfg, fuel_eur_per_kwh=args.fuel_cost)
+    report = build_report(df, schedule, cfg, fuel_eur_per_kwh=args.fuel_cost, merged=merged)
     save_report(report, Path(args.out))
     print(f'wrote {args.out}')
 
-    # Generazione grafici (opzionale)
+    # Generazione grafici (opzionale): solo su file, backend Agg senza interfaccia grafica
     if args.plots:
-        save_plots(df, schedule, Path('outputs/plots'))
+        import matplotlib
+        matplotlib.use('Agg')
+        save_plots(df, schedule, Path('outputs/plots'), merged=merged)
         print('wrote outputs/plots/*.png')
 
 
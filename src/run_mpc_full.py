@@ -67,9 +67,10 @@ def run_receding(
 
     # Ciclo principale: itera su tutte le ore valide
     # Si ferma quando l'orizzonte non puo' piu' essere completato
+    res = None  # Risultato della finestra precedente, usato come warm start del solver
     for hour in tqdm(range(start, int(last_hour) - horizon + 1), desc='MPC'):
         # Risolve l'ottimizzazione per l'orizzonte [hour, hour+horizon]
-        res = solve_horizon(df, cfg, hour, horizon, soc, fuel_eur_per_kwh=fuel_eur_per_kwh)
+        res = solve_horizon(df, cfg, hour, horizon, soc, fuel_eur_per_kwh=fuel_eur_per_kwh, warm_start=res)
 
         # Estrae la prima riga dello schedule (decisione per l'ora corrente)
         first = res.schedule.iloc[0]
@@ -156,9 +157,13 @@ def main() -> None:
             fuel_str = f'{fuel_cost:.2f}'.replace('.', '')  # 0.45 -> "045"
             out_path = out_path.with_name(f'{out_path.stem}_cf{fuel_str}{out_path.suffix}')
 
-        # Salvataggio risultati su CSV
+        # Salvataggio risultati: CSV, oppure Parquet se --out termina in .parquet
+        # (formato binario a colonne, richiede pyarrow; letto da read_schedule e report)
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        schedule.to_csv(out_path)
+        if out_path.suffix == '.parquet':
+            schedule.to_parquet(out_path, compression='zstd')
+        else:
+            schedule.to_csv(out_path)
 
         print(f'wrote {out_path} rows={len(schedule)} (load={load_nom}MW, cf={fuel_cost})')
 
@@ -51,8 +51,9 @@ def build_hourly_index(year: int, hours: np.ndarray) -> pd.DatetimeIndex:
     Esempio:
         hours = [0, 1, 2] -> [2022-01-01 00:00, 2022-01-01 01:00, 2022-01-01 02:00]
     """
-    start = datetime(year, 1, 1)  # Primo istante dell'anno
-    return pd.DatetimeIndex([start + timedelta(hours=int(h)) for h in hours])
+    start = pd.Timestamp(datetime(year, 1, 1))  # Primo istante dell'anno
+    # Somma vettoriale: nessun oggetto datetime Python per ora
+    return pd.DatetimeIndex(start + pd.to_timedelta(np.asarray(hours, dtype=np.int64), unit='h'))
 
 
 def _easter_date(year: int) -> date:
@@ -154,41 +155,51 @@ def tariff_f1_f2_f3(
     Returns:
         Array dei prezzi assegnati ad ogni ora [EUR/kWh]
     """
-    # Inizializza tutti i prezzi a F3 (default per notti/domeniche/festivi)
-    prices = np.full(len(timestamps), f3, dtype=float)
-
-    # Carica le festivita' dell'anno
-    holidays = italian_holidays(timestamps[0].year)
-
-    # Ciclo su ogni timestamp per assegnare la fascia corretta
-    for i, ts in enumerate(timestamps):
-        dow = ts.weekday()  # Giorno della settimana: 0=Lun, 1=Mar, ..., 6=Dom
-        hour = ts.hour      # Ora del giorno (0-23)
-
-        # Festivi e domeniche -> sempre F3
-        if ts.date() in holidays or dow == 6:
-            prices[i] = f3
-            continue
-
-        # Lunedi' - Venerdi' (dow = 0-4)
-        if dow <= 4:
-            if 8 <= hour < 19:
-                # Ore 08:00-18:59 -> F1 (punta)
-                prices[i] = f1
-            elif (7 <= hour < 8) or (19 <= hour < 23):
-                # Ore 07:00-07:59 e 19:00-22:59 -> F2 (intermedia)
-                prices[i] = f2
-            else:
-                # Ore 00:00-06:59 e 23:00-23:59 -> F3 (fuori punta)
-                prices[i] = f3
-
-        # Sabato (dow = 5)
-        elif dow == 5:
-            if 7 <= hour < 23:
-                # Ore 07:00-22:59 -> F2 (intermedia)
-                prices[i] = f2
-            else:
-                # Ore 00:00-06:59 e 23:00-23:59 -> F3 (fuori punta)
-                prices[i] = f3
-
-    return prices
+    # Festivita' dell'anno come maschera indicizzata per giorno dell'anno (1-366)
+    year = timestamps[0].year
+    holiday_mask = np.zeros(367, dtype=bool)
+    holiday_mask[[d.timetuple().tm_yday for d in italian_holidays(year)]] = True
+
+    # Componenti di calendario estratte una volta come array interi
+    hod = timestamps.hour.to_numpy(dtype=np.int8)       # Ora del giorno (0-23)
+    dow = timestamps.dayofweek.to_numpy(dtype=np.int8)  # Giorno della settimana: 0=Lun, ..., 6=Dom
+    # Lookup diretto sul giorno dell'anno; le ore che sconfinano nell'anno successivo non sono festive
+    hol = holiday_mask[timestamps.dayofyear.to_numpy()] & (timestamps.year.to_numpy() == year)
+
+    return _assign_tariff(hod, dow, hol, f1, f2, f3)
+
+
+def _assign_tariff(
+    hod: np.ndarray,
+    dow: np.ndarray,
+    hol: np.ndarray,
+    f1: float,
+    f2: float,
+    f3: float,
+) -> np.ndarray:
+    """
+    Classificazione F1/F2/F3 vettoriale su array di ora, giorno e festivita'.
+
+    Festivi e domeniche restano in F3 (default); le maschere F1/F2 seguono lo
+    schema descritto in tariff_f1_f2_f3.
+
+    Args:
+        hod: Ora del giorno (0-23)
+        dow: Giorno della settimana (0=Lun, ..., 6=Dom)
+        hol: True per le ore dei giorni festivi
+        f1, f2, f3: Prezzi delle tre fasce [EUR/kWh]
+
+    Returns:
+        Array dei prezzi assegnati ad ogni ora [EUR/kWh]
+    """
+    weekday = (dow <= 4) & ~hol   # Lunedi' - Venerdi' non festivi
+    saturday = (dow == 5) & ~hol  # Sabato non festivo
+
+    # Lun-Ven 08:00-18:59 -> F1 (punta)
+    is_f1 = weekday & (hod >= 8) & (hod < 19)
+    # Lun-Ven 07:00-07:59 e 19:00-22:59, Sab 07:00-22:59 -> F2 (intermedia)
+    is_f2 = ((weekday & ((hod == 7) | ((hod >= 19) & (hod < 23))))
+             | (saturday & (hod >= 7) & (hod < 23)))
+
+    # Tutto il resto (notti, domeniche, festivi) -> F3 (fuori punta)
+    return np.select([is_f1, is_f2], [f1, f2], default=f3).astype(float)
@@ -29,7 +29,7 @@ def load_timeseries_2025(data_dir: Path, test_dir: Path, cfg: dict):
     - PUN dal 2025
     """
     from loader import (
-        _normalize_hours, _build_import_price_series, SeriesBundle
+        _normalize_hours, _align_load_hours, _build_import_price_series, SeriesBundle, SERIES_DTYPE
     )
 
     # Carica RES e Load dal 2022 (profili invariati)
@@ -39,9 +39,9 @@ def load_timeseries_2025(data_dir: Path, test_dir: Path, cfg: dict):
     # Carica PUN 2025
     pun_2025 = _load_mat(test_dir / 'PUN_2025.mat')
 
-    p_pv = np.asarray(res['P_pv'], dtype=float)
-    p_w = np.asarray(res['P_w'], dtype=float)
-    pul = np.asarray(load['Pul'], dtype=float)
+    p_pv = np.asarray(res['P_pv'], dtype=SERIES_DTYPE)
+    p_w = np.asarray(res['P_w'], dtype=SERIES_DTYPE)
+    pul = np.asarray(load['Pul'], dtype=SERIES_DTYPE)
     price = np.asarray(pun_2025['pun'], dtype=float).reshape(-1)
 
     pv_nom = float(cfg['system']['pv_nom_mw'])
@@ -53,17 +53,6 @@ def load_timeseries_2025(data_dir: Path, test_dir: Path, cfg: dict):
     hours_all = np.arange(p_pv.shape[0], dtype=int)
     load_hours = _normalize_hours(pul[:, 0])
 
-    df_year = pd.DataFrame(
-        {
-            'hour': hours_all,
-            'pv_forecast_mw': p_pv[:, 0] * pv_nom,
-            'pv_actual_mw': p_pv[:, 1] * pv_nom,
-            'wind_forecast_mw': p_w[:, 0] * wind_nom,
-            'wind_actual_mw': p_w[:, 1] * wind_nom,
-            'pun_eur_per_mwh': price[:len(hours_all)],  # Troncato se necessario
-        }
-    ).set_index('hour')
-
     load_forecast_mw = pul[:, 1] / 1000.0
     load_actual_mw = pul[:, 2] / 1000.0
 
@@ -71,19 +60,27 @@ def load_timeseries_2025(data_dir: Path, test_dir: Path, cfg: dict):
         peak = float(np.max(load_actual_mw))
         load_scale = load_nom_mw / peak if peak > 0 else 1.0
 
-    df_load = pd.DataFrame(
-        {
-            'hour': load_hours,
-            'load_forecast_mw': load_forecast_mw * load_scale,
-            'load_actual_mw': load_actual_mw * load_scale,
-        }
-    ).set_index('hour')
+    has_load, load_mw = _align_load_hours(
+        len(hours_all), load_hours, np.column_stack([load_forecast_mw, load_actual_mw]) * load_scale
+    )
 
     use_full_year = bool(cfg['project'].get('use_full_year', False))
-    if use_full_year:
-        df = df_year.join(df_load, how='left')
-    else:
-        df = df_year.join(df_load, how='inner')
+    rows = hours_all if use_full_year else hours_all[has_load]
+
+    price = price[:len(hours_all)]  # Troncato se necessario
+    df = pd.DataFrame(
+        {
+            'pv_forecast_mw': p_pv[rows, 0] * pv_nom,
+            'pv_actual_mw': p_pv[rows, 1] * pv_nom,
+            'wind_forecast_mw': p_w[rows, 0] * wind_nom,
+            'wind_actual_mw': p_w[rows, 1] * wind_nom,
+            'pun_eur_per_mwh': price[rows],
+            'load_forecast_mw': load_mw[rows, 0],
+            'load_actual_mw': load_mw[rows, 1],
+        },
+        index=pd.Index(rows, name='hour'),
+        copy=False,
+    )
 
     df['import_price_eur_per_mwh'] = _build_import_price_series(cfg, df.index.values)
 
@@ -116,8 +113,9 @@ def run_receding(
     if n_steps is not None:
         end_hour = min(start + n_steps, end_hour)
 
+    res = None  # Risultato della finestra precedente, usato come warm start
     for hour in tqdm(range(start, end_hour), desc=desc):
-        res = solve_horizon(df, cfg, hour, horizon, soc, fuel_eur_per_kwh=fuel_eur_per_kwh)
+        res = solve_horizon(df, cfg, hour, horizon, soc, fuel_eur_per_kwh=fuel_eur_per_kwh, warm_start=res)
         first = res.schedule.iloc[0]
         soc = float(first['soc_mwh'])
         results.append(